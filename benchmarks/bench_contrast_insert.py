@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark building the contrast document: the original reversed-index insertion
+(list(parent).index + parse_xml per element) vs. the single-pass addnext writer.
+
+Run from the repository root:
+    python -m benchmarks.bench_contrast_insert --paragraphs 10000
+"""
+import argparse
+import copy
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")
+
+import docx
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+
+from word_translation_service import WordTranslationService, paragraph_elements
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def make_document(paragraphs: int):
+    doc = docx.Document()
+    for i in range(paragraphs):
+        p = doc.add_paragraph(f"Paragraph {i} describing the embodiment ")
+        p.add_run("in detail").bold = True
+    return doc
+
+
+def legacy_insert(paragraph, translated_text: str) -> None:
+    """The original insert_translation_simple"""
+    parent = paragraph._element.getparent()
+    new_para = docx.oxml.parse_xml(f'<w:p {W}/>')
+    if paragraph._element.find(qn('w:pPr')) is not None:
+        new_para.insert(0, copy.deepcopy(paragraph._element.find(qn('w:pPr'))))
+    run = docx.oxml.parse_xml(f'<w:r {W}/>')
+    text_elem = docx.oxml.parse_xml(f'<w:t {W}/>')
+    text_elem.text = translated_text
+    run.append(text_elem)
+    rpr = docx.oxml.parse_xml(f'<w:rPr {W}/>')
+    if paragraph.runs and paragraph.runs[0]._element.find(qn('w:rPr')) is not None:
+        rpr = copy.deepcopy(paragraph.runs[0]._element.find(qn('w:rPr')))
+        color_elem = rpr.find(qn('w:color'))
+        if color_elem is not None:
+            color_elem.set(qn('w:val'), 'FF0000')
+        else:
+            rpr.append(docx.oxml.parse_xml(f'<w:color {W} w:val="FF0000"/>'))
+    else:
+        rpr.append(docx.oxml.parse_xml(f'<w:color {W} w:val="FF0000"/>'))
+    run.insert(0, rpr)
+    new_para.append(run)
+    parent.insert(list(parent).index(paragraph._element) + 1, new_para)
+
+
+def legacy_write_contrast(doc, to_translate, results) -> None:
+    """The reversed-order loop, with paragraphs resolved through the element index"""
+    elements = paragraph_elements(doc.element.body)
+    for (typ, idx, orig), (translated_text, _refs) in zip(reversed(to_translate), reversed(results)):
+        legacy_insert(Paragraph(elements[idx][1], doc._body), translated_text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=10000)
+    args = parser.parse_args()
+
+    service = WordTranslationService("benchmark", os.environ["OPENAI_BASE_URL"])
+    print(f"document: {args.paragraphs} paragraphs")
+
+    doc = make_document(args.paragraphs)
+    segments = service.collect_segments(doc)
+    results = [(f"[{text}]", {}) for _, _, text in segments]
+    start = time.perf_counter()
+    legacy_write_contrast(doc, segments, results)
+    legacy = time.perf_counter() - start
+    print(f"legacy reversed insert:  {legacy * 1000:10.1f} ms")
+
+    doc = make_document(args.paragraphs)
+    segments = service.collect_segments(doc)
+    results = [(f"[{text}]", {}) for _, _, text in segments]
+    start = time.perf_counter()
+    service.write_contrast(doc, segments, results)
+    current = time.perf_counter() - start
+    print(f"single-pass addnext:     {current * 1000:10.1f} ms  (x{legacy / current:.1f})")
+    assert len(doc.paragraphs) == 2 * args.paragraphs
+
+
+if __name__ == "__main__":
+    main()
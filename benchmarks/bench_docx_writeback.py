@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark table write-back: repeated tables[i].rows[r].cells[c] lookups vs. the w:p element index.
+
+Run from the repository root:
+    python -m benchmarks.bench_docx_writeback --rows 500 --cols 10
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")
+
+import docx
+
+from word_translation_service import WordTranslationService
+
+
+def make_document(rows: int, cols: int):
+    doc = docx.Document()
+    doc.add_paragraph("Specification table")
+    table = doc.add_table(rows=rows, cols=cols)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = f"value {r}-{c}"
+    return doc
+
+
+def legacy_collect(doc) -> list:
+    """The original collection loop of process_document_dual_output"""
+    to_translate = []
+    for i, paragraph in enumerate(doc.paragraphs):
+        text = paragraph.text.strip()
+        if text:
+            to_translate.append(('paragraph', i, text))
+    for table_idx, table in enumerate(doc.tables):
+        for row_idx, row in enumerate(table.rows):
+            for cell_idx, cell in enumerate(row.cells):
+                for para_idx, para in enumerate(cell.paragraphs):
+                    cell_text = para.text.strip()
+                    if cell_text:
+                        to_translate.append(('table_cell', (table_idx, row_idx, cell_idx, para_idx), cell_text))
+    return to_translate
+
+
+def legacy_write_translation_only(service, doc, to_translate, results) -> None:
+    """The original translation-only write-back loop"""
+    for item, tr in zip(to_translate, results):
+        translated_text, _references = tr
+        typ, info, orig = item
+        if typ == 'paragraph':
+            if info < len(doc.paragraphs):
+                service.replace_paragraph_text_keep_format(doc.paragraphs[info], translated_text)
+        elif typ == 'table_cell':
+            table_idx, row_idx, cell_idx, para_idx = info
+            if (table_idx < len(doc.tables) and
+                    row_idx < len(doc.tables[table_idx].rows) and
+                    cell_idx < len(doc.tables[table_idx].rows[row_idx].cells) and
+                    para_idx < len(doc.tables[table_idx].rows[row_idx].cells[cell_idx].paragraphs)):
+                para = doc.tables[table_idx].rows[row_idx].cells[cell_idx].paragraphs[para_idx]
+                service.replace_paragraph_text_keep_format(para, translated_text)
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<32} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--cols", type=int, default=10)
+    args = parser.parse_args()
+
+    service = WordTranslationService("benchmark", os.environ["OPENAI_BASE_URL"])
+    print(f"table: {args.rows} rows x {args.cols} columns")
+
+    doc = make_document(args.rows, args.cols)
+    segments = timed("legacy collect", lambda: legacy_collect(doc))
+    results = [(f"[{text}]", {}) for _, _, text in segments]
+    timed("legacy write-back", lambda: legacy_write_translation_only(service, doc, segments, results))
+
+    doc = make_document(args.rows, args.cols)
+    segments = timed("indexed collect", lambda: service.collect_segments(doc))
+    results = [(f"[{text}]", {}) for _, _, text in segments]
+    timed("indexed write-back", lambda: service.write_translation_only(doc, segments, results))
+
+    doc = make_document(args.rows, args.cols)
+    segments = service.collect_segments(doc)
+    results = [(f"[{text}]", {}) for _, _, text in segments]
+    timed("indexed contrast write", lambda: service.write_contrast(doc, segments, results))
+
+
+if __name__ == "__main__":
+    main()
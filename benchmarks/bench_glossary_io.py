@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark glossary import/export: pandas + iterrows vs. openpyxl read-only/write-only
+with vectorized cleanup, and loading again from the compiled-glossary cache.
+
+Run from the repository root:
+    python -m benchmarks.bench_glossary_io --terms 50000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")
+
+import pandas as pd
+
+from benchmarks.bench_term_matcher import make_glossary
+from glossary_io import CompiledGlossaryCache, GLOSSARY_EXTENSIONS
+from glossary_manager import GlossaryManager
+from glossary_registry import GlossaryRegistry
+from term_matcher import TermMatcher
+
+
+def legacy_save(terms, output_path):
+    """The original save_glossary_to_excel"""
+    df = pd.DataFrame(terms)
+    df = df[['source_text', 'target_text']]
+    df.columns = ['Source Content', 'Target Content']
+    df.to_excel(output_path, index=False, engine='openpyxl')
+
+
+def legacy_load(excel_path):
+    """The original load_glossary_from_excel, including the matcher build of the glossary_dict setter"""
+    df = pd.read_excel(excel_path, engine='openpyxl')
+    glossary_dict = {}
+    for _, row in df.iterrows():
+        source = str(row['Source Content']).strip()
+        target = str(row['Target Content']).strip()
+        if source and target and source != 'nan' and target != 'nan':
+            glossary_dict[source] = target
+    TermMatcher(glossary_dict.keys())
+    return glossary_dict
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<36} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    glossary = make_glossary(random.Random(args.seed), args.terms)
+    terms = [{"source_text": s, "target_text": t} for s, t in glossary.items()]
+    print(f"glossary: {len(terms)} terms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CompiledGlossaryCache(os.path.join(tmp, "cache"))
+        manager = GlossaryManager(registry=GlossaryRegistry(cache))
+        legacy_path = os.path.join(tmp, "legacy.xlsx")
+        path = os.path.join(tmp, "glossary.xlsx")
+
+        timed("legacy save (pandas to_excel)", lambda: legacy_save(terms, legacy_path))
+        timed("write-only save", lambda: manager.save_glossary(terms, path))
+        expected = timed("legacy load (iterrows + matcher)", lambda: legacy_load(legacy_path))
+        loaded = timed("read-only load (cold, + matcher)", lambda: manager.load_glossary(path))
+        assert loaded == expected
+        cached = timed("load again (registry)", lambda: manager.load_glossary(path))
+        assert cached == expected and manager.find_terms_in_text(terms[0]["source_text"])
+        manager = GlossaryManager(registry=GlossaryRegistry(cache))
+        cached = timed("load in a new process (disk cache)", lambda: manager.load_glossary(path))
+        assert cached == expected
+
+        for ext in GLOSSARY_EXTENSIONS[1:]:
+            other = os.path.join(tmp, f"glossary{ext}")
+            manager.save_glossary(terms, other, "en", "zh")
+            assert timed(f"{ext} load (cold)", lambda: manager.load_glossary(other)) == expected
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark glossary highlighting in contrast output: per-run regex splitting
+(recompiled per paragraph) vs. the job-level matcher with offset mapping.
+
+Run from the repository root:
+    python -m benchmarks.bench_highlight --paragraphs 2000 --terms 5000 --per-paragraph 10
+"""
+import argparse
+import copy
+import os
+import random
+import re
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")
+
+import docx
+from docx.enum.text import WD_COLOR_INDEX
+from docx.oxml.ns import qn
+
+from benchmarks.bench_term_matcher import make_glossary, make_word
+from term_matcher import TermMatcher
+from word_translation_service import WordTranslationService
+
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def legacy_highlight(paragraph, terms) -> None:
+    """The original highlight_terms_by_run"""
+    normalized_terms = sorted((t.lower() for t in terms if t.strip()), key=len, reverse=True)
+    term_pattern = re.compile("(" + "|".join(re.escape(t) for t in normalized_terms) + ")", re.IGNORECASE)
+    for run in list(paragraph.runs):
+        original_text = run.text or ""
+        matches = list(term_pattern.finditer(original_text.lower()))
+        if not matches:
+            run.font.highlight_color = None
+            continue
+        segments = []
+        cursor = 0
+        for m in matches:
+            if m.start() > cursor:
+                segments.append((original_text[cursor:m.start()], False))
+            segments.append((original_text[m.start():m.end()], True))
+            cursor = m.end()
+        if cursor < len(original_text):
+            segments.append((original_text[cursor:], False))
+        run.text = segments[0][0]
+        run.font.highlight_color = None
+        if segments[0][1]:
+            run.font.highlight_color = WD_COLOR_INDEX.YELLOW
+        prev_r = run._element
+        for seg_text, should_highlight in segments[1:]:
+            new_r = copy.deepcopy(prev_r)
+            t = new_r.find(qn('w:t'))
+            if t is None:
+                t = docx.oxml.parse_xml(f'<w:t {W}/>')
+                new_r.append(t)
+            t.text = seg_text
+            rPr = new_r.find(qn('w:rPr'))
+            if rPr is None:
+                rPr = docx.oxml.parse_xml(f'<w:rPr {W}/>')
+                new_r.insert(0, rPr)
+            existing = rPr.find(qn('w:highlight'))
+            if existing is not None:
+                rPr.remove(existing)
+            if should_highlight:
+                rPr.append(docx.oxml.parse_xml(f'<w:highlight {W} w:val="yellow"/>'))
+            prev_r.addnext(new_r)
+            prev_r = new_r
+
+
+def make_document(rng, glossary, paragraphs, per_paragraph):
+    terms = list(glossary)
+    doc = docx.Document()
+    references = []
+    for _ in range(paragraphs):
+        words = [make_word(rng) for _ in range(rng.randint(20, 60))]
+        used = rng.sample(terms, per_paragraph)
+        for term in used:
+            words.insert(rng.randrange(len(words) + 1), term)
+        text = " ".join(words)
+        p = doc.add_paragraph()
+        # Several formatting runs per paragraph, cut at arbitrary offsets
+        cuts = sorted(rng.sample(range(1, len(text)), 4))
+        for a, b in zip([0] + cuts, cuts + [len(text)]):
+            p.add_run(text[a:b]).italic = rng.random() < 0.5
+        references.append({t: glossary[t] for t in used})
+    return doc, references
+
+
+def count_highlighted(doc) -> int:
+    return sum(1 for p in doc.paragraphs for r in p.runs if r.font.highlight_color is not None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    parser.add_argument("--terms", type=int, default=5000)
+    parser.add_argument("--per-paragraph", type=int, default=10, help="glossary terms referenced per paragraph")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    service = WordTranslationService("benchmark", os.environ["OPENAI_BASE_URL"])
+    glossary = make_glossary(random.Random(args.seed), args.terms)
+
+    doc, references = make_document(random.Random(args.seed), glossary, args.paragraphs, args.per_paragraph)
+    start = time.perf_counter()
+    for paragraph, refs in zip(doc.paragraphs, references):
+        legacy_highlight(paragraph, list(refs))
+    legacy = time.perf_counter() - start
+    print(f"legacy per-run regex:     {legacy * 1000:10.1f} ms, highlighted runs: {count_highlighted(doc)}")
+
+    doc, references = make_document(random.Random(args.seed), glossary, args.paragraphs, args.per_paragraph)
+    start = time.perf_counter()
+    ids = {}
+    for refs in references:
+        for term in refs:
+            ids.setdefault(term, len(ids))
+    matcher = TermMatcher(ids)
+    for paragraph, refs in zip(doc.paragraphs, references):
+        allowed = {ids[t] for t in refs}
+        service.highlight_terms(paragraph, matcher, allowed.__contains__)
+    current = time.perf_counter() - start
+    print(f"job matcher, offset map:  {current * 1000:10.1f} ms, highlighted runs: {count_highlighted(doc)}"
+          f"  (x{legacy / current:.1f}; includes terms split across runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark glossary lookup: per-term substring loop vs. compiled TermMatcher.
+
+Run from the repository root:
+    python -m benchmarks.bench_term_matcher --terms 50000 --segments 2000
+"""
+import argparse
+import random
+import time
+
+from term_matcher import TermMatcher
+
+SYLLABLES = ["ka", "lo", "ter", "mi", "zon", "qua", "ex", "pol", "ri", "stat",
+             "dyn", "ver", "ox", "ide", "lin", "or", "tra", "ns", "ph", "ase"]
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_glossary(rng: random.Random, size: int) -> dict:
+    glossary = {}
+    while len(glossary) < size:
+        term = " ".join(make_word(rng) for _ in range(rng.randint(1, 3)))
+        glossary[term] = term.upper()
+    return glossary
+
+
+def make_segments(rng: random.Random, glossary: dict, count: int) -> list:
+    terms = list(glossary)
+    segments = []
+    for _ in range(count):
+        words = [make_word(rng) for _ in range(rng.randint(5, 60))]
+        for _ in range(rng.randint(0, 4)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(terms).title())
+        segments.append(" ".join(words))
+    return segments
+
+
+def legacy_find_terms(glossary: dict, text: str) -> dict:
+    """The original GlossaryManager.find_terms_in_text loop"""
+    found = {}
+    for source_text, target_text in glossary.items():
+        if source_text.lower() in text.lower():
+            found[source_text] = target_text
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, default=20000)
+    parser.add_argument("--segments", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    glossary = make_glossary(rng, args.terms)
+    segments = make_segments(rng, glossary, args.segments)
+    chars = sum(len(s) for s in segments)
+    print(f"glossary: {len(glossary)} terms, segments: {len(segments)} ({chars} chars)")
+
+    start = time.perf_counter()
+    matcher = TermMatcher(glossary.keys())
+    build = time.perf_counter() - start
+    print(f"matcher build:  {build * 1000:9.1f} ms")
+
+    start = time.perf_counter()
+    fast = []
+    for s in segments:
+        fast.append({matcher.terms[i]: glossary[matcher.terms[i]] for i in matcher.find_present(s)})
+    fast_time = time.perf_counter() - start
+    print(f"matcher lookup: {fast_time * 1000:9.1f} ms  ({fast_time / len(segments) * 1e6:.1f} us/segment)")
+
+    start = time.perf_counter()
+    slow = [legacy_find_terms(glossary, s) for s in segments]
+    slow_time = time.perf_counter() - start
+    print(f"legacy loop:    {slow_time * 1000:9.1f} ms  ({slow_time / len(segments) * 1e6:.1f} us/segment)")
+
+    if fast != slow:
+        raise SystemExit("mismatch between matcher and legacy results")
+    print(f"results identical, speedup x{slow_time / fast_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Offline OpenAI-compatible chat-completions server for benchmarks.
+
+Answers translation, batched translation and term-extraction requests with
+deterministic fake output, after a log-normal latency. Injects 429 and 5xx
+responses at configurable rates and accounts prompt, cached and completion
+tokens the way a provider would. GET /stats returns the counters as JSON.
+
+Run standalone (then point OPENAI_BASE_URL at http://127.0.0.1:8765/v1):
+    python -m benchmarks.mock_llm_server --port 8765 --latency-ms 400 --rate-429 0.02
+"""
+import argparse
+import json
+import math
+import multiprocessing as mp
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from token_estimator import estimate_tokens
+
+_SOURCE_MARKER = "## 原文\n"
+_TERM_RE = re.compile(r"\b[A-Za-z][a-z]{6,}(?:\s[a-z]{6,})?\b")
+
+
+class MockConfig:
+    """Latency and failure model of the mock endpoint"""
+
+    def __init__(self, latency_ms: float = 300.0, latency_sigma: float = 0.5, ms_per_token: float = 0.0,
+                 rate_429: float = 0.0, rate_5xx: float = 0.0, seed: Optional[int] = None,
+                 stall_rate: float = 0.0, stall_seconds: float = 30.0):
+        self.latency_ms = latency_ms  # median of the log-normal latency
+        self.latency_sigma = latency_sigma
+        self.ms_per_token = ms_per_token  # extra time per completion token
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.seed = seed
+        self.stall_rate = stall_rate  # fraction of requests that hang before answering
+        self.stall_seconds = stall_seconds
+
+    @classmethod
+    def from_args(cls, args) -> "MockConfig":
+        return cls(args.latency_ms, args.latency_sigma, args.ms_per_token, args.rate_429, args.rate_5xx, args.seed,
+                   args.stall_rate, args.stall_seconds)
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+class MockState:
+    """Counters and the random source shared by all handler threads"""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.seen_prefixes = set()
+        self.counters = {
+            "requests": 0,
+            "responses_200": 0,
+            "responses_429": 0,
+            "responses_5xx": 0,
+            "stalls": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "completion_tokens": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+        }
+
+    def draw(self) -> Tuple[float, Optional[int]]:
+        """Latency in seconds and an injected error status (or None)"""
+        config = self.config
+        with self.lock:
+            latency = config.latency_ms / 1000.0 * math.exp(self.random.gauss(0.0, config.latency_sigma))
+            roll = self.random.random()
+            if self.random.random() < config.stall_rate:
+                latency += config.stall_seconds
+                self.counters["stalls"] += 1
+        if roll < config.rate_429:
+            return latency * 0.1, 429
+        if roll < config.rate_429 + config.rate_5xx:
+            return latency, 503
+        return latency, None
+
+    def count(self, **amounts) -> None:
+        with self.lock:
+            for key, amount in amounts.items():
+                self.counters[key] += amount
+            self.counters["peak_in_flight"] = max(self.counters["peak_in_flight"], self.counters["in_flight"])
+
+    def cached_tokens(self, system_prompt: str) -> int:
+        """Simulated prefix cache: a system prompt seen before is served from cache"""
+        with self.lock:
+            if system_prompt in self.seen_prefixes:
+                return estimate_tokens(system_prompt)
+            self.seen_prefixes.add(system_prompt)
+            return 0
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return dict(self.counters)
+
+
+def _source_text(user: str) -> str:
+    return user.split(_SOURCE_MARKER, 1)[1] if _SOURCE_MARKER in user else user
+
+
+def fake_completion(body: Dict) -> str:
+    """Deterministic assistant content for a chat request from this repo"""
+    messages = body.get("messages", [])
+    user = messages[-1].get("content", "") if messages else ""
+    schema = (body.get("response_format") or {}).get("json_schema", {}).get("name")
+    if schema == "batch_translation":
+        items = json.loads(_source_text(user))
+        return json.dumps([{"id": item["id"], "translation": f"〔译〕{item['text']}"} for item in items],
+                          ensure_ascii=False)
+    if schema == "term_extraction":
+        terms = list(dict.fromkeys(match.group(0) for match in _TERM_RE.finditer(user)))[:40]
+        return json.dumps([{"source_text": term, "target_text": f"{term}〔术语〕"} for term in terms],
+                          ensure_ascii=False)
+    return f"〔译〕{_source_text(user)}"
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: MockState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.state.snapshot())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        state = self.state
+        state.count(requests=1, in_flight=1)
+        try:
+            latency, error = state.draw()
+            if error is not None:
+                time.sleep(latency)
+                if error == 429:
+                    state.count(responses_429=1)
+                    self._send_json(429, {"error": {"message": "rate limited", "type": "rate_limit_exceeded"}},
+                                    {"retry-after-ms": "100"})
+                else:
+                    state.count(responses_5xx=1)
+                    self._send_json(error, {"error": {"message": "upstream overloaded", "type": "server_error"}})
+                return
+
+            messages = body.get("messages", [])
+            content = fake_completion(body)
+            prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+            completion_tokens = estimate_tokens(content)
+            system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+            cached_tokens = state.cached_tokens(system) if system else 0
+            time.sleep(latency + completion_tokens * state.config.ms_per_token / 1000.0)
+            state.count(responses_200=1, prompt_tokens=prompt_tokens, cached_tokens=cached_tokens,
+                        completion_tokens=completion_tokens)
+            self._send_json(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens,
+                          "prompt_tokens_details": {"cached_tokens": cached_tokens}},
+            })
+        finally:
+            state.count(in_flight=-1)
+
+
+class MockServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 resets connections when a benchmark opens ~100 at once, which the
+    # client would count as throttling; the mock must only fail the requests it is configured to fail
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def make_server(config: MockConfig, host: str = "127.0.0.1", port: int = 0) -> MockServer:
+    handler = type("Handler", (MockHandler,), {"state": MockState(config)})
+    return MockServer((host, port), handler)
+
+
+def _serve(config: MockConfig, port_queue) -> None:
+    server = make_server(config)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def start_in_process(config: MockConfig) -> Tuple[str, mp.Process]:
+    """Run the server in a separate process so it does not compete with the benchmark for the GIL.
+    Returns (base URL, process)."""
+    ctx = mp.get_context("spawn")
+    port_queue = ctx.Queue()
+    process = ctx.Process(target=_serve, args=(config, port_queue), daemon=True)
+    process.start()
+    port = port_queue.get(timeout=30)
+    return f"http://127.0.0.1:{port}/v1", process
+
+
+def fetch_stats(base_url: str) -> Dict:
+    import urllib.request
+    with urllib.request.urlopen(f"{base_url}/stats", timeout=10) as response:
+        return json.loads(response.read())
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="median response latency (default 300)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread of the latency")
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="extra latency per completion token")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--stall-rate", type=float, default=0.0,
+                        help="fraction of requests that hang for --stall-seconds first")
+    parser.add_argument("--stall-seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=7)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = make_server(MockConfig.from_args(args), args.host, args.port)
+    print(f"Mock chat completions on http://{args.host}:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark suite.
+
+Generates synthetic patent-like documents, starts a mock OpenAI-compatible
+server and runs each scenario in a fresh process against it:
+
+    docx        process_document_dual_output on every document at once
+    doc         extract_and_translate_doc (text extraction path) on every document
+    glossary    generate_glossary_from_text on every document's text
+
+Each scenario reports throughput, p50/p99 per-document latency, peak RSS,
+API calls (as seen by the server, including retries) and token counts. The
+results are written to JSON. Pass --compare to print the change against an
+earlier run.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks --documents 8 --latency-ms 300 --rate-429 0.02
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing as mp
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from benchmarks.mock_llm_server import MockConfig, add_arguments as add_mock_arguments, fetch_stats, start_in_process
+from benchmarks.synthetic_docx import add_arguments as add_document_arguments, document_options, make_corpus
+
+SCENARIOS = ("docx", "doc", "glossary")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100.0 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def _merge_timings(all_stats: List[Dict]) -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    for stats in all_stats:
+        for phase, seconds in stats.get("timings", {}).items():
+            timings[phase] = round(timings.get(phase, 0.0) + seconds, 4)
+    return timings
+
+
+async def _run_documents(files: List[str], run_one) -> Dict:
+    """Run run_one(path, stats) for every file at once; per-document latency and summed stats"""
+    latencies: List[float] = []
+    all_stats: List[Dict] = []
+
+    async def timed(path: str):
+        stats: Dict = {}
+        started = time.perf_counter()
+        await run_one(path, stats)
+        latencies.append(time.perf_counter() - started)
+        all_stats.append(stats)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[timed(path) for path in files])
+    wall = time.perf_counter() - started
+    segments = sum(stats.get("segments", 0) for stats in all_stats)
+    return {
+        "documents": len(files),
+        "segments": segments,
+        "wall_seconds": round(wall, 3),
+        "documents_per_second": round(len(files) / wall, 3) if wall else 0.0,
+        "segments_per_second": round(segments / wall, 1) if wall else 0.0,
+        "latency_p50": round(percentile(latencies, 50), 3),
+        "latency_p99": round(percentile(latencies, 99), 3),
+        "client_api_calls": sum(stats.get("api_calls", 0) for stats in all_stats),
+        "skipped_segments": sum(stats.get("skipped_segments", 0) for stats in all_stats),
+        "fallback_segments": sum(stats.get("fallback_segments", 0) for stats in all_stats),
+        "hedged_requests": sum(stats.get("hedged_requests", 0) for stats in all_stats),
+        "wasted_requests": sum(stats.get("wasted_requests", 0) for stats in all_stats),
+        "attempt_timeouts": sum(stats.get("attempt_timeouts", 0) for stats in all_stats),
+        # Failures without a response (refused or reset connections), apart from the server's injected 429/5xx
+        "connection_errors": sum(stats.get("connection_errors", 0) for stats in all_stats),
+        "timings": _merge_timings(all_stats),
+    }
+
+
+async def _scenario(name: str, files: List[str], options: Dict) -> Dict:
+    # Imported here so the environment (mock base URL) is set before prompt.py reads it
+    from glossary_manager import GlossaryManager
+    from glossary_registry import get_glossary_registry
+    from benchmarks.synthetic_docx import glossary_terms
+    from word_translation_service import WordTranslationService
+    from prompt import api_key, base_url
+
+    target_language = options["target_language"]
+    output_dir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    glossary = get_glossary_registry().from_entries(glossary_terms(options["glossary_terms"]))
+    service = WordTranslationService(api_key, base_url)
+    service.translator.batch_mode = options["batch_mode"]
+
+    def outputs(path: str):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(output_dir, f"{stem}_contrast.docx"), os.path.join(output_dir, f"{stem}_translation.docx")
+
+    if name == "docx":
+        async def run_one(path, stats):
+            await service.process_document_dual_output(path, *outputs(path), target_language, use_memory=False,
+                                                       stats=stats, glossary=glossary)
+    elif name == "doc":
+        # docx2txt reads the document text the same way for .doc uploads
+        async def run_one(path, stats):
+            await service.extract_and_translate_doc(path, *outputs(path), target_language, use_memory=False,
+                                                    stats=stats, glossary=glossary)
+    elif name == "glossary":
+        import docx
+        manager = GlossaryManager()
+
+        async def run_one(path, stats):
+            document = await asyncio.to_thread(docx.Document, path)
+            text = "\n".join(p.text for p in document.paragraphs if p.text.strip())
+            terms = await manager.generate_glossary_from_text(text, target_language)
+            stats["terms"] = len(terms)
+    else:
+        raise ValueError(f"Unknown scenario: {name}")
+    return await _run_documents(files, run_one)
+
+
+def run_scenario(name: str, base_url: str, files: List[str], options: Dict) -> Dict:
+    """Process-pool task: run one scenario in this fresh process and report its peak RSS"""
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["LOG_PAYLOAD_SAMPLE_RATE"] = "0"
+    import logging
+    import resource
+    logging.basicConfig(level=logging.WARNING)
+    result = asyncio.run(_scenario(name, files, options))
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["peak_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return result
+
+
+def _git_revision() -> Dict[str, object]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                    text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def run_suite(args) -> Dict:
+    mock_config = MockConfig.from_args(args)
+    options = {"target_language": args.target_language, "batch_mode": args.batch_mode,
+               "glossary_terms": args.glossary_terms}
+    results = {
+        "revision": _git_revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": {"documents": args.documents, "document": document_options(args), "mock": mock_config.to_dict(),
+                   **options},
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="bench_corpus_") as corpus:
+        files = make_corpus(corpus, args.documents, **document_options(args))
+        for name in args.scenarios:
+            # A fresh server per scenario, so counters and the simulated prefix cache start empty
+            base_url, server = start_in_process(mock_config)
+            try:
+                with ProcessPoolExecutor(1, mp_context=mp.get_context("spawn")) as pool:
+                    result = pool.submit(run_scenario, name, base_url, files, options).result()
+                server_stats = fetch_stats(base_url)
+            finally:
+                server.terminate()
+                server.join()
+            result["server"] = {key: value for key, value in server_stats.items() if key != "in_flight"}
+            results["scenarios"][name] = result
+            print(f"{name:<9} {result['documents']} docs in {result['wall_seconds']:.2f}s"
+                  f"  p50 {result['latency_p50']:.2f}s  p99 {result['latency_p99']:.2f}s"
+                  f"  {server_stats['requests']} requests ({server_stats['responses_429']} x 429,"
+                  f" {server_stats['responses_5xx']} x 5xx, {server_stats['stalls']} stalled,"
+                  f" {result['hedged_requests']} hedged, {result['connection_errors']} connection errors)"
+                  f"  peak RSS {result['peak_rss_mb']} MB")
+    return results
+
+
+COMPARED_METRICS = ("wall_seconds", "documents_per_second", "segments_per_second", "latency_p50", "latency_p99",
+                    "peak_rss_mb", "client_api_calls", "fallback_segments", "hedged_requests", "wasted_requests",
+                    "connection_errors")
+
+
+def print_comparison(previous: Dict, current: Dict) -> None:
+    print(f"\nCompared with {previous.get('revision', {}).get('commit')} ({previous.get('created')}):")
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"  {name:<9} {metric:<22} {old:>10} -> {new:<10} {change}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", dest="scenarios", action="append", choices=SCENARIOS,
+                        help="scenario to run; repeat for several (default: all)")
+    parser.add_argument("--documents", type=int, default=8, help="documents per scenario, processed concurrently")
+    parser.add_argument("--target-language", default="Chinese")
+    parser.add_argument("--glossary-terms", type=int, default=200)
+    parser.add_argument("--batch-mode", action="store_true", help="pack short segments into shared requests")
+    parser.add_argument("--output", help=f"results file (default: {RESULTS_DIR}/<commit>-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    add_document_arguments(parser)
+    add_mock_arguments(parser)
+    args = parser.parse_args(argv)
+    args.scenarios = args.scenarios or list(SCENARIOS)
+
+    results = run_suite(args)
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{results['revision']['commit'] or 'unknown'}-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic patent-like .docx files for benchmarks: long numbered claims,
+a numbered description with repeated boilerplate, large tables with merged
+cells, and embedded images.
+
+Run from the repository root:
+    python -m benchmarks.synthetic_docx out/patent.docx --claims 30 --paragraphs 400 --tables 4
+"""
+import argparse
+import io
+import os
+import random
+import struct
+import zlib
+from typing import Dict, List
+
+import docx
+from docx.shared import Inches
+
+NOUNS = [
+    "housing", "actuator", "controller", "sensor array", "drive shaft", "bearing assembly", "fastening member",
+    "heat exchanger", "valve body", "piston rod", "circuit board", "power module", "signal processor",
+    "support bracket", "sealing ring", "gear train", "cooling channel", "electrode layer", "substrate",
+    "optical waveguide", "battery cell", "charging interface", "memory unit", "communication module",
+    "feedback loop", "damping element", "locking mechanism", "guide rail", "inlet port", "outlet port",
+]
+VERBS = ["coupled to", "disposed within", "configured to engage", "in fluid communication with",
+         "electrically connected to", "rotatably mounted on", "spaced apart from", "integrally formed with"]
+BOILERPLATE = [
+    "The foregoing description of the embodiments has been provided for purposes of illustration and description.",
+    "It is not intended to be exhaustive or to limit the disclosure.",
+    "Those skilled in the art will appreciate that various modifications may be made without departing from the scope.",
+]
+
+
+def glossary_terms(count: int = 200) -> Dict[str, str]:
+    """Glossary entries for the generated vocabulary, including multi-word variants"""
+    terms = {}
+    for noun in NOUNS:
+        terms[noun] = f"{noun}〔术语〕"
+        for qualifier in ("first", "second", "upper", "lower", "main", "auxiliary"):
+            terms[f"{qualifier} {noun}"] = f"{qualifier} {noun}〔术语〕"
+    return dict(list(terms.items())[:count])
+
+
+def _png(width: int, height: int, seed: int) -> bytes:
+    """A small RGB gradient PNG, built without an imaging library"""
+    rows = b"".join(b"\x00" + bytes((x * 7 + y * 3 + seed) & 0xFF for x in range(width * 3)) for y in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def _clause(rng: random.Random) -> str:
+    numeral = rng.randrange(100, 900, 2)
+    return f"a {rng.choice(NOUNS)} ({numeral}) {rng.choice(VERBS)} the {rng.choice(NOUNS)}"
+
+
+def _claim(rng: random.Random, number: int, clauses: int) -> str:
+    if number > 1 and rng.random() < 0.7:
+        opening = f"{number}. The apparatus of claim {rng.randint(1, number - 1)}, wherein "
+    else:
+        opening = f"{number}. An apparatus comprising: "
+    return opening + "; ".join(_clause(rng) for _ in range(clauses)) + "."
+
+
+def _description(rng: random.Random, number: int) -> str:
+    if rng.random() < 0.25:
+        # Repeated boilerplate, as found in real filings
+        return f"[{number:04d}] {rng.choice(BOILERPLATE)}"
+    sentences = [f"In some embodiments, {_clause(rng)}." for _ in range(rng.randint(2, 5))]
+    return f"[{number:04d}] " + " ".join(sentences)
+
+
+def _table(doc, rng: random.Random, rows: int, cols: int) -> None:
+    table = doc.add_table(rows=rows, cols=cols)
+    table.style = "Table Grid"
+    header = table.rows[0].cells
+    header[0].merge(header[1]).text = "Component"
+    for c in range(2, cols):
+        header[c].text = rng.choice(["Material", "Tolerance (mm)", "Operating range", "Notes", "Reference"])
+    for r in range(1, rows):
+        cells = table.rows[r].cells
+        cells[0].text = f"{r:03d}"
+        cells[1].text = rng.choice(NOUNS)
+        for c in range(2, cols):
+            cells[c].text = rng.choice([f"{rng.uniform(0, 100):.2f}", "N/A", "stainless steel",
+                                        f"see claim {rng.randint(1, 20)}", rng.choice(NOUNS)])
+    # Vertical merges: group every few rows under one reference cell
+    for r in range(1, rows - 2, 5):
+        table.cell(r, cols - 1).merge(table.cell(r + 2, cols - 1)).text = f"{rng.choice(NOUNS)} group"
+
+
+def make_patent_document(path: str, claims: int = 20, paragraphs: int = 200, tables: int = 3, table_rows: int = 60,
+                         table_cols: int = 6, images: int = 4, claim_clauses: int = 12, seed: int = 0) -> str:
+    """Write a synthetic patent-like document to path and return the path"""
+    rng = random.Random(seed)
+    doc = docx.Document()
+    doc.add_heading(f"{rng.choice(NOUNS).title()} system and method of operating the same", level=0)
+    doc.add_heading("Abstract", level=1)
+    doc.add_paragraph(" ".join(f"The system includes {_clause(rng)}." for _ in range(6)))
+
+    doc.add_heading("Claims", level=1)
+    for number in range(1, claims + 1):
+        doc.add_paragraph(_claim(rng, number, claim_clauses))
+
+    doc.add_heading("Detailed Description", level=1)
+    table_every = max(paragraphs // (tables + 1), 1)
+    image_every = max(paragraphs // (images + 1), 1)
+    tables_left, images_left = tables, images
+    for number in range(1, paragraphs + 1):
+        doc.add_paragraph(_description(rng, number))
+        if tables_left and number % table_every == 0:
+            doc.add_paragraph(f"Table {tables - tables_left + 1}: component specifications")
+            _table(doc, rng, table_rows, table_cols)
+            tables_left -= 1
+        if images_left and number % image_every == 0:
+            doc.add_picture(io.BytesIO(_png(96, 64, number)), width=Inches(2.0))
+            doc.add_paragraph(f"FIG. {images - images_left + 1} is a schematic view of the {rng.choice(NOUNS)}.")
+            images_left -= 1
+    doc.save(path)
+    return path
+
+
+def make_corpus(directory: str, documents: int, **options) -> List[str]:
+    """Several documents with different seeds; some paragraphs repeat across them, like real filings"""
+    os.makedirs(directory, exist_ok=True)
+    return [make_patent_document(os.path.join(directory, f"patent_{i:03d}.docx"), seed=i, **options)
+            for i in range(documents)]
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--claims", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--tables", type=int, default=3)
+    parser.add_argument("--table-rows", type=int, default=60)
+    parser.add_argument("--table-cols", type=int, default=6)
+    parser.add_argument("--images", type=int, default=4)
+
+
+def document_options(args) -> Dict[str, int]:
+    return {"claims": args.claims, "paragraphs": args.paragraphs, "tables": args.tables,
+            "table_rows": args.table_rows, "table_cols": args.table_cols, "images": args.images}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=0)
+    add_arguments(parser)
+    args = parser.parse_args()
+    make_patent_document(args.output, seed=args.seed, **document_options(args))
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import collections
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from metrics import LLM_CIRCUIT_STATE, LLM_SHORT_CIRCUITS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+StateListener = Callable[[str, str, str], None]
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Stops calls to an endpoint while its recent error rate is too high.
+
+    Closed: calls pass and their outcomes are kept for window_seconds. When at
+    least min_calls were seen and the failure share reaches error_rate_threshold,
+    the circuit opens and calls are refused for open_seconds. Then one probe call
+    is let through (half-open): success closes the circuit, failure opens it again.
+    Safe to share between threads and event loops.
+    """
+
+    def __init__(self, name: str, error_rate_threshold: float = 0.5, min_calls: int = 20,
+                 window_seconds: float = 30.0, open_seconds: float = 30.0):
+        self.name = name
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._outcomes = collections.deque()  # (time, healthy)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._listeners: List[StateListener] = []
+        self.trips = 0
+        self.short_circuits = 0
+        LLM_CIRCUIT_STATE.labels(name).set(_STATE_VALUES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def add_listener(self, listener: StateListener) -> None:
+        """Call listener(name, old_state, new_state) on every transition, from the thread that caused it"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now. An allowed call must be followed by record()."""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+                transition = self._set_state(HALF_OPEN)
+            else:
+                transition = None
+            if self._state == HALF_OPEN:
+                # One probe at a time; a probe that never reported back (cancelled) is replaced
+                if self._probe_started is None or now - self._probe_started >= self.open_seconds:
+                    self._probe_started = now
+                    allowed = True
+                else:
+                    allowed = False
+            else:
+                allowed = self._state == CLOSED
+            if not allowed:
+                self.short_circuits += 1
+        self._notify(transition)
+        if not allowed:
+            LLM_SHORT_CIRCUITS.labels(self.name).inc()
+        return allowed
+
+    def record(self, healthy: bool) -> None:
+        """Report the outcome of an allowed call; healthy is False for overload and connection failures"""
+        with self._lock:
+            now = time.monotonic()
+            transition = None
+            if self._state == HALF_OPEN:
+                self._probe_started = None
+                transition = self._set_state(CLOSED if healthy else OPEN)
+                if not healthy:
+                    self._opened_at = now
+            elif self._state == CLOSED:
+                self._outcomes.append((now, healthy))
+                while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+                    self._outcomes.popleft()
+                failures = sum(1 for _t, ok in self._outcomes if not ok)
+                if (len(self._outcomes) >= self.min_calls
+                        and failures / len(self._outcomes) >= self.error_rate_threshold):
+                    self._opened_at = now
+                    self.trips += 1
+                    transition = self._set_state(OPEN)
+        self._notify(transition)
+
+    def retry_after(self) -> float:
+        """Seconds until calls may pass again (0 when closed or a probe is due)"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0)
+
+    def _set_state(self, state: str):
+        old, self._state = self._state, state
+        if state == CLOSED:
+            # Start counting afresh, so failures from before the outage do not trip it again
+            self._outcomes.clear()
+        return old, state, list(self._listeners)
+
+    def _notify(self, transition) -> None:
+        if transition is None:
+            return
+        old, new, listeners = transition
+        if old == new:
+            return
+        LLM_CIRCUIT_STATE.labels(self.name).set(_STATE_VALUES[new])
+        log = logger.warning if new == OPEN else logger.info
+        log(f"Circuit for {self.name}: {old} -> {new}")
+        for listener in listeners:
+            try:
+                listener(self.name, old, new)
+            except Exception as e:
+                logger.error(f"Circuit listener failed: {e}")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            failures = sum(1 for _t, ok in self._outcomes if not ok)
+            return {
+                "state": self._state,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": failures,
+                "trips": self.trips,
+                "short_circuits": self.short_circuits,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker per endpoint name"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                error_rate_threshold=float(os.environ.get("LLM_BREAKER_ERROR_RATE", "0.5")),
+                min_calls=int(os.environ.get("LLM_BREAKER_MIN_CALLS", "20")),
+                window_seconds=float(os.environ.get("LLM_BREAKER_WINDOW", "30")),
+                open_seconds=float(os.environ.get("LLM_BREAKER_OPEN_SECONDS", "30")),
+            )
+        return breaker
+
+
+def breaker_snapshots() -> Dict[str, Dict]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
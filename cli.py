@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Headless batch translation of Word documents.
+
+Documents are parsed and written in a process pool while every LLM call runs
+on one shared async pipeline (one client, one concurrency and rate limit).
+With several target languages each document's segments are collected once
+and all its languages are translated at once. The writing task parses the
+source a second time (see write_documents).
+
+Examples:
+    python cli.py filings/ -l chinese -o out/
+    python cli.py "filings/**/*.docx" -l japanese -l korean --glossary terms.xlsx --mode contrast --report report.json
+    python cli.py filings/ -l chinese --estimate   # requests, tokens, cost and time only; no API calls
+
+Exit status is 1 when any document failed or any segment fell back to its source text.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_EXTENSIONS = ('.docx', '.doc')
+OUTPUT_MODES = ('both', 'contrast', 'translation')
+# Per-document stats summed into the report totals
+SUMMED_STATS = ('segments', 'unique_segments', 'dedup_saved', 'skipped_segments', 'memory_hits', 'memory_misses',
+                'resumed_segments',
+                'api_calls', 'prompt_tokens', 'cached_tokens', 'completion_tokens', 'cost_usd', 'fallback_segments',
+                'hedged_requests', 'wasted_requests', 'attempt_timeouts', 'deadline_fallbacks',
+                'circuit_open_fallbacks', 'short_circuited_calls')
+
+# Re-runs after the first one, from RETRANSLATE_ATTEMPTS (runs in total) in word_translation_service.py
+RETRANSLATE_RUNS = max(int(os.environ.get("RETRANSLATE_ATTEMPTS", "3")) - 1, 0)
+
+_worker_service = None
+
+
+def _service():
+    """Per-process WordTranslationService used for parsing and writing (no API calls)"""
+    global _worker_service
+    if _worker_service is None:
+        from prompt import api_key, base_url
+        from word_translation_service import WordTranslationService
+        _worker_service = WordTranslationService(api_key, base_url)
+    return _worker_service
+
+
+def prepare_document(file_path: str) -> List[Tuple]:
+    """Process-pool task: parse a .docx and collect its segments"""
+    import docx
+    return _service().collect_segments(docx.Document(file_path))
+
+
+def write_documents(file_path: str, to_translate: List[Tuple],
+                    languages: Dict[str, Tuple[List[tuple], Optional[str], Optional[str], List[int]]]
+                    ) -> Dict[str, Tuple[Dict, Optional[str]]]:
+    """Process-pool task: re-parse the source once and write the requested outputs of every language.
+    This second parse is deliberate: a parsed document cannot be pickled back from prepare_document, and
+    shipping its body XML would still need the package (styles, media, relationships) re-opened here plus
+    an XML serialize/parse round trip, which costs about as much as the parse itself (~1% of a document's
+    local work on the benchmark corpus; timed as 'parse' in the write timings).
+    languages maps a language to (translated_results, contrast path, translation-only path, positions
+    the pre-filter kept as they are, which get no translation in the contrast output).
+    Returns {language: (phase timings, error message or None)}."""
+    import copy
+    import docx
+    from word_translation_service import phase_timer, replace_body
+    parsed: Dict = {}
+    with phase_timer(parsed, 'parse'):
+        doc = docx.Document(file_path)
+    # Writing changes the body, so every language after the first starts from a copy of the original
+    pristine_body = copy.deepcopy(doc.element.body) if len(languages) > 1 else None
+    written = {}
+    for i, (language, language_outputs) in enumerate(languages.items()):
+        translated_results, contrast_output_path, translation_only_output_path, skipped_positions = language_outputs
+        stats = {'timings': dict(parsed['timings'])}
+        try:
+            if i:
+                replace_body(doc, copy.deepcopy(pristine_body))
+            _service().write_outputs(doc, to_translate, translated_results, contrast_output_path,
+                                     translation_only_output_path, stats, set(skipped_positions))
+        except Exception as e:
+            written[language] = (stats['timings'], str(e))
+            continue
+        written[language] = (stats['timings'], None)
+    return written
+
+
+def expand_inputs(inputs: List[str]) -> List[str]:
+    """Resolve directories (searched recursively), globs and plain paths to a sorted list of documents"""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = glob.glob(os.path.join(item, '**', '*'), recursive=True)
+        else:
+            candidates = glob.glob(item, recursive=True) or [item]
+        for path in candidates:
+            name = os.path.basename(path)
+            if (os.path.isfile(path) and path.lower().endswith(DOCUMENT_EXTENSIONS)
+                    and not name.startswith('~$')):  # skip Word lock files
+                found.add(os.path.abspath(path))
+    return sorted(found)
+
+
+def output_paths(file_path: str, output_dir: str, target_language: str, mode: str) -> Tuple[Optional[str], Optional[str]]:
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    base = os.path.join(output_dir, f"{stem}_{target_language.replace(' ', '_')}")
+    contrast = f"{base}_contrast.docx" if mode in ('both', 'contrast') else None
+    translation_only = f"{base}_translation.docx" if mode in ('both', 'translation') else None
+    return contrast, translation_only
+
+
+class BatchRunner:
+    """Runs document jobs, each into one or more target languages, with a bounded number of documents in flight"""
+
+    def __init__(self, service, pool: ProcessPoolExecutor, output_dir: str, mode: str, max_documents: int,
+                 use_memory: bool = True, refresh_memory: bool = False, glossary=None):
+        self.service = service
+        self.pool = pool
+        self.output_dir = output_dir
+        self.mode = mode
+        self.use_memory = use_memory
+        self.refresh_memory = refresh_memory
+        # Glossary snapshot shared by every document of the run
+        self.glossary = glossary
+        # Bounds memory: only this many parsed documents and result lists exist at once
+        self.documents = asyncio.Semaphore(max_documents)
+
+    async def run_document(self, file_path: str, target_languages: List[str],
+                           stats: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+        """Translate one document into every target language; returns one report per language.
+        stats maps a language to stats that may carry usage from an earlier run of it."""
+        async with self.documents:
+            started = time.perf_counter()
+            stats = stats if stats is not None else {}
+            reports = {}
+            outputs = {}
+            for language in target_languages:
+                reports[language] = {'file': file_path, 'target_language': language, 'status': 'ok',
+                                     'stats': stats.setdefault(language, {})}
+                outputs[language] = output_paths(file_path, self.output_dir, language, self.mode)
+            try:
+                if file_path.lower().endswith('.doc'):
+                    # .doc text extraction goes through docx2txt on the shared loop
+                    await self.service.process_document_languages(
+                        file_path, outputs, use_memory=self.use_memory, refresh_memory=self.refresh_memory,
+                        stats=stats, glossary=self.glossary, extract_text=True)
+                else:
+                    await self._run_docx(file_path, outputs, stats, reports)
+            except Exception as e:
+                logger.error(f"{os.path.basename(file_path)} failed: {e}")
+                for report in reports.values():
+                    if report['status'] == 'ok':
+                        report['status'] = 'failed'
+                        report['error'] = str(e)
+            seconds = round(time.perf_counter() - started, 2)
+            for language, report in reports.items():
+                if report['status'] == 'ok':
+                    report['outputs'] = [path for path in outputs[language] if path]
+                report['seconds'] = seconds
+                logger.info(f"{os.path.basename(file_path)} [{language}]: {report['status']}, "
+                            f"{report['stats'].get('segments', 0)} segments, "
+                            f"{report['stats'].get('fallback_segments', 0)} fallbacks, {seconds}s")
+            return list(reports.values())
+
+    async def _run_docx(self, file_path: str, outputs: Dict[str, Tuple[Optional[str], Optional[str]]],
+                        stats: Dict[str, Dict], reports: Dict[str, Dict]) -> None:
+        """Parse and collect once, translate every language at once, then write every language from one
+        more parse of the source"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        to_translate = await loop.run_in_executor(self.pool, prepare_document, file_path)
+        prepare_seconds = time.perf_counter() - started
+        for language in outputs:
+            stats[language].setdefault('timings', {})['prepare'] = prepare_seconds
+        if not to_translate:
+            return
+        # Hashing the document is file I/O, kept off the shared loop
+        job_ids = await asyncio.to_thread(self.service.job_ids, file_path, list(outputs), self.glossary)
+        finished: Dict[str, List[tuple]] = {}
+
+        async def collect(language: str, translated_results: List[tuple]) -> None:
+            finished[language] = translated_results
+
+        try:
+            await self.service.translate_languages(
+                [item[2] for item in to_translate], list(outputs), use_memory=self.use_memory,
+                refresh_memory=self.refresh_memory, stats=stats, job_ids=job_ids, glossary=self.glossary,
+                on_language=collect)
+        finally:
+            # Languages that finished are written even when another one failed
+            if finished:
+                await self._write(file_path, to_translate, outputs, finished, stats, reports, job_ids)
+
+    async def _write(self, file_path: str, to_translate: List[Tuple],
+                     outputs: Dict[str, Tuple[Optional[str], Optional[str]]], finished: Dict[str, List[tuple]],
+                     stats: Dict[str, Dict], reports: Dict[str, Dict], job_ids: Dict[str, Optional[str]]) -> None:
+        # One pool task re-parses the source and writes every language (see write_documents for why)
+        loop = asyncio.get_running_loop()
+        written = await loop.run_in_executor(
+            self.pool, write_documents, file_path, to_translate,
+            {language: (translated_results, *outputs[language], stats[language].get('skipped_positions', []))
+             for language, translated_results in finished.items()})
+        for language, (timings, error) in written.items():
+            if error is not None:
+                logger.error(f"{os.path.basename(file_path)} [{language}] failed: {error}")
+                reports[language].update(status='failed', error=error)
+                continue
+            language_timings = stats[language]['timings']
+            for phase, seconds in timings.items():
+                language_timings[phase] = language_timings.get(phase, 0.0) + seconds
+            await self.service.finish_job(job_ids[language], stats[language])
+
+
+def summarize(reports: List[Dict], wall_seconds: float) -> Dict:
+    totals = {key: 0 for key in SUMMED_STATS}
+    for report in reports:
+        for key in SUMMED_STATS:
+            totals[key] += report['stats'].get(key, 0)
+    totals['cost_usd'] = round(totals['cost_usd'], 6)
+    model_calls: Dict[str, int] = {}
+    for report in reports:
+        for name, count in report['stats'].get('model_calls', {}).items():
+            model_calls[name] = model_calls.get(name, 0) + count
+    totals['model_calls'] = model_calls
+    return {
+        'documents': len(reports),
+        'failed_documents': sum(1 for report in reports if report['status'] != 'ok'),
+        'wall_seconds': round(wall_seconds, 2),
+        'totals': totals,
+        'documents_detail': reports,
+    }
+
+
+def print_summary(summary: Dict) -> None:
+    totals = summary['totals']
+    print(f"\nDocuments: {summary['documents']} ({summary['failed_documents']} failed)"
+          f" in {summary['wall_seconds']}s")
+    print(f"Segments:  {totals['segments']} ({totals['unique_segments']} unique,"
+          f" {totals['skipped_segments']} kept as they are by the pre-filter,"
+          f" {totals['memory_hits']} from memory, {totals['resumed_segments']} resumed)")
+    print(f"Requests:  {totals['api_calls']} API calls, {totals['prompt_tokens']} prompt"
+          f" ({totals['cached_tokens']} cached) + {totals['completion_tokens']} completion tokens")
+    print(f"Cost:      ${totals['cost_usd']:.4f}")
+    print(f"Tail:      {totals['hedged_requests']} hedged requests ({totals['wasted_requests']} wasted),"
+          f" {totals['attempt_timeouts']} attempt timeouts")
+    from prompt import model
+    if set(totals['model_calls']) - {model}:
+        print("Routing:   " + ", ".join(f"{name} {count}" for name, count in totals['model_calls'].items()))
+    print(f"Fallbacks: {totals['fallback_segments']} segments left in source text"
+          f" ({totals['deadline_fallbacks']} after the job deadline,"
+          f" {totals['circuit_open_fallbacks']} while every route's circuit was open)")
+    for report in summary['documents_detail']:
+        if report['status'] != 'ok' or report['stats'].get('fallback_segments'):
+            detail = report.get('error') or f"{report['stats'].get('fallback_segments')} fallback segments"
+            print(f"  {report['file']} [{report['target_language']}]: {detail}")
+
+
+async def run_batch(args, files: List[str]) -> Dict:
+    from prompt import api_key, base_url
+    from glossary_manager import GlossaryManager
+    from job_journal import JobJournal
+    from translation_memory import TranslationMemory
+    from word_translation_service import WordTranslationService
+
+    glossary_manager = GlossaryManager()
+    glossary = glossary_manager.registry.load(args.glossary) if args.glossary else None
+    memory = TranslationMemory() if args.memory else None
+    service = WordTranslationService(api_key, base_url, glossary_manager, memory, JobJournal())
+    if args.batch_mode:
+        service.translator.batch_mode = True
+    if not args.segment_filter:
+        service.segment_filter = None
+    if args.deadline is not None:
+        service.translator.job_deadline = args.deadline
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(args.workers, mp_context=mp.get_context('spawn')) as pool:
+        runner = BatchRunner(service, pool, args.output_dir, args.mode, args.max_documents,
+                             use_memory=args.memory, refresh_memory=args.refresh_memory, glossary=glossary)
+        # One job per document: its segments are collected once and translated into every language at once
+        reports = [report for document in await asyncio.gather(*[runner.run_document(path, args.target_languages)
+                                                                 for path in files])
+                   for report in document]
+        reports = await retranslate_fallbacks(runner, reports, args.retranslate)
+    # Commit the translations and checkpoints still queued for the writer threads
+    if memory is not None:
+        await asyncio.to_thread(memory.close)
+    await asyncio.to_thread(service.job_journal.close)
+    return summarize(reports, time.perf_counter() - started)
+
+
+async def retranslate_fallbacks(runner: BatchRunner, reports: List[Dict], attempts: int) -> List[Dict]:
+    """Run documents with untranslated segments again, after the API had time to recover.
+    Only the languages with fallbacks run again, and their finished segments come from the
+    job journal, so only the fallbacks are requested."""
+    from job_estimator import carry_usage
+    for attempt in range(attempts):
+        retry: Dict[str, List[int]] = {}  # file -> indices of its reports to run again
+        for i, report in enumerate(reports):
+            if report['status'] == 'ok' and report['stats'].get('fallback_positions'):
+                retry.setdefault(report['file'], []).append(i)
+        if not retry:
+            break
+        delay = runner.service.retranslate_delay(attempt)
+        logger.info(f"{len(retry)} documents have untranslated segments; retrying in {delay:.0f}s")
+        await asyncio.sleep(delay)
+        rerun = await asyncio.gather(*[
+            runner.run_document(file_path, [reports[i]['target_language'] for i in indices],
+                                {reports[i]['target_language']: carry_usage(reports[i]['stats']) for i in indices})
+            for file_path, indices in retry.items()])
+        for indices, document in zip(retry.values(), rerun):
+            for i, report in zip(indices, document):
+                report['attempts'] = reports[i].get('attempts', 1) + 1
+                reports[i] = report
+    return reports
+
+
+async def run_estimate(args, files: List[str]) -> Dict:
+    """Dry run: parse every document and estimate requests, tokens, cost and time without calling the API"""
+    from prompt import api_key, base_url
+    from glossary_manager import GlossaryManager
+    from job_estimator import combine_estimates
+    from job_journal import JobJournal
+    from translation_memory import TranslationMemory
+    from word_translation_service import WordTranslationService
+
+    glossary_manager = GlossaryManager()
+    glossary = glossary_manager.registry.load(args.glossary) if args.glossary else None
+    memory = TranslationMemory() if args.memory else None
+    service = WordTranslationService(api_key, base_url, glossary_manager, memory, JobJournal())
+    if args.batch_mode:
+        service.translator.batch_mode = True
+    if not args.segment_filter:
+        service.segment_filter = None
+
+    reports = []
+    for path in files:
+        try:
+            # Parsed and collected once for every target language
+            estimates = await asyncio.to_thread(service.estimate_document_languages, path, args.target_languages,
+                                                args.memory, args.refresh_memory, glossary)
+        except Exception as e:
+            logger.error(f"{os.path.basename(path)} could not be estimated: {e}")
+            reports.extend({'file': path, 'target_language': language, 'status': 'failed', 'error': str(e)}
+                           for language in args.target_languages)
+            continue
+        reports.extend({'file': path, 'target_language': language, 'status': 'ok', 'estimate': estimate}
+                       for language, estimate in estimates.items())
+    estimates = [report['estimate'] for report in reports if report['status'] == 'ok']
+    # Documents of one run share the concurrency limit and quotas, so the total is not a plain sum
+    totals = combine_estimates(estimates)
+    totals['local_seconds'] = round(sum(estimate['local_seconds'] for estimate in estimates) / args.workers, 1)
+    return {
+        'documents': len(reports),
+        'failed_documents': sum(1 for report in reports if report['status'] != 'ok'),
+        'totals': totals,
+        'documents_detail': reports,
+    }
+
+
+def print_estimate(summary: Dict) -> None:
+    for report in summary['documents_detail']:
+        if report['status'] != 'ok':
+            print(f"  {report['file']} [{report['target_language']}]: {report['error']}")
+            continue
+        estimate = report['estimate']
+        print(f"  {os.path.basename(report['file'])} [{report['target_language']}]: {estimate['segments']} segments,"
+              f" {estimate['requests']} requests, {estimate['prompt_tokens'] + estimate['completion_tokens']} tokens,"
+              f" ${estimate['cost_usd']:.4f}, ~{estimate['total_seconds']}s")
+    totals = summary['totals']
+    print(f"\nDocuments: {summary['documents']} ({summary['failed_documents']} failed)")
+    print(f"Segments:  {totals['segments']} ({totals['unique_segments']} unique,"
+          f" {totals['skipped_segments']} kept as they are by the pre-filter,"
+          f" {totals['memory_hits']} from memory, {totals['resumed_segments']} resumed)")
+    print(f"Requests:  {totals['requests']} API calls, {totals['prompt_tokens']} prompt"
+          f" + {totals['completion_tokens']} completion tokens (estimated)")
+    print(f"Cost:      ${totals['cost_usd']:.4f} before prompt-cache discounts")
+    print(f"Time:      ~{totals['seconds'] + totals['local_seconds']:.0f}s at concurrency {totals['concurrency']}"
+          f" (limited by {totals['bottleneck']}), ~{totals['seconds_at_max_concurrency']:.0f}s of API time"
+          f" at {totals['max_concurrency']}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='documents, directories or glob patterns')
+    parser.add_argument('-l', '--target-language', dest='target_languages', action='append', required=True,
+                        help='target language; repeat for several (translated together in one job per document)')
+    parser.add_argument('-o', '--output-dir', default='translated', help='output directory (default: translated)')
+    parser.add_argument('--mode', choices=OUTPUT_MODES, default='both',
+                        help='outputs to write: contrast, translation only, or both (default)')
+    parser.add_argument('--glossary', help='glossary file: .xlsx/.csv/.tsv (Source Content / Target Content) or .tbx')
+    parser.add_argument('--workers', type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                        help='processes for parsing and writing documents')
+    parser.add_argument('--max-documents', type=int, default=8,
+                        help='documents in flight at once; bounds memory use (default 8)')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='bypass the translation memory')
+    parser.add_argument('--refresh-memory', action='store_true', help='re-translate and overwrite memory entries')
+    parser.add_argument('--batch-mode', action='store_true', help='pack short segments into shared requests')
+    parser.add_argument('--no-segment-filter', dest='segment_filter', action='store_false',
+                        help='send every segment to the LLM, including numbers, reference numerals, units, formulas,'
+                             ' URLs, part numbers and text already in the target language')
+    parser.add_argument('--deadline', type=float,
+                        help='seconds per document translation; unfinished segments keep their source text'
+                             ' (default: TRANSLATION_JOB_DEADLINE, 0 = none)')
+    parser.add_argument('--retranslate', type=int, default=RETRANSLATE_RUNS,
+                        help='times to re-run documents whose segments fell back to the source text, waiting for'
+                             f' the API to recover first (default {RETRANSLATE_RUNS})')
+    parser.add_argument('--report', help='write the JSON summary report to this file')
+    parser.add_argument('--estimate', action='store_true',
+                        help='only estimate requests, tokens, cost and time; no API calls, no outputs')
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help='serve Prometheus-style metrics on this port while the batch runs (default: off)')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from logging_setup import setup_logging
+    setup_logging(logging.INFO)
+    args = build_parser().parse_args(argv)
+    args.target_languages = list(dict.fromkeys(args.target_languages))
+    files = expand_inputs(args.inputs)
+    if not files:
+        logger.error("No .doc/.docx documents found")
+        return 2
+    if args.estimate:
+        logger.info(f"Estimating {len(files)} documents into {', '.join(args.target_languages)}")
+        summary = asyncio.run(run_estimate(args, files))
+        print_estimate(summary)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+        return 1 if summary['failed_documents'] else 0
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.metrics_port:
+        from metrics import start_metrics_server
+        start_metrics_server(args.metrics_port)
+    logger.info(f"Translating {len(files)} documents into {', '.join(args.target_languages)}")
+
+    summary = asyncio.run(run_batch(args, files))
+    print_summary(summary)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    failed = summary['failed_documents'] or summary['totals']['fallback_segments']
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import asyncio
+import collections
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+SUCCESS = "success"
+THROTTLED = "throttled"
+ERROR = "error"
+
+
+def classify_exception(exc: BaseException) -> str:
+    """Map an API exception onto a limiter outcome: THROTTLED for overload signals, ERROR otherwise"""
+    if isinstance(exc, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                        asyncio.TimeoutError, TimeoutError)):
+        return THROTTLED
+    if isinstance(exc, openai.APIStatusError):
+        status = getattr(exc, "status_code", None) or 0
+        if status == 429 or status >= 500:
+            return THROTTLED
+    return ERROR
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on concurrent LLM calls.
+
+    The limit grows by about one slot per window of healthy completions and is
+    cut multiplicatively on 429s, 5xx responses and timeouts. The limiter is
+    safe to share between threads and event loops.
+    """
+
+    def __init__(self, initial_limit: int = 100, min_limit: int = 1, max_limit: int = 100,
+                 decrease_factor: float = 0.5, latency_tolerance: float = 2.0,
+                 error_rate_threshold: float = 0.1, cooldown: float = 2.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance  # healthy while latency <= tolerance * baseline
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown  # at most one decrease per cooldown window
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()  # (loop, future)
+        self._last_decrease = 0.0
+        self._latency_baseline: Optional[float] = None
+        self._error_rate = 0.0
+        self.in_flight = 0
+        self.throttle_events = 0
+        self.successes = 0
+        self.errors = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    async def acquire(self, priority: bool = False) -> None:
+        """Wait for a free slot. With priority the caller gets the next slot ahead of the queued callers."""
+        with self._lock:
+            if self.in_flight < self.limit and (priority or not self._waiters):
+                self.in_flight += 1
+                return
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            waiter = (loop, future)
+            if priority:
+                self._waiters.appendleft(waiter)
+            else:
+                self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    granted = False
+                else:
+                    # A slot was handed over; if the future is cancelled, _grant gives it back
+                    granted = future.done() and not future.cancelled()
+            if granted:
+                self.release(None)
+            raise
+
+    def release(self, outcome: Optional[str], latency: Optional[float] = None) -> None:
+        """Free a slot and adapt the limit. outcome None releases without feedback (e.g. cancellation)."""
+        with self._lock:
+            self.in_flight -= 1
+            if outcome is not None:
+                self._adapt(outcome, latency)
+            self._wake_waiters()
+
+    def _adapt(self, outcome: str, latency: Optional[float]) -> None:
+        self._error_rate = 0.9 * self._error_rate + (0.0 if outcome == SUCCESS else 0.1)
+        if outcome == SUCCESS:
+            self.successes += 1
+            healthy = self._error_rate <= self.error_rate_threshold
+            if latency is not None:
+                if self._latency_baseline is None:
+                    self._latency_baseline = latency
+                else:
+                    healthy = healthy and latency <= self._latency_baseline * self.latency_tolerance
+                    self._latency_baseline = 0.95 * self._latency_baseline + 0.05 * latency
+            if healthy and self._limit < self.max_limit:
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+        elif outcome == THROTTLED:
+            self.throttle_events += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self._last_decrease = now
+                old = self.limit
+                self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+                logger.warning(f"LLM throttled, concurrency limit {old} -> {self.limit}")
+        else:
+            self.errors += 1
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            loop, future = self._waiters.popleft()
+            self.in_flight += 1
+            loop.call_soon_threadsafe(self._grant, future)
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.done():
+            # Waiter was cancelled before the slot reached it
+            self.release(None)
+        else:
+            future.set_result(None)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Current limit, in-flight and waiting counts, and throttle/error counters"""
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "throttle_events": self.throttle_events,
+                "successes": self.successes,
+                "errors": self.errors,
+            }
+
+
+_shared_limiters: Dict[Optional[str], AdaptiveConcurrencyLimiter] = {}
+_shared_lock = threading.Lock()
+
+
+def get_limiter(endpoint: Optional[str] = None) -> AdaptiveConcurrencyLimiter:
+    """Process-wide limiter shared by every LLM call site. Fallback endpoints (see
+    llm_client.Route) get their own, so an outage of one does not throttle the others."""
+    with _shared_lock:
+        limiter = _shared_limiters.get(endpoint)
+        if limiter is None:
+            limiter = _shared_limiters[endpoint] = AdaptiveConcurrencyLimiter(
+                initial_limit=int(os.environ.get("LLM_CONCURRENCY_INITIAL", "100")),
+                min_limit=int(os.environ.get("LLM_CONCURRENCY_MIN", "1")),
+                max_limit=int(os.environ.get("LLM_CONCURRENCY_MAX", "100")),
+            )
+        return limiter
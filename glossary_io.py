@@ -0,0 +1,188 @@
+import csv
+import hashlib
+import logging
+import os
+import pickle
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from job_journal import file_digest
+from term_matcher import TermMatcher
+
+logger = logging.getLogger(__name__)
+
+GLOSSARY_EXTENSIONS = (".xlsx", ".csv", ".tsv", ".tbx")
+SOURCE_COLUMN = "Source Content"
+TARGET_COLUMN = "Target Content"
+ALTERNATIVES_COLUMN = "Alternatives"
+
+DEFAULT_CACHE_DIR = os.environ.get("GLOSSARY_CACHE_DIR", os.path.join("cache", "glossaries"))
+# Bump when the cached structure changes, so old cache files are ignored
+CACHE_VERSION = "1"
+
+_XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+# TBX 2 (martif) and TBX 3 element names for entries, language sections and terms
+_TBX_ENTRY_TAGS = ("termEntry", "conceptEntry")
+_TBX_LANG_TAGS = ("langSet", "langSec")
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _clean_entries(sources, targets) -> Dict[str, str]:
+    """Vectorized cleanup: stringify, strip, drop empty/NaN rows; later duplicates win"""
+    frame = pd.DataFrame({"source": sources, "target": targets}, dtype=object)
+    frame = frame.dropna()
+    source = frame["source"].astype(str).str.strip()
+    target = frame["target"].astype(str).str.strip()
+    keep = (source != "") & (target != "") & (source != "nan") & (target != "nan")
+    return dict(zip(source[keep], target[keep]))
+
+
+def _column_index(header, path: str) -> Tuple[int, int]:
+    header = [str(cell).strip() if cell is not None else "" for cell in header]
+    if SOURCE_COLUMN not in header or TARGET_COLUMN not in header:
+        raise ValueError(f"{os.path.basename(path)} must contain columns: {[SOURCE_COLUMN, TARGET_COLUMN]}")
+    return header.index(SOURCE_COLUMN), header.index(TARGET_COLUMN)
+
+
+def _read_xlsx(path: str) -> Dict[str, str]:
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError(f"{os.path.basename(path)} is empty")
+        source_idx, target_idx = _column_index(header, path)
+        width = max(source_idx, target_idx) + 1
+        sources, targets = [], []
+        for row in rows:
+            if len(row) < width:
+                continue
+            sources.append(row[source_idx])
+            targets.append(row[target_idx])
+    finally:
+        workbook.close()
+    return _clean_entries(sources, targets)
+
+
+def _read_delimited(path: str, sep: str) -> Dict[str, str]:
+    frame = pd.read_csv(path, sep=sep, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    frame.columns = [str(column).strip() for column in frame.columns]
+    _column_index(list(frame.columns), path)
+    return _clean_entries(frame[SOURCE_COLUMN], frame[TARGET_COLUMN])
+
+
+def _read_tbx(path: str) -> Dict[str, str]:
+    """First term of the first two language sections of each entry, as source and target"""
+    sources, targets = [], []
+    for _event, element in ET.iterparse(path, events=("end",)):
+        if _local_name(element.tag) not in _TBX_ENTRY_TAGS:
+            continue
+        terms = []
+        for lang_section in element.iter():
+            if _local_name(lang_section.tag) not in _TBX_LANG_TAGS:
+                continue
+            term = next((e.text for e in lang_section.iter() if _local_name(e.tag) == "term"), None)
+            terms.append(term)
+        if len(terms) >= 2:
+            sources.append(terms[0])
+            targets.append(terms[1])
+        element.clear()
+    return _clean_entries(sources, targets)
+
+
+def read_glossary(path: str) -> Dict[str, str]:
+    """Load {source: target} from an .xlsx, .csv, .tsv or .tbx glossary"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".xlsx":
+        return _read_xlsx(path)
+    if ext == ".csv":
+        return _read_delimited(path, ",")
+    if ext == ".tsv":
+        return _read_delimited(path, "\t")
+    if ext == ".tbx":
+        return _read_tbx(path)
+    raise ValueError(f"Unsupported glossary format: {ext} (expected one of {', '.join(GLOSSARY_EXTENSIONS)})")
+
+
+def _rows(terms: List[Dict[str, str]]) -> Tuple[List[str], List[List[str]]]:
+    with_alternatives = any("alternatives" in term for term in terms)
+    header = [SOURCE_COLUMN, TARGET_COLUMN] + ([ALTERNATIVES_COLUMN] if with_alternatives else [])
+    rows = [[term["source_text"], term["target_text"]] + ([term.get("alternatives", "")] if with_alternatives else [])
+            for term in terms]
+    return header, rows
+
+
+def _write_tbx(terms: List[Dict[str, str]], path: str, source_lang: str, target_lang: str) -> None:
+    root = ET.Element("martif", {"type": "TBX", _XML_LANG: source_lang})
+    body = ET.SubElement(ET.SubElement(root, "text"), "body")
+    for i, term in enumerate(terms):
+        entry = ET.SubElement(body, "termEntry", {"id": f"t{i + 1}"})
+        for lang, text in ((source_lang, term["source_text"]), (target_lang, term["target_text"])):
+            lang_set = ET.SubElement(entry, "langSet", {_XML_LANG: lang})
+            ET.SubElement(ET.SubElement(lang_set, "tig"), "term").text = text
+        if term.get("alternatives"):
+            ET.SubElement(lang_set, "note").text = f"Alternatives: {term['alternatives']}"
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def write_glossary(terms: List[Dict[str, str]], path: str, source_lang: str = "und",
+                   target_lang: str = "und") -> str:
+    """Write terms ({source_text, target_text[, alternatives]}) as .xlsx, .csv, .tsv or .tbx"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".tbx":
+        _write_tbx(terms, path, source_lang, target_lang)
+        return path
+    header, rows = _rows(terms)
+    if ext == ".xlsx":
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
+    elif ext in (".csv", ".tsv"):
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f, delimiter="\t" if ext == ".tsv" else ",")
+            writer.writerow(header)
+            writer.writerows(rows)
+    else:
+        raise ValueError(f"Unsupported glossary format: {ext} (expected one of {', '.join(GLOSSARY_EXTENSIONS)})")
+    return path
+
+
+class CompiledGlossaryCache:
+    """On-disk cache of parsed glossaries and their compiled term matchers, keyed by file content"""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR):
+        self.directory = directory
+
+    def key(self, path: str) -> str:
+        ext = os.path.splitext(path)[1].lower()
+        return hashlib.sha256(f"{CACHE_VERSION}:{ext}:{file_digest(path)}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, str], Optional[TermMatcher]]]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable glossary cache entry {key}: {e}")
+            return None
+
+    def put(self, key: str, glossary: Dict[str, str], matcher: Optional[TermMatcher]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((glossary, matcher), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
@@ -1,20 +1,114 @@
-import pandas as pd
 import json
 import asyncio
+import re
+import unicodedata
+from collections import Counter
 from typing import List, Dict, Tuple, Optional
-from openai import AsyncOpenAI
-from prompt import term_prompt, api_key, base_url, model
+from prompt import term_prompt, api_key, base_url
+from term_matcher import TermMatcher
+from concurrency import AdaptiveConcurrencyLimiter, get_limiter
+from circuit_breaker import CircuitOpenError
+from llm_client import backoff_delay, get_routes, routed_completion
+from metrics import LLM_RETRIES
+from token_estimator import estimate_tokens
+from glossary_io import write_glossary
+from glossary_registry import Glossary, GlossaryRegistry, get_glossary_registry
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_term(text: str) -> str:
+    """Canonical form of a term for merging: NFKC, collapsed whitespace, case-folded"""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+def chunk_paragraphs(text: str, max_tokens: int, overlap: int = 1) -> List[str]:
+    """Split text into chunks of whole paragraphs of up to max_tokens (estimated).
+
+    Consecutive chunks share `overlap` paragraphs so terms at a boundary keep their
+    context; a single paragraph longer than max_tokens becomes its own chunk.
+    """
+    paragraphs = [p.strip() for p in text.split("\n") if p.strip()]
+    chunks = []
+    start = 0
+    while start < len(paragraphs):
+        end = start
+        tokens = 0
+        while end < len(paragraphs):
+            size = estimate_tokens(paragraphs[end])
+            if end > start and tokens + size > max_tokens:
+                break
+            tokens += size
+            end += 1
+        chunks.append("\n".join(paragraphs[start:end]))
+        if end >= len(paragraphs):
+            break
+        # Step back for the overlap, but always make progress
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def merge_term_lists(term_lists: List[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+    """Merge per-chunk term lists: deduplicate by normalized source, keep the most frequent
+    translation (first seen on ties) and list the other translations under 'alternatives'.
+    """
+    sources: Dict[str, Counter] = {}   # normalized source -> surface forms
+    targets: Dict[str, Counter] = {}   # normalized source -> normalized target counts
+    surface: Dict[str, str] = {}       # normalized target -> first surface form
+    for terms in term_lists:
+        for term in terms:
+            if not isinstance(term, dict):
+                continue
+            source = str(term.get("source_text") or "").strip()
+            target = str(term.get("target_text") or "").strip()
+            if not source or not target:
+                continue
+            key = normalize_term(source)
+            target_key = normalize_term(target)
+            sources.setdefault(key, Counter())[source] += 1
+            targets.setdefault(key, Counter())[target_key] += 1
+            surface.setdefault(target_key, target)
+
+    merged = []
+    for key, forms in sources.items():
+        # Counter.most_common keeps insertion order among equal counts
+        ranked = [surface[t] for t, _ in targets[key].most_common()]
+        merged.append({
+            "source_text": forms.most_common(1)[0][0],
+            "target_text": ranked[0],
+            "alternatives": "; ".join(ranked[1:]),
+        })
+    return merged
+
 class GlossaryManager:
     """Glossary management without database dependency"""
     
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+    def __init__(self, limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                 registry: Optional[GlossaryRegistry] = None):
+        # Primary model, then the fallback routes used while its circuit is open
+        self.routes = get_routes(api_key, base_url)
+        self.limiter = limiter or get_limiter()
+        self.registry = registry or get_glossary_registry()
+        self.term_matcher: Optional[TermMatcher] = None
         self.glossary_dict = {}  # {source_text: target_text}
+
+        # Long documents are split into overlapping chunks that are extracted in parallel
+        self.CHUNK_TOKENS = int(os.environ.get("GLOSSARY_CHUNK_TOKENS", "3000"))
+        self.CHUNK_OVERLAP = int(os.environ.get("GLOSSARY_CHUNK_OVERLAP", "1"))
+
+    @property
+    def glossary_dict(self) -> Dict[str, str]:
+        return self._glossary_dict
+
+    @glossary_dict.setter
+    def glossary_dict(self, value: Dict[str, str]) -> None:
+        """Replace the glossary and compile its term matcher once, up front"""
+        self._glossary_dict = value
+        self.term_matcher = TermMatcher(value.keys()) if value else None
         
     async def extract_terms_with_gemini(self, text: str, tgt_lang: str, max_retries: int = 3) -> List[Dict[str, str]]:
         """Extract and translate terms using Gemini 2.0 structured output with retry mechanism"""
@@ -41,8 +135,9 @@ class GlossaryManager:
         
         for attempt in range(max_retries):
             try:
-                response = await self.client.chat.completions.create(
-                    model=model,
+                response, _route = await routed_completion(
+                    self.routes,
+                    self.limiter,
                     messages=[
                         {"role": "system", "content": term_prompt.format(tgt_lang=tgt_lang)},
                         {"role": "user", "content": text}
@@ -51,6 +146,10 @@ class GlossaryManager:
                 )
                 result = json.loads(response.choices[0].message.content)
                 return result
+            except CircuitOpenError as e:
+                # Every route is down; retrying now would only be refused again
+                logging.error(f"Term extraction skipped: {e}")
+                return []
             except Exception as e:
                 import traceback
                 logging.error(f"Attempt {attempt + 1}/{max_retries} failed: {e}")
@@ -61,71 +160,72 @@ class GlossaryManager:
                     logging.error(f"All {max_retries} attempts failed for extract_terms_with_gemini")
                     return []
                 
-                # Wait before retry (exponential backoff)
-                await asyncio.sleep(2 ** attempt)
+                # Wait before retry (exponential backoff with jitter)
+                LLM_RETRIES.labels("extract_terms").inc()
+                await asyncio.sleep(backoff_delay(attempt))
         
         return []
 
     async def generate_glossary_from_text(self, text: str, tgt_lang: str) -> List[Dict[str, str]]:
-        """Generate glossary from text using AI extraction (auto-detect source language)"""
-        terms = await self.extract_terms_with_gemini(text, tgt_lang)
+        """Generate glossary from text using AI extraction (auto-detect source language)
+
+        The text is split into overlapping paragraph chunks that are extracted concurrently
+        (within the shared concurrency limit) and merged; terms translated inconsistently
+        across chunks keep the most frequent translation and list the others as alternatives.
+        """
+        chunks = chunk_paragraphs(text, self.CHUNK_TOKENS, self.CHUNK_OVERLAP)
+        if not chunks:
+            return []
+        term_lists = await asyncio.gather(*[self.extract_terms_with_gemini(chunk, tgt_lang) for chunk in chunks])
+        terms = merge_term_lists(term_lists)
+        conflicts = sum(1 for term in terms if term["alternatives"])
+        logger.info(f"Extracted {len(terms)} terms from {len(chunks)} chunks ({conflicts} with conflicting translations)")
         return terms
 
-    def save_glossary_to_excel(self, terms: List[Dict[str, str]], output_path: str) -> str:
-        """Save glossary terms to Excel file"""
+    def save_glossary(self, terms: List[Dict[str, str]], output_path: str, source_lang: str = "und",
+                      target_lang: str = "und") -> str:
+        """Save glossary terms as .xlsx, .csv, .tsv or .tbx (by extension)"""
         try:
-            # Create DataFrame with required columns
-            df = pd.DataFrame(terms)
-            
-            # Ensure we have the required columns
-            if not df.empty:
-                df = df[['source_text', 'target_text']]
-                df.columns = ['Source Content', 'Target Content']
-            else:
-                # Create empty DataFrame with required columns
-                df = pd.DataFrame(columns=['Source Content', 'Target Content'])
-            
-            # Save to Excel
-            df.to_excel(output_path, index=False, engine='openpyxl')
+            write_glossary(terms, output_path, source_lang, target_lang)
             logger.info(f"Glossary saved to {output_path}")
             return output_path
         except Exception as e:
-            logger.error(f"Error saving glossary to Excel: {e}")
+            logger.error(f"Error saving glossary to {output_path}: {e}")
             raise
 
-    def load_glossary_from_excel(self, excel_path: str) -> Dict[str, str]:
-        """Load glossary from Excel file and return as dictionary"""
+    def save_glossary_to_excel(self, terms: List[Dict[str, str]], output_path: str) -> str:
+        """Save glossary terms to Excel file"""
+        return self.save_glossary(terms, output_path)
+
+    def load_glossary(self, path: str) -> Dict[str, str]:
+        """Load a .xlsx, .csv, .tsv or .tbx glossary and make it the active one.
+
+        Parsing and matcher compilation go through the glossary registry, so a
+        glossary already loaded (or cached on disk) is not parsed again.
+        """
         try:
-            df = pd.read_excel(excel_path, engine='openpyxl')
-            # Check if required columns exist
-            required_columns = ['Source Content', 'Target Content']
-            if not all(col in df.columns for col in required_columns):
-                raise ValueError(f"Excel file must contain columns: {required_columns}")
-            
-            # Convert to dictionary
-            glossary_dict = {}
-            for _, row in df.iterrows():
-                source = str(row['Source Content']).strip()
-                target = str(row['Target Content']).strip()
-                if source and target and source != 'nan' and target != 'nan':
-                    glossary_dict[source] = target
-            
-            self.glossary_dict = glossary_dict
-            logger.info(f"Loaded {len(glossary_dict)} terms from Excel")
-            return glossary_dict
+            glossary = self.registry.load(path)
+            self._glossary_dict, self.term_matcher = glossary.glossary_dict, glossary.term_matcher
+            logger.info(f"Loaded {len(glossary)} terms from {os.path.basename(path)}")
+            return self._glossary_dict
         except Exception as e:
-            logger.error(f"Error loading glossary from Excel: {e}")
+            logger.error(f"Error loading glossary from {path}: {e}")
             raise
 
+    def snapshot(self) -> Glossary:
+        """Immutable snapshot of the active glossary, for jobs that must not see later changes"""
+        return self.registry.from_entries(self.glossary_dict)
+
+    def load_glossary_from_excel(self, excel_path: str) -> Dict[str, str]:
+        """Load glossary from Excel file and return as dictionary"""
+        return self.load_glossary(excel_path)
+
     def find_terms_in_text(self, text: str) -> Dict[str, str]:
         """Find terms from loaded glossary in the given text"""
-        found_translations = {}
-        
-        for source_text, target_text in self.glossary_dict.items():
-            if source_text.lower() in text.lower():
-                found_translations[source_text] = target_text
-        
-        return found_translations
+        if self.term_matcher is None:
+            return {}
+        terms = self.term_matcher.terms
+        return {terms[i]: self.glossary_dict[terms[i]] for i in self.term_matcher.find_present(text)}
 
 
 
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+
+from glossary_io import CompiledGlossaryCache, read_glossary
+from term_matcher import TermMatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("GLOSSARY_REGISTRY_MAX_MB", "1024")) * 1024 * 1024)
+
+
+class Glossary:
+    """Immutable glossary snapshot: entries plus the compiled matcher.
+
+    Snapshots never change after creation, so a job can hold one for its whole
+    run and look terms up without locks while other sessions load different
+    glossaries.
+    """
+
+    __slots__ = ("key", "glossary_dict", "term_matcher", "nbytes")
+
+    def __init__(self, key: str, entries: Mapping[str, str], matcher: Optional[TermMatcher]):
+        self.key = key
+        entries = dict(entries)
+        self.glossary_dict = MappingProxyType(entries)
+        self.term_matcher = matcher
+        self.nbytes = _memory_size(entries, matcher)
+
+    def find_terms_in_text(self, text: str) -> Dict[str, str]:
+        """Find glossary terms present in the given text"""
+        if self.term_matcher is None:
+            return {}
+        terms = self.term_matcher.terms
+        return {terms[i]: self.glossary_dict[terms[i]] for i in self.term_matcher.find_present(text)}
+
+    def __len__(self) -> int:
+        return len(self.glossary_dict)
+
+
+def _memory_size(entries: Dict[str, str], matcher: Optional[TermMatcher]) -> int:
+    """Estimated in-memory bytes of a loaded glossary: entry dict and target strings plus the
+    automaton, which holds the source terms"""
+    size = sys.getsizeof(entries) + sum(map(sys.getsizeof, entries.values()))
+    if matcher is None:
+        return size + sum(map(sys.getsizeof, entries))
+    return size + matcher.memory_size()
+
+
+def entries_key(entries: Mapping[str, str]) -> str:
+    """Content hash of an in-memory glossary"""
+    payload = json.dumps(sorted(entries.items()), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GlossaryRegistry:
+    """Compiled glossaries keyed by content hash, shared by every session and job.
+
+    Sessions and jobs keep only the key (or a Glossary snapshot); identical
+    glossaries are compiled once. Least recently used glossaries are dropped
+    from memory once their estimated in-memory size exceeds max_bytes and are reloaded
+    from the on-disk compiled cache when needed again.
+    """
+
+    def __init__(self, cache: Optional[CompiledGlossaryCache] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache = cache or CompiledGlossaryCache()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._glossaries: "OrderedDict[str, Glossary]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Glossary]:
+        with self._lock:
+            glossary = self._glossaries.get(key)
+            if glossary is not None:
+                self._glossaries.move_to_end(key)
+                self.hits += 1
+            return glossary
+
+    def load(self, path: str) -> Glossary:
+        """Snapshot of the glossary file at path, compiling it only if no session has it yet"""
+        key = self.cache.key(path)
+        glossary = self.get(key)
+        if glossary is not None:
+            return glossary
+        cached = self.cache.get(key)
+        if cached is None:
+            entries = read_glossary(path)
+            matcher = TermMatcher(entries.keys()) if entries else None
+            self.cache.put(key, entries, matcher)
+        else:
+            entries, matcher = cached
+        return self._add(Glossary(key, entries, matcher))
+
+    def from_entries(self, entries: Mapping[str, str]) -> Glossary:
+        """Snapshot of an in-memory glossary, e.g. one just generated from a document"""
+        key = entries_key(entries)
+        glossary = self.get(key)
+        if glossary is not None:
+            return glossary
+        matcher = TermMatcher(entries.keys()) if entries else None
+        self.cache.put(key, dict(entries), matcher)
+        return self._add(Glossary(key, entries, matcher))
+
+    def _add(self, glossary: Glossary) -> Glossary:
+        with self._lock:
+            existing = self._glossaries.get(glossary.key)
+            if existing is not None:
+                # Another session compiled the same glossary meanwhile
+                return existing
+            self.misses += 1
+            self._glossaries[glossary.key] = glossary
+            self._bytes += glossary.nbytes
+            # Evict least recently used, always keeping the glossary just added
+            while self._bytes > self.max_bytes and len(self._glossaries) > 1:
+                _key, evicted = self._glossaries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+                logger.info(f"Glossary registry evicted {len(evicted)}-term glossary {_key[:12]}")
+        return glossary
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "glossaries": len(self._glossaries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_shared_registry: Optional[GlossaryRegistry] = None
+_shared_lock = threading.Lock()
+
+
+def get_glossary_registry() -> GlossaryRegistry:
+    """Process-wide glossary registry"""
+    global _shared_registry
+    with _shared_lock:
+        if _shared_registry is None:
+            _shared_registry = GlossaryRegistry()
+        return _shared_registry
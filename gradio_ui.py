@@ -4,70 +4,221 @@ import os
 import tempfile
 import shutil
 
-from word_translation_service import WordTranslationService
+from word_translation_service import FALLBACK_MARKER, RETRANSLATE_ATTEMPTS, WordTranslationService
 from glossary_manager import GlossaryManager
-from prompt import api_key, base_url
+from translation_memory import TranslationMemory
+from job_journal import JobJournal
+from job_estimator import USAGE_KEYS, carry_usage, combine_estimates
+from job_manager import Job, JobManager
+from glossary_io import GLOSSARY_EXTENSIONS
+from prompt import api_key, base_url, model
 import logging
 
 class GradioTranslationApp:
     def __init__(self):
         self.glossary_manager = GlossaryManager()
-        self.translator = WordTranslationService(api_key, base_url, self.glossary_manager)
+        self.translation_memory = TranslationMemory()
+        self.job_journal = JobJournal()
+        self.translator = WordTranslationService(api_key, base_url, self.glossary_manager, self.translation_memory,
+                                                 self.job_journal)
+        # Background job queue; every LLM call runs on its event loop so all jobs share the API clients
+        self.jobs = JobManager(self._run_job)
         
-    async def translate_document(self, file_path, target_lang, translation_type):
+    async def translate_document(self, file_path, target_lang, translation_type,
+                                 use_memory=True, refresh_memory=False, progress=None, stats=None, glossary=None):
         """Translate document and return output file paths"""
+        if stats is None:
+            stats = {}
+        output_files, message = await self.translate_document_languages(
+            file_path, [target_lang], translation_type, use_memory, refresh_memory, progress=progress,
+            stats={target_lang: stats}, glossary=glossary)
+        return output_files[target_lang], message
+    
+    async def translate_document_languages(self, file_path, target_langs, translation_type,
+                                           use_memory=True, refresh_memory=False, progress=None, stats=None,
+                                           glossary=None):
+        """Translate a document into several languages in one pass (parsed and matched against the glossary once).
+        Returns ({language: output file path}, message); stats maps each language to its stats."""
+        if stats is None:
+            stats = {}
         # Create temporary directory for outputs
         temp_dir = tempfile.mkdtemp()
         
         # Get original filename without extension
         original_name = os.path.splitext(os.path.basename(file_path))[0]
         
-        # Define output paths
-        contrast_output = os.path.join(temp_dir, f"{original_name}_contrast.docx")
-        translation_only_output = os.path.join(temp_dir, f"{original_name}_translation.docx")
-        
         # Check file extension and process accordingly
         file_ext = os.path.splitext(file_path)[1].lower()
+        if file_ext not in ('.doc', '.docx'):
+            raise ValueError("Unsupported file format. Please upload a .doc or .docx file.")
         
-        if file_ext == '.docx':
-            # Process DOCX file
-            results = await self.translator.process_document_dual_output(
-                file_path, 
-                contrast_output, 
-                translation_only_output,
-                target_lang
-            )
-        elif file_ext == '.doc':
-            # Process DOC file
-            results = await self.translator.extract_and_translate_doc(
+        # Define output paths; the language goes into the name only when there are several
+        outputs = {}
+        for lang in target_langs:
+            stem = f"{original_name}_{lang}" if len(target_langs) > 1 else original_name
+            outputs[lang] = (os.path.join(temp_dir, f"{stem}_contrast.docx"),
+                             os.path.join(temp_dir, f"{stem}_translation.docx"))
+            stats.setdefault(lang, {})
+        
+        try:
+            results = await self.translator.process_document_languages(
                 file_path,
-                contrast_output,
-                translation_only_output,
-                target_lang
+                outputs,
+                use_memory=use_memory,
+                refresh_memory=refresh_memory,
+                stats=stats,
+                progress=progress,
+                glossary=glossary,
+                extract_text=file_ext == '.doc'
             )
-        else:
-            raise ValueError("Unsupported file format. Please upload a .doc or .docx file.")
+        except ImportError:
+            raise Exception("Processing .doc files requires docx2txt: pip install docx2txt")
+        
+        messages = []
+        for lang in target_langs:
+            message = self.format_result(results[lang], stats[lang], use_memory)
+            messages.append(f"[{lang}] {message}" if len(target_langs) > 1 else message)
         
         # Return appropriate file based on translation type
-        if translation_type == "Contrast (Original + Translation)":
-            return contrast_output, f"Translation completed! {len(results)} paragraphs processed."
-        else:
-            return translation_only_output, f"Translation completed! {len(results)} paragraphs processed."
-            
+        contrast = translation_type == "Contrast (Original + Translation)"
+        output_files = {lang: paths[0] if contrast else paths[1] for lang, paths in outputs.items()}
+        return output_files, "\n\n".join(messages)
     
-    def sync_translate_document(self, file, target_lang, translation_type):
-        """Synchronous wrapper for the async translation function"""
+    def format_result(self, results, stats, use_memory):
+        """Completion message of one translated language"""
+        message = f"Translation completed! {len(results)} paragraphs processed."
+        if stats.get('dedup_saved'):
+            message += f" {stats['dedup_saved']} duplicate segments reused."
+        if stats.get('resumed_segments'):
+            message += f" Resumed {stats['resumed_segments']} segments from an interrupted run."
+        if stats.get('skipped_segments'):
+            rules = ", ".join(f"{rule} {count}" for rule, count in stats['skip_rules'].items())
+            message += (f" {stats['skipped_segments']} segments needed no translation and were kept as they are"
+                        f" ({rules}).")
+        message += f"\n{self.format_usage(stats)}"
+        if stats.get('fallback_positions'):
+            message += (f"\n{len(stats['fallback_positions'])} segments could not be translated and keep their"
+                        f" source text, marked {FALLBACK_MARKER.strip()}. Translating the document again retries"
+                        f" only those segments.")
+        if set(stats.get('model_calls', {})) - {model}:
+            calls = ", ".join(f"{name} {count}" for name, count in stats['model_calls'].items())
+            message += f"\nCalls per model (fallback routing was used): {calls}."
+        if stats.get('estimate'):
+            message += f"\nEstimated before start: {self.format_estimate(stats['estimate'])}"
+        if stats.get('timings'):
+            phases = ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in stats['timings'].items())
+            message += f"\nTimings: {phases}"
+        if use_memory:
+            message += (f" Translation memory: {stats.get('memory_hits', 0)} hits,"
+                        f" {stats.get('memory_misses', 0)} misses.")
+        return message
+    
+    @staticmethod
+    def format_usage(stats):
+        """One-line token and cost summary of a finished translation"""
+        usage = (f"Usage: {stats.get('api_calls', 0)} API calls, {stats.get('prompt_tokens', 0)} prompt"
+                 f" + {stats.get('completion_tokens', 0)} completion tokens, ${stats.get('cost_usd', 0.0):.4f}.")
+        if stats.get('cached_tokens'):
+            usage += f" {stats['cached_tokens']} prompt tokens served from the provider's prompt cache."
+        if stats.get('hedged_requests'):
+            usage += (f" {stats['hedged_requests']} slow calls hedged"
+                      f" ({stats.get('wasted_requests', 0)} duplicate requests discarded).")
+        if stats.get('deadline_fallbacks'):
+            usage += f" {stats['deadline_fallbacks']} segments passed the job deadline and kept their source text."
+        return usage
+    
+    @staticmethod
+    def format_estimate(estimate):
+        """One-line summary of a pre-flight estimate"""
+        text = (f"{estimate['requests']} requests, ~{estimate['prompt_tokens']} prompt"
+                f" + ~{estimate['completion_tokens']} completion tokens, ~${estimate['cost_usd']:.4f},"
+                f" ~{estimate.get('total_seconds', estimate['seconds']):.0f}s")
+        if estimate.get('bottleneck'):
+            text += f" (limited by {estimate['bottleneck']} at concurrency {estimate['concurrency']})"
+        return text
+    
+    async def handle_estimate(self, file, target_lang, use_memory=True, refresh_memory=False, glossary_state=None):
+        """Async UI handler: dry run that predicts requests, tokens, cost and time without API calls"""
+        if file is None:
+            return "Please upload a document first."
+        file_path = getattr(file, "name", file)
+        if os.path.splitext(file_path)[1].lower() not in ('.doc', '.docx'):
+            return "Unsupported file format. Please upload a .doc or .docx file."
+        try:
+            glossary = await asyncio.to_thread(self.session_glossary, glossary_state)
+            estimate = await asyncio.to_thread(self.translator.estimate_document, file_path, target_lang,
+                                               use_memory, refresh_memory, glossary)
+        except Exception as e:
+            logging.error(f"Error estimating {file_path}: {e}")
+            return f"Error: {str(e)}"
+        message = (f"Estimate: {estimate['segments']} segments ({estimate['unique_segments']} unique,"
+                   f" {estimate['skipped_segments']} need no translation,"
+                   f" {estimate['memory_hits']} from memory, {estimate['resumed_segments']} resumed).\n"
+                   f"{self.format_estimate(estimate)}.")
+        if estimate['seconds_at_max_concurrency'] < estimate['seconds']:
+            message += (f" Up to ~{estimate['seconds_at_max_concurrency']:.0f}s of API time once the limit"
+                        f" grows to {estimate['max_concurrency']}.")
+        return message
+    
+    async def _run_job(self, job: Job):
+        """JobManager handler: translate one queued document into each of its target languages"""
+        target_langs = job.params["target_lang"]
+        if isinstance(target_langs, str):
+            target_langs = [target_langs]
+        languages = job.stats.setdefault('languages', {})
+        if job.attempts:
+            # Re-run only the languages whose segments fell back; finished segments are resumed from the job journal
+            target_langs = [lang for lang in target_langs if languages.get(lang, {}).get('fallback_positions')]
+            for lang in target_langs:
+                languages[lang] = carry_usage(languages[lang])
+        # Pre-flight estimate, shown while the job runs and kept in its results
+        # The document is parsed, filtered and matched against the glossary once for all languages
+        estimates = await asyncio.to_thread(
+            self.translator.estimate_document_languages, job.file_path, target_langs,
+            job.params["use_memory"], job.params["refresh_memory"], job.params.get("glossary"))
+        for lang, estimate in estimates.items():
+            languages.setdefault(lang, {})['estimate'] = estimate
+        estimates = list(estimates.values())
+        job.stats['estimate'] = estimates[0] if len(estimates) == 1 else combine_estimates(estimates)
+        job.message = f"Estimated: {self.format_estimate(job.stats['estimate'])}"
+        output_files, message = await self.translate_document_languages(
+            job.file_path,
+            target_langs,
+            job.params["translation_type"],
+            job.params["use_memory"],
+            job.params["refresh_memory"],
+            progress=job.set_progress,
+            stats={lang: languages[lang] for lang in target_langs},
+            glossary=job.params.get("glossary")
+        )
+        # A re-run replaces the outputs of its languages only
+        all_langs = list(languages)
+        previous = dict(zip(all_langs, job.outputs))
+        previous.update(output_files)
+        job.outputs = [previous[lang] for lang in all_langs if lang in previous]
+        for key in USAGE_KEYS:
+            job.stats[key] = sum(stats.get(key, 0) for stats in languages.values())
+        job.message = message
+        fallbacks = sum(len(stats.get('fallback_positions', [])) for stats in languages.values())
+        # job.attempts counts earlier runs; this one is counted once the handler returns
+        if fallbacks and job.attempts + 1 < RETRANSLATE_ATTEMPTS:
+            delay = self.translator.retranslate_delay(job.attempts)
+            job.message += f"\nRe-translating the {fallbacks} untranslated segments in {delay:.0f}s."
+            self.jobs.retry_later(job, delay)
+    
+    async def handle_translate_document(self, file, target_lang, translation_type, use_memory=True,
+                                        refresh_memory=False, glossary_state=None):
+        """Async UI handler: translate one document on the shared job loop"""
         if file is None:
             return None, "Please upload a document first."
         
         try:
-            # Run the async function
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            output_file, message = loop.run_until_complete(
-                self.translate_document(file.name, target_lang, translation_type)
+            glossary = await asyncio.to_thread(self.session_glossary, glossary_state)
+            # Run on the job manager's loop so the API clients and limits are shared with batch jobs
+            output_file, message = await self.jobs.call(
+                self.translate_document(file.name, target_lang, translation_type, use_memory, refresh_memory,
+                                        glossary=glossary)
             )
-            loop.close()
             
             if output_file and os.path.exists(output_file):
                 return output_file, message
@@ -79,76 +230,142 @@ class GradioTranslationApp:
             logging.error(f"Error: {traceback.format_exc()}")
             return None, f"Error: {str(e)}"
     
-    def sync_generate_glossary(self, file, target_lang):
-        """Generate glossary from uploaded document (synchronous wrapper)"""
+    @staticmethod
+    def read_document_text(file_path):
+        """Plain text of a .doc/.docx document, or None for unsupported formats"""
+        file_ext = os.path.splitext(file_path)[1].lower()
+        
+        if file_ext == '.docx':
+            import docx
+            doc = docx.Document(file_path)
+            return '\n'.join([para.text for para in doc.paragraphs if para.text.strip()])
+        elif file_ext == '.doc':
+            import docx2txt
+            return docx2txt.process(file_path)
+        return None
+    
+    async def handle_generate_glossary(self, file, target_lang, export_format=".xlsx"):
+        """Async UI handler: generate glossary from uploaded document"""
         if file is None:
             return None, "Please upload a document first."
         
         try:
-            # Read document content
-            file_ext = os.path.splitext(file.name)[1].lower()
-            
-            if file_ext == '.docx':
-                import docx
-                doc = docx.Document(file.name)
-                text = '\n'.join([para.text for para in doc.paragraphs if para.text.strip()])
-            elif file_ext == '.doc':
-                import docx2txt
-                text = docx2txt.process(file.name)
-            else:
+            # Read document content without blocking the event loop
+            text = await asyncio.to_thread(self.read_document_text, file.name)
+            if text is None:
                 return None, "Unsupported file format. Please upload a .doc or .docx file."
             
             if not text.strip():
                 return None, "Document appears to be empty."
             
-            # Generate glossary using AI in a new thread
-            import concurrent.futures
-            import threading
-            
-            def run_async_in_thread():
-                # Create new event loop for this thread
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    return loop.run_until_complete(
-                        self.glossary_manager.generate_glossary_from_text(text, target_lang)
-                    )
-                finally:
-                    loop.close()
-            
-            # Run in executor to avoid event loop conflicts
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(run_async_in_thread)
-                terms = future.result(timeout=300)  # 5 minute timeout
+            # Generate glossary using AI on the shared job loop
+            terms = await asyncio.wait_for(
+                self.jobs.call(self.glossary_manager.generate_glossary_from_text(text, target_lang)),
+                timeout=300  # 5 minute timeout
+            )
             
             if not terms:
                 return None, "No terms found in the document."
             
-            # Create temporary Excel file
+            # Create temporary glossary file in the chosen format
             temp_dir = tempfile.mkdtemp()
             original_name = os.path.splitext(os.path.basename(file.name))[0]
-            excel_path = os.path.join(temp_dir, f"{original_name}_glossary.xlsx")
+            glossary_path = os.path.join(temp_dir, f"{original_name}_glossary{export_format}")
             
-            # Save to Excel
-            self.glossary_manager.save_glossary_to_excel(terms, excel_path)
+            await asyncio.to_thread(self.glossary_manager.save_glossary, terms, glossary_path,
+                                    target_lang=target_lang)
             
-            return excel_path, f"Glossary generated successfully! Found {len(terms)} terms."
+            message = f"Glossary generated successfully! Found {len(terms)} terms."
+            conflicts = sum(1 for term in terms if term.get("alternatives"))
+            if conflicts:
+                message += f" {conflicts} terms had conflicting translations; see the Alternatives column."
+            return glossary_path, message
             
         except Exception as e:
             import traceback
             logging.error(f"Error generating glossary: {traceback.format_exc()}")
             return None, f"Error generating glossary: {str(e)}"
     
+    def submit_batch(self, files, target_lang, translation_type, use_memory=True, refresh_memory=False,
+                     glossary_state=None):
+        """Queue several documents as background jobs and return immediately.
+        target_lang may list several languages: each document is then one job producing every language."""
+        if not files:
+            return "Please upload at least one document.", self.job_rows()
+        if not target_lang:
+            return "Please select at least one target language.", self.job_rows()
+        
+        paths = [getattr(f, "name", f) for f in files]
+        unsupported = [os.path.basename(p) for p in paths if os.path.splitext(p)[1].lower() not in ('.doc', '.docx')]
+        if unsupported:
+            return f"Unsupported file format: {', '.join(unsupported)}", self.job_rows()
+        
+        try:
+            glossary = self.session_glossary(glossary_state)
+        except Exception as e:
+            return f"Error loading glossary: {str(e)}", self.job_rows()
+        
+        job_ids = self.jobs.submit_many(
+            paths,
+            target_lang=target_lang,
+            translation_type=translation_type,
+            use_memory=use_memory,
+            refresh_memory=refresh_memory,
+            glossary=glossary
+        )
+        return f"Queued {len(job_ids)} jobs: {', '.join(job_ids)}", self.job_rows()
+    
+    def job_rows(self):
+        """Job table rows for the batch tab"""
+        return [[job["id"], job["file"], job["status"], job["progress"], job["elapsed"], job["tokens"],
+                 job["cost_usd"], job["estimated_cost_usd"], job["message"]]
+                for job in self.jobs.list_jobs()]
+    
+    def job_outputs(self, job_id):
+        """Output files of one job, or of all finished jobs when no ID is given"""
+        job_id = (job_id or "").strip()
+        if job_id:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None, f"Unknown job ID: {job_id}"
+            if not job.finished:
+                done, total = job.progress
+                return None, f"Job {job_id} is {job.status} ({done}/{total} segments)."
+            snapshots = [job.snapshot()]
+        else:
+            snapshots = [job for job in self.jobs.list_jobs() if job["status"] == "done"]
+        files = [path for job in snapshots for path in job["outputs"] if os.path.exists(path)]
+        if not files:
+            return None, snapshots[0]["message"] if job_id else "No finished jobs yet."
+        return files, f"{len(files)} output files."
+    
     def load_glossary(self, file):
-        """Load glossary from uploaded Excel file"""
+        """Load glossary from uploaded .xlsx/.csv/.tsv/.tbx file into this session.
+        
+        Returns the status message and the session state: the glossary's registry key and path.
+        Other sessions are not affected.
+        """
         if file is None:
-            return "Please upload a glossary Excel file first."
+            return "Please upload a glossary file first.", None
         
         try:
-            glossary_dict = self.glossary_manager.load_glossary_from_excel(file.name)
-            return f"Glossary loaded successfully! {len(glossary_dict)} terms available for translation."
+            path = getattr(file, "name", file)
+            glossary = self.glossary_manager.registry.load(path)
+            state = {"key": glossary.key, "path": path}
+            return f"Glossary loaded successfully! {len(glossary)} terms available for translation.", state
         except Exception as e:
-            return f"Error loading glossary: {str(e)}"
+            return f"Error loading glossary: {str(e)}", None
+    
+    def session_glossary(self, glossary_state):
+        """Snapshot of the session's glossary, taken at submission; None when the session has none"""
+        if not glossary_state:
+            return None
+        registry = self.glossary_manager.registry
+        glossary = registry.get(glossary_state["key"])
+        if glossary is None:
+            # Evicted meanwhile: reload, normally from the compiled cache
+            glossary = registry.load(glossary_state["path"])
+        return glossary
 
 def create_interface():
     """Create and configure the Gradio interface"""
@@ -293,6 +510,12 @@ def create_interface():
                             info="Language to generate glossary for"
                         )
                         
+                        glossary_export_format = gr.Radio(
+                            choices=list(GLOSSARY_EXTENSIONS),
+                            value=".xlsx",
+                            label="Glossary Format"
+                        )
+                        
                         generate_glossary_btn = gr.Button(
                             "📋 Generate Glossary",
                             variant="primary",
@@ -310,7 +533,7 @@ def create_interface():
                         )
                         
                         glossary_download = gr.File(
-                            label="Download Glossary Excel",
+                            label="Download Glossary",
                             interactive=False
                         )
                         
@@ -320,7 +543,7 @@ def create_interface():
                             1. Upload your document
                             2. Select target language (source will be auto-detected)
                             3. Click "Generate Glossary" to extract terms
-                            4. Download the Excel file
+                            4. Download the glossary file
                             5. Edit the glossary as needed
                             6. Use it in the translation tab
                             """
@@ -355,12 +578,24 @@ def create_interface():
                             info="Choose between translation only or side-by-side comparison"
                         )
                         
+                        with gr.Row():
+                            use_memory = gr.Checkbox(
+                                value=True,
+                                label="Use translation memory",
+                                info="Reuse stored translations of identical segments"
+                            )
+                            refresh_memory = gr.Checkbox(
+                                value=False,
+                                label="Refresh translation memory",
+                                info="Re-translate everything and overwrite stored entries"
+                            )
+                        
                         # Glossary upload section
                         gr.Markdown("### Optional: Upload Custom Glossary")
                         
                         glossary_file = gr.File(
-                            label="Upload Glossary Excel (Optional)",
-                            file_types=[".xlsx"],
+                            label="Upload Glossary (Optional)",
+                            file_types=list(GLOSSARY_EXTENSIONS),
                             type="filepath"
                         )
                         
@@ -371,11 +606,19 @@ def create_interface():
                             lines=2
                         )
                         
+                        # Per-session glossary: registry key and path, never the shared manager
+                        glossary_state = gr.State(None)
+                        
                         translate_btn = gr.Button(
                             "🔄 Translate Document",
                             variant="primary",
                             size="lg"
                         )
+                        
+                        estimate_btn = gr.Button(
+                            "🧮 Estimate Cost & Time",
+                            variant="secondary"
+                        )
                     
                     with gr.Column(scale=1):
                         # Output section
@@ -393,12 +636,82 @@ def create_interface():
                             interactive=False
                         )
         
+            # Batch Tab
+            with gr.TabItem("📚 Batch Jobs"):
+                with gr.Row():
+                    with gr.Column(scale=1):
+                        gr.Markdown("### Submit Documents")
+                        
+                        batch_files = gr.File(
+                            label="Upload Documents",
+                            file_types=[".doc", ".docx"],
+                            file_count="multiple",
+                            type="filepath"
+                        )
+                        
+                        batch_target_lang = gr.Dropdown(
+                            choices=language_options,
+                            value=["chinese"],
+                            multiselect=True,
+                            label="Target Languages",
+                            info="Each document is parsed once and translated into every selected language"
+                        )
+                        
+                        batch_translation_type = gr.Radio(
+                            choices=translation_types,
+                            value="Translation Only",
+                            label="Output Type"
+                        )
+                        
+                        with gr.Row():
+                            batch_use_memory = gr.Checkbox(value=True, label="Use translation memory")
+                            batch_refresh_memory = gr.Checkbox(value=False, label="Refresh translation memory")
+                        
+                        submit_batch_btn = gr.Button(
+                            "📚 Submit Jobs",
+                            variant="primary",
+                            size="lg"
+                        )
+                        
+                        batch_status = gr.Textbox(
+                            label="Status",
+                            interactive=False,
+                            lines=2
+                        )
+                    
+                    with gr.Column(scale=2):
+                        gr.Markdown("### Jobs")
+                        
+                        job_table = gr.Dataframe(
+                            headers=["Job ID", "File", "Status", "Progress", "Elapsed (s)", "Tokens", "Cost ($)",
+                                     "Est. cost ($)", "Message"],
+                            interactive=False,
+                            wrap=True
+                        )
+                        
+                        refresh_jobs_btn = gr.Button("🔁 Refresh")
+                        
+                        with gr.Row():
+                            job_id_input = gr.Textbox(
+                                label="Job ID",
+                                placeholder="Leave empty to download all finished jobs"
+                            )
+                            get_outputs_btn = gr.Button("⬇️ Get Outputs")
+                        
+                        job_output_status = gr.Textbox(label="Output Status", interactive=False)
+                        
+                        job_downloads = gr.File(
+                            label="Download Translated Documents",
+                            file_count="multiple",
+                            interactive=False
+                        )
+        
         # Event handlers
         
         # Glossary generation
         generate_glossary_btn.click(
-            fn=app.sync_generate_glossary,
-            inputs=[glossary_file_input, glossary_target_lang],
+            fn=app.handle_generate_glossary,
+            inputs=[glossary_file_input, glossary_target_lang, glossary_export_format],
             outputs=[glossary_download, glossary_status],
             show_progress=True
         )
@@ -407,18 +720,49 @@ def create_interface():
         glossary_file.change(
             fn=app.load_glossary,
             inputs=[glossary_file],
-            outputs=[glossary_load_status],
+            outputs=[glossary_load_status, glossary_state],
             show_progress=False
         )
         
         # Document translation
         translate_btn.click(
-            fn=app.sync_translate_document,
-            inputs=[file_input, target_lang, translation_type],
+            fn=app.handle_translate_document,
+            inputs=[file_input, target_lang, translation_type, use_memory, refresh_memory, glossary_state],
             outputs=[download_file, status_text],
             show_progress=True
         )
         
+        # Dry run: parse and collect only, no API calls
+        estimate_btn.click(
+            fn=app.handle_estimate,
+            inputs=[file_input, target_lang, use_memory, refresh_memory, glossary_state],
+            outputs=[status_text],
+            show_progress=True
+        )
+        
+        # Batch jobs: submission returns at once, status is polled with Refresh
+        submit_batch_btn.click(
+            fn=app.submit_batch,
+            inputs=[batch_files, batch_target_lang, batch_translation_type, batch_use_memory, batch_refresh_memory,
+                    glossary_state],
+            outputs=[batch_status, job_table],
+            show_progress=False
+        )
+        
+        refresh_jobs_btn.click(
+            fn=app.job_rows,
+            inputs=[],
+            outputs=[job_table],
+            show_progress=False
+        )
+        
+        get_outputs_btn.click(
+            fn=app.job_outputs,
+            inputs=[job_id_input],
+            outputs=[job_downloads, job_output_status],
+            show_progress=False
+        )
+        
         # Usage instructions
         gr.Markdown(
             """
@@ -429,23 +773,29 @@ def create_interface():
             2. Upload your document
             3. Select target language (source language will be auto-detected)
             4. Click "Generate Glossary" and wait for processing
-            5. Download the Excel file and edit as needed
+            5. Download the glossary file and edit as needed
             
             **For Translation:**
             1. Go to "Translate Document" tab
             2. Upload your document to translate
-            3. (Optional) Upload your edited glossary Excel file (it will load automatically)
+            3. (Optional) Upload your edited glossary file (it will load automatically)
             4. Select target language and output type (source language will be auto-detected)
             5. Click "Translate Document" and wait for processing
             6. Download the translated result
             
+            **For Batch Jobs:**
+            1. Go to "Batch Jobs" tab and upload any number of documents
+            2. Click "Submit Jobs"; each document gets a job ID right away
+            3. Click "Refresh" to follow progress
+            4. Enter a job ID (or leave it empty) and click "Get Outputs" to download results
+            
             ### ⚠️ Notes
             
             - Processing time depends on document length
             - Large documents may take several minutes
             - The service preserves formatting, images, and tables
             - Custom glossary terms will be highlighted in contrast mode
-            - Glossary Excel format: two columns "Source Content" and "Target Content"
+            - Glossary format: Excel, CSV or TSV with two columns "Source Content" and "Target Content", or TBX
             """
         )
     
@@ -0,0 +1,157 @@
+import json
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+from concurrency import AdaptiveConcurrencyLimiter, get_limiter
+from prompt import batch_translation_prompt, model, translation_prompt
+from rate_limiter import RateLimiter, get_rate_limiter
+from token_estimator import estimate_tokens
+
+# USD per million tokens: (prompt, cached prompt, completion). LLM_PRICE_* override the entry for the configured model.
+MODEL_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "google/gemini-2.0-flash-001": (0.10, 0.025, 0.40),
+}
+
+# Per-request overhead of the chat format (roles, separators), in tokens
+MESSAGE_OVERHEAD_TOKENS = 8
+# Extra completion tokens per item of a batched JSON answer ({"id": .., "translation": ..})
+BATCH_ITEM_OVERHEAD_TOKENS = 10
+
+ESTIMATE_COMPLETION_RATIO = float(os.environ.get("ESTIMATE_COMPLETION_RATIO", "1.0"))
+ESTIMATE_BASE_LATENCY = float(os.environ.get("ESTIMATE_BASE_LATENCY", "1.0"))
+ESTIMATE_OUTPUT_TOKENS_PER_SECOND = float(os.environ.get("ESTIMATE_OUTPUT_TOKENS_PER_SECOND", "80"))
+
+# Usage that adds up over every run of a job, including re-runs for segments that fell back
+USAGE_KEYS = ("api_calls", "prompt_tokens", "cached_tokens", "completion_tokens", "cost_usd")
+
+
+def model_prices(model_name: str = model) -> Tuple[float, float, float]:
+    """(prompt, cached prompt, completion) USD per million tokens for a model"""
+    prompt_price, cached_price, completion_price = MODEL_PRICES.get(model_name, (0.0, 0.0, 0.0))
+    if model_name == model:
+        prompt_price = float(os.environ.get("LLM_PRICE_PROMPT", prompt_price))
+        cached_price = float(os.environ.get("LLM_PRICE_CACHED", cached_price))
+        completion_price = float(os.environ.get("LLM_PRICE_COMPLETION", completion_price))
+    return prompt_price, cached_price, completion_price
+
+
+def usage_cost(prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0, model_name: str = model) -> float:
+    """Cost in USD; cached prompt tokens are billed at the cached price"""
+    prompt_price, cached_price, completion_price = model_prices(model_name)
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (uncached * prompt_price + cached_tokens * cached_price + completion_tokens * completion_price) / 1e6
+
+
+def carry_usage(previous: Dict) -> Dict:
+    """Fresh stats for another run of a job, starting from the usage its earlier runs already spent"""
+    return {key: previous[key] for key in USAGE_KEYS if key in previous}
+
+
+def _completion_tokens(text: str, ratio: float) -> int:
+    return math.ceil(estimate_tokens(text) * ratio)
+
+
+def _prompt_tokens(system_prompt: str, user_content: str) -> int:
+    return estimate_tokens(system_prompt) + estimate_tokens(user_content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_requests(pending: List[Tuple[int, str, Dict[str, str], Optional[str]]], target_language: str,
+                      batches: Optional[List[List[Tuple]]] = None,
+                      completion_ratio: float = ESTIMATE_COMPLETION_RATIO) -> List[Tuple[int, int]]:
+    """(prompt tokens, completion tokens) of every request a job will send.
+
+    pending segments are sent alone; batches (lists of pending segments) share one
+    request each, as translation.TranslationService sends them.
+    """
+    from translation import translation_messages
+    requests = []
+    for _index, text, references, _key in pending:
+        user = translation_messages(translation_prompt, text, target_language, references)[1]["content"]
+        requests.append((_prompt_tokens(translation_prompt, user), _completion_tokens(text, completion_ratio)))
+    for batch in batches or []:
+        references = {}
+        for item in batch:
+            references.update(item[2])
+        payload = json.dumps([{"id": i, "text": item[1]} for i, item in enumerate(batch)], ensure_ascii=False)
+        user = translation_messages(batch_translation_prompt, payload, target_language, references)[1]["content"]
+        completion = sum(_completion_tokens(item[1], completion_ratio) + BATCH_ITEM_OVERHEAD_TOKENS for item in batch)
+        requests.append((_prompt_tokens(batch_translation_prompt, user), completion))
+    return requests
+
+
+def estimate_wall_seconds(requests: List[Tuple[int, int]], limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                          rate_limiter: Optional[RateLimiter] = None,
+                          base_latency: float = ESTIMATE_BASE_LATENCY,
+                          tokens_per_second: float = ESTIMATE_OUTPUT_TOKENS_PER_SECOND) -> Dict:
+    """Time to send all requests under the concurrency limit and RPM/TPM quotas.
+
+    Each request takes base_latency plus its completion tokens at tokens_per_second.
+    The result is bound by whichever is slowest: the concurrency limit, the RPM quota,
+    the TPM quota, or the longest single request.
+    """
+    latencies = [base_latency + completion / tokens_per_second for _prompt, completion in requests]
+    total_tokens = sum(prompt + completion for prompt, completion in requests)
+    return _wall_seconds(len(requests), total_tokens, sum(latencies), max(latencies, default=0.0),
+                         limiter, rate_limiter)
+
+
+def _wall_seconds(requests: int, total_tokens: int, busy_seconds: float, longest: float,
+                  limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                  rate_limiter: Optional[RateLimiter] = None) -> Dict:
+    limiter = limiter or get_limiter()
+    rate_limiter = rate_limiter or get_rate_limiter()
+    if not requests:
+        return {"seconds": 0.0, "seconds_at_max_concurrency": 0.0, "bottleneck": None,
+                "concurrency": limiter.limit, "max_concurrency": limiter.max_limit,
+                "request_seconds": 0.0, "longest_request_seconds": 0.0}
+    bounds = {"latency": longest}
+    if rate_limiter.requests_per_minute:
+        bounds["rpm"] = requests * 60.0 / rate_limiter.requests_per_minute
+    if rate_limiter.tokens_per_minute:
+        bounds["tpm"] = total_tokens * 60.0 / rate_limiter.tokens_per_minute
+
+    def bound(concurrency: int) -> Tuple[float, str]:
+        candidates = dict(bounds, concurrency=busy_seconds / max(concurrency, 1))
+        bottleneck = max(candidates, key=candidates.get)
+        return candidates[bottleneck], bottleneck
+
+    seconds, bottleneck = bound(limiter.limit)
+    best, _ = bound(limiter.max_limit)
+    return {
+        "seconds": round(seconds, 1),
+        "seconds_at_max_concurrency": round(best, 1),
+        "bottleneck": bottleneck,
+        "concurrency": limiter.limit,
+        "max_concurrency": limiter.max_limit,
+        # Kept so estimates of documents that share the limits can be combined
+        "request_seconds": round(busy_seconds, 3),
+        "longest_request_seconds": round(longest, 3),
+    }
+
+
+def summarize_estimate(requests: List[Tuple[int, int]], **wall_kwargs) -> Dict:
+    """Request count, tokens, cost (before prompt-cache discounts) and API time of a job"""
+    prompt_tokens = sum(prompt for prompt, _completion in requests)
+    completion_tokens = sum(completion for _prompt, completion in requests)
+    estimate = {
+        "requests": len(requests),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost_usd": round(usage_cost(prompt_tokens, completion_tokens), 6),
+    }
+    estimate.update(estimate_wall_seconds(requests, **wall_kwargs))
+    return estimate
+
+
+def combine_estimates(estimates: List[Dict], **limits) -> Dict:
+    """Estimate for several documents translated at once, sharing the concurrency limit and quotas"""
+    totals = {key: sum(estimate.get(key, 0) for estimate in estimates)
+              for key in ("segments", "unique_segments", "resumed_segments", "skipped_segments", "memory_hits",
+                          "requests", "prompt_tokens", "completion_tokens")}
+    totals["cost_usd"] = round(sum(estimate.get("cost_usd", 0.0) for estimate in estimates), 6)
+    totals.update(_wall_seconds(totals["requests"], totals["prompt_tokens"] + totals["completion_tokens"],
+                                sum(estimate.get("request_seconds", 0.0) for estimate in estimates),
+                                max((estimate.get("longest_request_seconds", 0.0) for estimate in estimates),
+                                    default=0.0), **limits))
+    return totals
@@ -0,0 +1,166 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = os.environ.get("JOB_JOURNAL_PATH", os.path.join("cache", "job_journal.db"))
+DEFAULT_MAX_AGE_DAYS = float(os.environ.get("JOB_JOURNAL_MAX_AGE_DAYS", "7"))
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class JobJournal:
+    """Per-job checkpoint of finished segment translations, backed by SQLite in WAL mode.
+
+    Each segment is written as soon as it is translated, so a job that is
+    interrupted (process exit, UI timeout) can be rerun and only the missing
+    segments are sent to the API. A job's rows are removed once its outputs
+    have been written.
+
+    Checkpoints are queued and committed in batches by a background writer
+    thread, so recording a segment never blocks the event loop; load and
+    finish wait for the queued checkpoints first.
+    """
+
+    WRITE_BATCH = 200  # checkpoints committed per transaction at most
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH, max_age_days: float = DEFAULT_MAX_AGE_DAYS):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # auto_vacuum only takes effect on a new database, before the first table is created
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            " job_id TEXT NOT NULL,"
+            " segment_index INTEGER NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " refs TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (job_id, segment_index))"
+        )
+        if max_age_days:
+            self.purge(max_age_days * 86400)
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="job-journal-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def make_job_id(document_hash: str, target_language: str, model: str, prompt_version: str,
+                    glossary: Dict[str, str]) -> str:
+        """Build the journal key for one document/target-language job"""
+        glossary_hash = hashlib.sha256(
+            json.dumps(sorted(glossary.items()), ensure_ascii=False).encode("utf-8")).hexdigest()
+        payload = json.dumps(
+            [document_hash, target_language.strip().lower(), model, prompt_version, glossary_hash],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def load(self, job_id: str) -> Dict[int, Tuple[str, Dict[str, str]]]:
+        """Return {segment_index: (translation, references)} for the segments already finished"""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT segment_index, translation, refs FROM segments WHERE job_id = ?", (job_id,)).fetchall()
+        return {index: (translation, json.loads(refs)) for index, translation, refs in rows}
+
+    def record(self, job_id: str, segment_index: int, translation: str, references: Dict[str, str]) -> None:
+        """Checkpoint one finished segment; the writer thread commits it"""
+        self._queue.put((job_id, segment_index, translation, json.dumps(references, ensure_ascii=False), time.time()))
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < self.WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            try:
+                if rows:
+                    self._write(rows)
+            except Exception:
+                logger.exception(f"Job journal failed to store {len(rows)} checkpoints")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _write(self, rows: List[tuple]) -> None:
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO segments (job_id, segment_index, translation, refs, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+
+    def flush(self) -> None:
+        """Wait until every queued checkpoint is committed"""
+        if self._writer.is_alive():
+            self._queue.join()
+
+    def finish(self, job_id: str) -> int:
+        """Drop a completed job and compact the journal. Returns the number of rows removed."""
+        self.flush()
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM segments WHERE job_id = ?", (job_id,)).rowcount
+            self._compact()
+        return removed
+
+    def purge(self, max_age_seconds: float) -> int:
+        """Drop jobs abandoned for longer than max_age_seconds. Returns the number of rows removed."""
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM segments WHERE job_id IN ("
+                " SELECT job_id FROM segments GROUP BY job_id HAVING MAX(updated_at) < ?)",
+                (time.time() - max_age_seconds,),
+            ).rowcount
+            if removed:
+                logger.info(f"Job journal purged {removed} stale segments")
+                self._compact()
+        return removed
+
+    def _compact(self) -> None:
+        # Return freed pages to the OS and fold the WAL back into the main file
+        self._conn.execute("PRAGMA incremental_vacuum")
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        """Commit the queued checkpoints, stop the writer thread and close the database"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        atexit.unregister(self.flush)
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics import JOB_QUEUE_DEPTH, JOBS_RUNNING
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+DEFAULT_JOB_HISTORY = int(os.environ.get("JOB_HISTORY", "200"))
+
+QUEUED = "queued"
+RUNNING = "running"
+WAITING = "waiting"  # finished a run, scheduled to run again (see JobManager.retry_later)
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """One submitted document and its progress; updated by the worker, read by pollers"""
+
+    def __init__(self, file_path: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.file_path = file_path
+        self.file_name = os.path.basename(file_path)
+        self.params = params
+        self.status = QUEUED
+        self.progress = (0, 0)  # (finished segments, total segments)
+        self.message = ""
+        self.outputs: List[str] = []
+        self.stats: Dict = {}
+        self.attempts = 0  # completed runs
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def set_progress(self, done: int, total: int) -> None:
+        self.progress = (done, total)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def snapshot(self) -> Dict[str, Any]:
+        done, total = self.progress
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "file": self.file_name,
+            "status": self.status,
+            "progress": f"{done}/{total}" if total else "",
+            "elapsed": round(end - self.started_at, 1) if self.started_at else 0.0,
+            "message": self.message,
+            "attempts": self.attempts,
+            "outputs": list(self.outputs),
+            "tokens": self.stats.get("prompt_tokens", 0) + self.stats.get("completion_tokens", 0),
+            "cost_usd": round(self.stats.get("cost_usd", 0.0), 4),
+            "estimated_cost_usd": self.stats.get("estimate", {}).get("cost_usd"),
+        }
+
+
+class JobManager:
+    """In-process job queue served by a bounded pool of workers.
+
+    All jobs run on one background event loop, so they share the same API
+    clients and the process-wide concurrency and rate limits, while UI
+    handlers only enqueue work and poll for status.
+    """
+
+    def __init__(self, handler: Callable[[Job], Awaitable[None]], max_workers: int = DEFAULT_JOB_WORKERS,
+                 history: int = DEFAULT_JOB_HISTORY):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.history = history
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="job-manager", daemon=True)
+        self._thread.start()
+        self._queue: asyncio.Queue = self.run(self._create_queue())
+        self._workers = [asyncio.run_coroutine_threadsafe(self._worker(i), self._loop)
+                         for i in range(max_workers)]
+        JOB_QUEUE_DEPTH.set_function(self.queue_depth)
+        JOBS_RUNNING.set_function(self.running_count)
+
+    @staticmethod
+    async def _create_queue() -> asyncio.Queue:
+        return asyncio.Queue()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None):
+        """Run a coroutine on the shared loop and wait for its result from another thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    async def call(self, coro: Awaitable):
+        """Await a coroutine on the shared loop from another event loop, e.g. an async UI handler"""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    def submit(self, file_path: str, **params) -> str:
+        """Queue one document and return its job ID immediately"""
+        job = Job(file_path, params)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, job)
+        logger.info(f"Queued job {job.id} for {job.file_name}")
+        return job.id
+
+    def submit_many(self, file_paths: List[str], **params) -> List[str]:
+        return [self.submit(path, **params) for path in file_paths]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Snapshots of all known jobs, newest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.snapshot() for job in reversed(jobs)]
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == QUEUED)
+
+    def running_count(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == RUNNING)
+
+    def retry_later(self, job: Job, delay: float) -> None:
+        """From the job's handler: run the job again after delay seconds instead of finishing it"""
+        job.status = WAITING
+
+        def requeue():
+            job.status = QUEUED
+            self._queue.put_nowait(job)
+
+        self._loop.call_soon_threadsafe(self._loop.call_later, delay, requeue)
+        logger.info(f"Job {job.id} ({job.file_name}) will run again in {delay:.0f}s")
+
+    def shutdown(self) -> None:
+        """Stop the workers and the background loop; queued jobs are abandoned"""
+        for worker in self._workers:
+            worker.cancel()
+        self.run(asyncio.sleep(0))  # let the cancellations run before stopping the loop
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def _trim(self) -> None:
+        # Forget the oldest finished jobs beyond the history size; queued and running jobs are kept
+        excess = len(self._jobs) - self.history
+        for job_id in [j.id for j in self._jobs.values() if j.finished][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            job.started_at = job.started_at or time.time()
+            try:
+                await self.handler(job)
+                if job.status == RUNNING:
+                    job.status = DONE
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.file_name}) failed: {traceback.format_exc()}")
+                job.message = f"Error: {e}"
+                job.status = FAILED
+            finally:
+                job.attempts += 1
+                if job.finished:
+                    job.finished_at = time.time()
+                self._queue.task_done()
@@ -0,0 +1,446 @@
+import asyncio
+import collections
+import importlib.util
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+from circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError, get_breaker
+from concurrency import THROTTLED, AdaptiveConcurrencyLimiter, SUCCESS, classify_exception, get_limiter
+from metrics import HTTP_RESPONSES, LLM_HEDGES, LLM_REQUEST_SECONDS, LLM_REQUESTS, LLM_TOKENS
+from rate_limiter import RateLimiter, get_rate_limiter
+from token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Per-attempt deadline: a base plus time for the expected output at a slow generation speed,
+# raised to a multiple of the observed p99 for calls of that size
+ATTEMPT_TIMEOUT = float(os.environ.get("LLM_ATTEMPT_TIMEOUT", "15"))
+TIMEOUT_MIN_TOKENS_PER_SECOND = float(os.environ.get("LLM_TIMEOUT_MIN_TOKENS_PER_SECOND", "20"))
+TIMEOUT_P99_FACTOR = float(os.environ.get("LLM_TIMEOUT_P99_FACTOR", "3"))
+# Hedging: a duplicate request is sent once a call takes longer than the observed p95
+HEDGE_ENABLED = os.environ.get("LLM_HEDGE", "1").lower() in ("1", "true", "yes")
+HEDGE_QUANTILE = float(os.environ.get("LLM_HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.environ.get("LLM_HEDGE_MIN_DELAY", "2"))
+# Hedge delay before any size of call has enough latency history
+HEDGE_COLD_START_DELAY = float(os.environ.get("LLM_HEDGE_COLD_START_DELAY", "5"))
+# At most this fraction of calls is duplicated, so hedging cannot double the load
+HEDGE_MAX_RATIO = float(os.environ.get("LLM_HEDGE_MAX_RATIO", "0.1"))
+# Duplicates per call, each one hedge delay after the previous, in case a duplicate hangs as well
+HEDGE_MAX_COPIES = int(os.environ.get("LLM_HEDGE_MAX_COPIES", "2"))
+
+
+class HedgeNotNeeded(Exception):
+    """A hedge got its slot after the call it duplicates had already succeeded, and was not sent"""
+
+
+class ConnectionStats:
+    """Connection reuse counters fed by httpcore trace events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+
+    async def on_request(self, request: httpx.Request) -> None:
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self.trace
+
+    @staticmethod
+    async def on_response(response: httpx.Response) -> None:
+        # Every HTTP attempt, including the SDK's own retries that chat_completion does not see
+        HTTP_RESPONSES.labels(response.status_code).inc()
+
+    async def trace(self, event_name: str, info: Dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
+        elif event_name == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "tls_handshakes": self.tls_handshakes,
+                "reused": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+            }
+
+
+class LatencyTracker:
+    """Recent latencies of successful calls, grouped by expected output size (powers of two tokens)"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[int, Deque[float]] = {}
+        self.calls = 0
+        self.hedges = 0
+
+    @staticmethod
+    def _bucket(tokens: int) -> int:
+        return min(max(int(tokens), 1).bit_length(), 16)
+
+    def observe(self, tokens: int, latency: float) -> None:
+        with self._lock:
+            samples = self._samples.get(self._bucket(tokens))
+            if samples is None:
+                samples = self._samples[self._bucket(tokens)] = collections.deque(maxlen=self.window)
+            samples.append(latency)
+
+    def quantile(self, tokens: int, q: float, nearest: bool = False) -> Optional[float]:
+        """Latency quantile for calls of this size, or None until enough calls were seen.
+        With nearest, a size without enough history uses the closest size that has it,
+        preferring larger calls (whose latencies are longer)."""
+        bucket = self._bucket(tokens)
+        with self._lock:
+            candidates = [bucket]
+            if nearest:
+                known = [b for b, samples in self._samples.items() if len(samples) >= self.min_samples]
+                candidates += sorted(known, key=lambda b: (abs(b - bucket), b < bucket))
+            for candidate in candidates:
+                samples = self._samples.get(candidate, ())
+                if len(samples) >= self.min_samples:
+                    samples = sorted(samples)
+                    break
+            else:
+                return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def count_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def take_hedge(self, max_ratio: float) -> bool:
+        """Reserve a hedge if fewer than max_ratio of all calls were hedged so far"""
+        with self._lock:
+            if self.hedges + 1 > max_ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+_clients: Dict[Tuple[str, str], AsyncOpenAI] = {}
+_clients_lock = threading.Lock()
+connection_stats = ConnectionStats()
+latency_tracker = LatencyTracker()
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    # HTTP/2 needs the optional h2 package; without LLM_HTTP2 it is used whenever h2 is installed
+    has_h2 = importlib.util.find_spec("h2") is not None
+    setting = os.environ.get("LLM_HTTP2")
+    http2 = has_h2 if setting is None else setting.lower() in ("1", "true", "yes")
+    if http2 and not has_h2:
+        logger.warning("LLM_HTTP2 is enabled but the h2 package is not installed; using HTTP/1.1")
+        http2 = False
+    read_timeout = float(os.environ.get("LLM_HTTP_READ_TIMEOUT", "120"))
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.environ.get("LLM_HTTP_MAX_KEEPALIVE", "50")),
+            keepalive_expiry=float(os.environ.get("LLM_HTTP_KEEPALIVE_EXPIRY", "60")),
+        ),
+        timeout=httpx.Timeout(read_timeout, connect=float(os.environ.get("LLM_HTTP_CONNECT_TIMEOUT", "10"))),
+        follow_redirects=True,
+        event_hooks={"request": [connection_stats.on_request], "response": [connection_stats.on_response]},
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide HTTP connection pool shared by every LLM client"""
+    global _http_client
+    with _clients_lock:
+        if _http_client is None:
+            _http_client = _build_http_client()
+        return _http_client
+
+
+def get_client(api_key: str, base_url: str) -> AsyncOpenAI:
+    """Shared AsyncOpenAI client per endpoint, all on the same connection pool.
+
+    The pool belongs to the event loop that first uses it, so all LLM calls
+    should run on one long-lived loop (see job_manager.py and cli.py).
+    SDK retries are off: retries and backoff happen in the callers, where every
+    429/5xx reaches the concurrency limiter and the circuit breaker.
+    """
+    http_client = get_http_client()
+    with _clients_lock:
+        client = _clients.get((api_key, base_url))
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+            _clients[(api_key, base_url)] = client
+        return client
+
+
+class Route:
+    """A model on an endpoint, with its own circuit breaker and concurrency limiter"""
+
+    def __init__(self, model: str, base_url: str, api_key: str, limiter: Optional[AdaptiveConcurrencyLimiter] = None):
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.name = f"{model}@{base_url}"
+        self.breaker: CircuitBreaker = get_breaker(self.name)
+        self.limiter = limiter or get_limiter(self.name)
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        return get_client(self.api_key, self.base_url)
+
+
+def get_routes(api_key: str, base_url: str, model: Optional[str] = None) -> List[Route]:
+    """The primary model on (api_key, base_url) followed by the fallback routes from prompt.py"""
+    from prompt import fallback_api_key, fallback_models, model as default_model
+    routes = [Route(model or default_model, base_url, api_key, get_limiter())]
+    for entry in fallback_models:
+        fallback_model, _, fallback_url = entry.partition("@")
+        if fallback_url:
+            routes.append(Route(fallback_model, fallback_url, fallback_api_key))
+        else:
+            routes.append(Route(fallback_model, base_url, api_key))
+    return routes
+
+
+async def routed_completion(routes: List[Route], limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                            rate_limiter: Optional[RateLimiter] = None, hedge: bool = False,
+                            stats: Optional[Dict] = None, **kwargs) -> Tuple[object, Route]:
+    """chat_completion on the first route whose circuit lets the call through. Returns (response, route).
+
+    limiter, when given, replaces the primary route's limiter; fallback routes always use their own.
+    Overload and connection failures count against the route's circuit; other errors
+    (e.g. a rejected request) do not. Raises CircuitOpenError without sending anything
+    when every route's circuit is open.
+    """
+    for route in routes:
+        if not route.breaker.allow():
+            continue
+        route_limiter = limiter if limiter is not None and route is routes[0] else route.limiter
+        try:
+            response = await chat_completion(route.client, route_limiter, rate_limiter, hedge, stats,
+                                             breaker=route.breaker, model=route.model, **kwargs)
+        except CircuitOpenError:
+            # The circuit opened while this call waited for a slot; try the next route
+            continue
+        except Exception as e:
+            route.breaker.record(classify_exception(e) != THROTTLED)
+            raise
+        route.breaker.record(True)
+        return response, route
+    _count(stats, "short_circuited_calls")
+    raise CircuitOpenError(f"All {len(routes)} LLM routes have an open circuit")
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter, so throttled callers do not retry in lockstep"""
+    return (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def estimate_request_tokens(messages, max_tokens: Optional[int] = None) -> int:
+    """Estimate prompt + completion tokens for a chat request before sending it"""
+    prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+    if max_tokens:
+        return prompt_tokens + max_tokens
+    # Translations come out roughly as long as the user content they were made from
+    user_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages if m.get("role") == "user")
+    return prompt_tokens + user_tokens
+
+
+def expected_completion_tokens(messages, max_tokens: Optional[int] = None) -> int:
+    """Expected output size of a chat request: max_tokens, or the size of the user content"""
+    if max_tokens:
+        return max_tokens
+    return sum(estimate_tokens(m.get("content") or "") for m in messages if m.get("role") == "user")
+
+
+def attempt_timeout(completion_tokens: int) -> float:
+    """Deadline in seconds for one attempt of a call expected to produce completion_tokens"""
+    timeout = ATTEMPT_TIMEOUT + completion_tokens / TIMEOUT_MIN_TOKENS_PER_SECOND
+    p99 = latency_tracker.quantile(completion_tokens, 0.99)
+    if p99 is not None:
+        timeout = max(timeout, TIMEOUT_P99_FACTOR * p99)
+    return timeout
+
+
+def hedge_delay(completion_tokens: int) -> float:
+    """Seconds after which a call of this size is hedged: the observed quantile for its size (or the
+    nearest size with enough history), HEDGE_COLD_START_DELAY before any history"""
+    observed = latency_tracker.quantile(completion_tokens, HEDGE_QUANTILE, nearest=True)
+    if observed is None:
+        return HEDGE_COLD_START_DELAY
+    return max(observed, HEDGE_MIN_DELAY)
+
+
+def _count(stats: Optional[Dict], key: str, amount: int = 1) -> None:
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + amount
+
+
+def status_label(exc: Optional[BaseException]) -> str:
+    """HTTP status code of a call for metrics, or the kind of failure when there was no response"""
+    if exc is None:
+        return "200"
+    if isinstance(exc, openai.APIStatusError):
+        return str(getattr(exc, "status_code", None) or "error")
+    if isinstance(exc, (openai.APITimeoutError, TimeoutError)):
+        return "timeout"
+    if isinstance(exc, openai.APIConnectionError):
+        return "connection_error"
+    return "error"
+
+
+def record_usage_metrics(model: str, usage) -> None:
+    if usage is None:
+        return
+    LLM_TOKENS.labels(model, "prompt").inc(getattr(usage, "prompt_tokens", None) or 0)
+    LLM_TOKENS.labels(model, "completion").inc(getattr(usage, "completion_tokens", None) or 0)
+    details = getattr(usage, "prompt_tokens_details", None)
+    LLM_TOKENS.labels(model, "cached").inc(getattr(details, "cached_tokens", None) or 0)
+
+
+async def chat_completion(client, limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+                          rate_limiter: Optional[RateLimiter] = None, hedge: bool = False,
+                          stats: Optional[Dict] = None, breaker: Optional[CircuitBreaker] = None, **kwargs):
+    """Call client.chat.completions.create within the shared RPM/TPM quota and adaptive concurrency limit.
+
+    Each attempt has its own deadline (see attempt_timeout). With hedge=True, a call still
+    running after the observed p95 latency for its size is sent a second time, taking the
+    next free slot ahead of queued calls, and the first answer wins. Timeouts, hedges and
+    discarded duplicates are counted in stats when given, hedges only once actually sent.
+    With a breaker, a call that gets its slot after the circuit opened raises
+    CircuitOpenError instead of being sent.
+    """
+    limiter = limiter or get_limiter()
+    rate_limiter = rate_limiter or get_rate_limiter()
+    completion_tokens = expected_completion_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+    latency_tracker.count_call()
+    if not (hedge and HEDGE_ENABLED):
+        return await _attempt(client, limiter, rate_limiter, completion_tokens, stats, breaker, kwargs)
+
+    sending = asyncio.Event()
+    issued = [False]  # per attempt: whether its request was sent
+
+    def on_send(index: int) -> Callable[[], None]:
+        def mark() -> None:
+            issued[index] = True
+            if index == 0:
+                sending.set()
+            else:
+                _count(stats, "hedged_requests")
+                LLM_HEDGES.labels("sent").inc()
+        return mark
+
+    attempts = [asyncio.ensure_future(
+        _attempt(client, limiter, rate_limiter, completion_tokens, stats, breaker, kwargs, on_send(0)))]
+
+    def hedge_needed() -> bool:
+        return not any(task.done() and not task.cancelled() and task.exception() is None for task in attempts)
+
+    sent = asyncio.ensure_future(sending.wait())
+    try:
+        # The hedge delay counts from when the request is sent, not from the wait for quota and a slot
+        await asyncio.wait([attempts[0], sent], return_when=asyncio.FIRST_COMPLETED)
+        if not attempts[0].done():
+            delay = hedge_delay(completion_tokens)
+            done, _pending = await asyncio.wait(attempts, timeout=delay)
+            while not done and len(attempts) <= HEDGE_MAX_COPIES and latency_tracker.take_hedge(HEDGE_MAX_RATIO):
+                # The duplicate takes the next free slot ahead of queued calls: behind the queue it would
+                # arrive too late to cut the tail. The limit still bounds the calls in flight.
+                issued.append(False)
+                attempts.append(asyncio.ensure_future(
+                    _attempt(client, limiter, rate_limiter, completion_tokens, stats, breaker, kwargs,
+                             on_send(len(attempts)), priority=True, needed=hedge_needed)))
+                done, _pending = await asyncio.wait(attempts, timeout=delay)
+        error: Optional[BaseException] = None
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                # Only duplicates whose request went out are wasted; one still waiting for a slot cost nothing
+                wasted = sum(1 for i, other in enumerate(attempts) if other is not task and issued[i] and
+                             (not other.done() or (not other.cancelled() and other.exception() is None)))
+                if wasted:
+                    _count(stats, "wasted_requests", wasted)
+                    LLM_HEDGES.labels("wasted").inc(wasted)
+                if task is not attempts[0]:
+                    _count(stats, "hedge_wins")
+                    LLM_HEDGES.labels("won").inc()
+                return task.result()
+        raise error
+    finally:
+        sent.cancel()
+        for task in attempts:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Mark a discarded attempt's failure as retrieved, so asyncio does not log it as unhandled
+                task.exception()
+
+
+async def _attempt(client, limiter: AdaptiveConcurrencyLimiter, rate_limiter: RateLimiter,
+                   completion_tokens: int, stats: Optional[Dict], breaker: Optional[CircuitBreaker], kwargs: Dict,
+                   on_send: Optional[Callable[[], None]] = None, priority: bool = False,
+                   needed: Optional[Callable[[], bool]] = None):
+    """One request: quota, concurrency slot, and the call itself under its deadline.
+    on_send is called once the request holds its slot; priority takes the slot ahead of queued calls.
+    When needed returns False once the slot is held, HedgeNotNeeded is raised instead of sending."""
+    estimated = estimate_request_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+    # Wait for quota before taking a concurrency slot, so waiting does not hold capacity
+    await rate_limiter.acquire(estimated)
+    await limiter.acquire(priority)
+    if needed is not None and not needed():
+        limiter.release(None)
+        raise HedgeNotNeeded()
+    if breaker is not None and breaker.state == OPEN:
+        limiter.release(None)
+        raise CircuitOpenError(f"Circuit for {breaker.name} opened while waiting for a slot")
+    if on_send is not None:
+        on_send()
+    timeout = attempt_timeout(completion_tokens)
+    started = time.monotonic()
+    outcome = None
+    status = "cancelled"
+    try:
+        # The SDK timeout bounds each HTTP attempt, wait_for also bounds the SDK's own retries
+        response = await asyncio.wait_for(client.chat.completions.create(timeout=timeout, **kwargs), timeout)
+        outcome = SUCCESS
+        latency_tracker.observe(completion_tokens, time.monotonic() - started)
+        status = status_label(None)
+        usage = getattr(response, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            rate_limiter.reconcile(estimated, usage.total_tokens)
+        record_usage_metrics(kwargs.get("model", ""), usage)
+        return response
+    except Exception as e:
+        outcome = classify_exception(e)
+        status = status_label(e)
+        if isinstance(e, (TimeoutError, openai.APITimeoutError)):
+            _count(stats, "attempt_timeouts")
+        elif isinstance(e, openai.APIConnectionError):
+            _count(stats, "connection_errors")
+        raise
+    finally:
+        latency = time.monotonic() - started
+        limiter.release(outcome, latency)
+        model = kwargs.get("model", "")
+        LLM_REQUESTS.labels(model, status).inc()
+        LLM_REQUEST_SECONDS.labels(model, status).observe(latency)
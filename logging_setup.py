@@ -0,0 +1,40 @@
+import atexit
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Fraction of LLM calls whose prompt and response are logged
+PAYLOAD_LOG_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+
+payload_logger = logging.getLogger("translation.payload")
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: int = logging.INFO, fmt: str = LOG_FORMAT) -> None:
+    """Route all log records through a queue; a listener thread formats and writes them.
+
+    Request handlers only enqueue records, so console or file I/O never blocks
+    the event loop that runs the LLM calls.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt))
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(records)]
+    root.setLevel(level)
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def sample_payload() -> bool:
+    """Whether to log the payload of the current call; check before building the message"""
+    return PAYLOAD_LOG_SAMPLE_RATE > 0 and random.random() < PAYLOAD_LOG_SAMPLE_RATE
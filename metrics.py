@@ -0,0 +1,283 @@
+import bisect
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_HOST = os.environ.get("METRICS_HOST", "0.0.0.0")
+# Next to the Gradio server on 7888; 0 disables the endpoint
+DEFAULT_METRICS_PORT = int(os.environ.get("METRICS_PORT", "7889"))
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+PHASE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base for metrics with optional labels; children are created per label combination"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[LabelValues, object] = {}
+
+    def labels(self, *values) -> "_Metric":
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        # Unlabelled metrics use a single child keyed by the empty tuple
+        return self.labels()
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(suffix, label string, value) for every child"""
+        with self._lock:
+            children = list(self._children.items())
+        result = []
+        for key, child in children:
+            result.extend(child.samples(self.labelnames, key))
+        return result
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self, names, key):
+        return [("", _format_labels(names, key), self.value)]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from function at scrape time instead of storing it"""
+        self.function = function
+
+    def samples(self, names, key):
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception as e:
+                logger.warning(f"Gauge callback failed: {e}")
+        return [("", _format_labels(names, key), value)]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default().set_function(function)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._lock = threading.Lock()
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self, names, key):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        result = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            result.append(("_bucket", _format_labels(names, key, f'le="{_format_value(float(bound))}"'), cumulative))
+        result.append(("_sum", _format_labels(names, key), total))
+        result.append(("_count", _format_labels(names, key), cumulative))
+        return result
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+
+class MetricsRegistry:
+    """Metrics rendered together in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_duration_seconds", "Latency of LLM chat completion calls", ("model", "status"))
+LLM_REQUESTS = REGISTRY.counter(
+    "llm_requests_total", "LLM chat completion calls by HTTP status code or error kind", ("model", "status"))
+HTTP_RESPONSES = REGISTRY.counter(
+    "llm_http_responses_total", "HTTP responses from the LLM endpoint, including client-level retries", ("status",))
+LLM_RETRIES = REGISTRY.counter(
+    "llm_retries_total", "LLM calls retried after a failed attempt", ("operation",))
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total", "Tokens reported by the API (prompt, cached, completion)", ("model", "type"))
+LLM_HEDGES = REGISTRY.counter(
+    "llm_hedged_requests_total", "Duplicate requests sent for slow calls: sent, won (answered first), wasted",
+    ("outcome",))
+LLM_CIRCUIT_STATE = REGISTRY.gauge(
+    "llm_circuit_state", "Circuit breaker state per LLM route: 0 closed, 1 half-open, 2 open", ("route",))
+LLM_SHORT_CIRCUITS = REGISTRY.counter(
+    "llm_short_circuited_total", "Calls refused without a request because the route's circuit was open", ("route",))
+LLM_FALLBACK_SEGMENTS = REGISTRY.counter(
+    "translation_fallback_segments_total", "Segments left in source text after every attempt failed")
+SEGMENTS_SKIPPED = REGISTRY.counter(
+    "translation_segments_skipped_total", "Segments passed through unchanged by the local pre-filter", ("rule",))
+LLM_IN_FLIGHT = REGISTRY.gauge("llm_requests_in_flight", "LLM calls currently holding a concurrency slot")
+LLM_WAITING = REGISTRY.gauge("llm_requests_waiting", "LLM calls waiting for a concurrency slot")
+LLM_CONCURRENCY_LIMIT = REGISTRY.gauge("llm_concurrency_limit", "Current adaptive concurrency limit")
+PHASE_SECONDS = REGISTRY.histogram(
+    "document_phase_duration_seconds", "Time spent per document in each processing phase", ("phase",),
+    buckets=PHASE_BUCKETS)
+JOB_QUEUE_DEPTH = REGISTRY.gauge("job_queue_depth", "Jobs waiting for a worker")
+JOBS_RUNNING = REGISTRY.gauge("jobs_running", "Jobs currently being processed")
+
+
+def _limiter_value(field: str) -> Callable[[], float]:
+    def read() -> float:
+        from concurrency import get_limiter
+        return get_limiter().snapshot()[field]
+    return read
+
+
+LLM_IN_FLIGHT.set_function(_limiter_value("in_flight"))
+LLM_WAITING.set_function(_limiter_value("waiting"))
+LLM_CONCURRENCY_LIMIT.set_function(_limiter_value("limit"))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are frequent; keep them out of the application log
+        pass
+
+
+def start_metrics_server(port: int = DEFAULT_METRICS_PORT, host: str = DEFAULT_METRICS_HOST,
+                         registry: MetricsRegistry = REGISTRY) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics from a daemon thread. Returns None when port is 0."""
+    if not port:
+        return None
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Metrics available on http://{host}:{server.server_port}/metrics")
+    return server
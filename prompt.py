@@ -5,6 +5,11 @@ base_url = os.environ["OPENAI_BASE_URL"]
 
 model = "google/gemini-2.0-flash-001"
 
+# Routes tried in order while the primary model's circuit is open, comma separated:
+# "model" on the same endpoint, or "model@base_url" (key from LLM_FALLBACK_API_KEY, else OPENAI_API_KEY)
+fallback_models = [entry.strip() for entry in os.environ.get("LLM_FALLBACK_MODELS", "").split(",") if entry.strip()]
+fallback_api_key = os.environ.get("LLM_FALLBACK_API_KEY", api_key)
+
 
 term_prompt = """
 你现在扮演"术语抽取器"。只做名词级术语抽取与翻译，不要解释。首先自动识别我提供文本的语言，然后对该文本进行分词与术语识别，抽取名词、名词短语、专有名词、缩略词/首字母词（如"5G""API""NLP"），并翻译为{tgt_lang}。
@@ -27,17 +32,47 @@ term_prompt = """
 """
 
 
+# Bump whenever the translation prompts change, so cached translations are not reused
+translation_prompt_version = "2"
+
+# 系统提示词保持固定，不含任何随任务或片段变化的内容，使服务端的提示词前缀缓存可以命中；
+# 目标语言、术语表和原文都放在其后的用户消息中
 translation_prompt = """
 ## 任务要求
-请识别用户给出文本的语言，然后将其翻译为{target_language}，只输出译文，不要输出任何其他内容。
+用户消息依次给出目标语言、术语表和原文。请识别原文的语言，然后将原文翻译为目标语言，只输出译文，不要输出任何其他内容。
+
+## 注意
+- 首先自动识别源文本的语言类型（如英语、中文、日语等）
+- 然后将其准确翻译为目标语言，不要翻译成其他语言
+- 只翻译"## 原文"之后的内容，不要翻译或输出目标语言和术语表
+- 请严格依据术语表中的术语进行输出，即便你认为其可能存在错误，也需严格遵循术语表内容执行
+- 术语表为 [] 时表示没有需要遵循的术语
+- 保持原文的语义准确性和流畅性
+
+"""
+
+translation_user_prompt = """## 目标语言
+{target_language}
 
 ## 术语表
 {ref_text}
 
+## 原文
+{text}"""
+
+
+batch_translation_prompt = """
+## 任务要求
+用户消息依次给出目标语言、术语表和原文。原文是一个 JSON 数组，每个元素包含 id 和 text。请识别每个 text 的语言，然后将其翻译为目标语言。
+
+## 输出格式
+- 只输出 JSON 数组，每个输入元素对应一个输出元素：{"id": 原 id, "translation": 译文}
+- 不得遗漏、合并或新增元素，id 必须与输入完全一致
+- 不要输出 Markdown、代码块围栏或任何其他内容
+
 ## 注意
-- 首先自动识别源文本的语言类型（如英语、中文、日语等）
-- 然后将其准确翻译为{target_language}
 - 请严格依据术语表中的术语进行输出，即便你认为其可能存在错误，也需严格遵循术语表内容执行
+- 术语表为 [] 时表示没有需要遵循的术语
 - 保持原文的语义准确性和流畅性
 
-"""
\ No newline at end of file
+"""
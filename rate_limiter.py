@@ -0,0 +1,107 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+class RateLimiter:
+    """Token buckets for requests-per-minute and tokens-per-minute quotas.
+
+    Callers wait for capacity before sending instead of failing with 429s
+    afterwards. A limit of 0 disables that bucket. Safe to share between
+    threads and event loops.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests_per_minute > 0 or self.tokens_per_minute > 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(float(self.requests_per_minute),
+                                 self._requests + elapsed * self.requests_per_minute / 60.0)
+        if self.tokens_per_minute:
+            self._tokens = min(float(self.tokens_per_minute),
+                               self._tokens + elapsed * self.tokens_per_minute / 60.0)
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Take capacity if available and return 0, otherwise return seconds to wait"""
+        with self._lock:
+            self._refill(time.monotonic())
+            delay = 0.0
+            if self.requests_per_minute and self._requests < 1:
+                delay = max(delay, (1 - self._requests) * 60.0 / self.requests_per_minute)
+            if self.tokens_per_minute:
+                # A single request larger than the whole quota only waits for a full bucket
+                needed = min(tokens, self.tokens_per_minute)
+                if self._tokens < needed:
+                    delay = max(delay, (needed - self._tokens) * 60.0 / self.tokens_per_minute)
+            if delay:
+                return delay
+            if self.requests_per_minute:
+                self._requests -= 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+            return 0.0
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until one request carrying an estimated `tokens` (prompt + completion) fits the quotas"""
+        if not self.enabled:
+            return
+        waited = 0.0
+        while True:
+            delay = self._try_acquire(tokens)
+            if not delay:
+                break
+            waited += delay
+            await asyncio.sleep(delay)
+        if waited:
+            with self._lock:
+                self.waits += 1
+                self.wait_seconds += waited
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage of a request is known"""
+        if not self.tokens_per_minute:
+            return
+        with self._lock:
+            self._tokens -= actual_tokens - estimated_tokens
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "requests_available": round(self._requests, 1),
+                "tokens_available": round(self._tokens, 1),
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+_shared_rate_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide rate limiter shared by every LLM call site"""
+    global _shared_rate_limiter
+    with _shared_lock:
+        if _shared_rate_limiter is None:
+            _shared_rate_limiter = RateLimiter(
+                requests_per_minute=int(os.environ.get("LLM_RPM_LIMIT", "0")),
+                tokens_per_minute=int(os.environ.get("LLM_TPM_LIMIT", "0")),
+            )
+        return _shared_rate_limiter
@@ -0,0 +1,158 @@
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Rules in the order they are tried; the first that matches names the skip in stats
+RULES = ("url", "reference", "claim_label", "number", "unit", "formula", "part_number", "symbols", "target_script")
+
+_NUMBER = r"[-+±~≈<>≤≥]?\s?\d[\d,.'’ ]*(?:\s?[eE×x]\s?[-+]?\d+(?:\^?[-+]?\d+)?)?\s?%?"
+_RANGE = rf"{_NUMBER}(?:\s?(?:-|–|—|~|to|/|:|×|x)\s?{_NUMBER})*"
+_UNIT_BASE = (r"(?:[pnµμumckMGT]?(?:m|g|s|Hz|Pa|V|A|W|Wh|J|N|L|l|Ω|mol|bar|eV|F|H|T)|°\s?[CF]?|K|rpm|ppm|ppb"
+              r"|wt\.?\s?%|vol\.?\s?%|mol\s?%|at\.?\s?%|dB|h|min|mAh|psi|in|inch|inches|ft|mesh|cP|cSt|Gy|Sv)")
+_UNIT = rf"{_UNIT_BASE}[²³23]?(?:\s?[/·*]\s?{_UNIT_BASE}[²³23]?)*"
+
+_ELEMENTS = (
+    "H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni Cu Zn Ga Ge As Se Br Kr Rb Sr Y Zr "
+    "Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe Cs Ba La Ce Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm Yb Lu Hf Ta W Re Os Ir "
+    "Pt Au Hg Tl Pb Bi Po At Rn Fr Ra Ac Th Pa U Np Pu Am Cm Bk Cf Es Fm Md No Lr").split()
+_ELEMENT = "(?:" + "|".join(sorted(_ELEMENTS, key=len, reverse=True)) + ")"
+_FORMULA_UNIT = rf"(?:{_ELEMENT}[₀-₉\d]*|\((?:{_ELEMENT}[₀-₉\d]*)+\)[₀-₉\d]*)"
+# At least two units, so a single symbol with a number (step "S101", claim "B1") is not taken for a formula
+_FORMULA_PART = rf"{_FORMULA_UNIT}{{2,}}"
+
+_PATTERNS = {
+    "url": re.compile(r"(?:https?://|ftp://|www\.)\S+|[\w.+-]+@[\w-]+(?:\.[\w-]+)+", re.IGNORECASE),
+    # Reference numerals of figures: (102), [20a], (102, 104), 102a, 20'
+    "reference": re.compile(r"[(\[]\s?\d{1,5}[A-Za-z]?['’]*(?:\s?[,;/&\-–~]\s?\d{1,5}[A-Za-z]?['’]*)*\s?[)\]]"
+                            r"|\d{1,5}[a-z]['’]*|\d{1,5}['’]+"),
+    # List and claim labels: 1.  2)  (a)  b.  iv)  A:
+    "claim_label": re.compile(r"[(\[]?(?:\d{1,3}|[A-Za-z]|[ivxlc]{1,6}|[IVXLC]{1,6})[.)\]:]"
+                              r"|\((?:[A-Za-z]|[ivxlc]{1,6}|[IVXLC]{1,6})\)"),
+    "number": re.compile(_RANGE),
+    "unit": re.compile(rf"{_NUMBER}\s?(?:{_UNIT})?(?:\s?(?:-|–|~|to|/|×|x)\s?{_NUMBER})*\s?{_UNIT}"),
+    # Chemical formulas built from element symbols, with at least one digit: H2O, Ca(OH)2, CuSO4·5H2O, SO4²⁻
+    "formula": re.compile(rf"(?=.*[\d₀-₉])\d*{_FORMULA_PART}(?:[·•]\d*{_FORMULA_PART})*[⁰-⁹]*[+\-⁺⁻]?"),
+    # Upper-case codes with letters and digits, either joined by separators (XJ-2000, RS-232C) or at least
+    # five characters with two of each (SUS304); short labels like 3D, 5G, S101 and B1 are translated
+    "part_number": re.compile(r"(?=[A-Z0-9\-_./#]*\d)(?=[A-Z0-9\-_./#]*[A-Z])(?=.{4})[A-Z0-9]+(?:[-_./#][A-Z0-9]+)+"
+                              r"|(?=(?:\d*[A-Z]){2})(?=(?:[A-Z]*\d){2})[A-Z0-9]{5,}"),
+}
+
+# Figure labels (FIG. 1, Fig.2A, FIGS. 3-5) are translated ("图1"), whatever rule they would match
+_FIGURE_LABEL = re.compile(r"fig(?:ure)?s?\.?\s?\d", re.IGNORECASE)
+
+_SCRIPT_RANGES = {
+    "han": "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff",
+    "kana": "\u3040-\u30ff\u31f0-\u31ff",
+    "hangul": "\u1100-\u11ff\u3130-\u318f\uac00-\ud7af",
+    "thai": "\u0e00-\u0e7f",
+    "hebrew": "\u0590-\u05ff",
+    "greek": "\u0370-\u03ff",
+}
+_SCRIPT_RES = {script: re.compile(f"[{chars}]") for script, chars in _SCRIPT_RANGES.items()}
+_LATIN_RE = re.compile(r"[A-Za-zÀ-ɏ]")
+
+# Target language (matched as a substring of its lower-cased name) -> (scripts its text may use, script it must
+# contain). Only scripts that tell the language apart from likely source languages; Latin-script targets are not
+# checked, since an English segment cannot be told from a German one by its script.
+TARGET_SCRIPTS = {
+    "chinese": ({"han"}, "han"),
+    "japanese": ({"han", "kana"}, "kana"),
+    "korean": ({"hangul", "han"}, "hangul"),
+    "thai": ({"thai"}, "thai"),
+    "hebrew": ({"hebrew"}, "hebrew"),
+    "greek": ({"greek"}, "greek"),
+}
+
+
+def target_scripts(target_language: str):
+    name = target_language.lower()
+    for language, scripts in TARGET_SCRIPTS.items():
+        if language in name:
+            return scripts
+    return None
+
+
+def in_target_script(text: str, target_language: str) -> bool:
+    """Whether a segment is already written in the target language's script.
+
+    All non-Latin letters must belong to the target's scripts, including its
+    distinguishing one, and embedded Latin (acronyms, formulas, model numbers)
+    must not outweigh them.
+    """
+    scripts = target_scripts(target_language)
+    if scripts is None:
+        return False
+    allowed, required = scripts
+    counts = {script: len(pattern.findall(text)) for script, pattern in _SCRIPT_RES.items()}
+    if not counts[required] or any(counts[script] for script in counts if script not in allowed):
+        return False
+    letters = sum(1 for ch in text if ch.isalpha())
+    target = sum(counts[script] for script in allowed)
+    latin = len(_LATIN_RE.findall(text))
+    # Letters of scripts not listed above (Cyrillic, Arabic, ...) mean another language
+    if letters - target - latin > 0:
+        return False
+    return latin <= target
+
+
+class SegmentFilter:
+    """Rule-based classifier for segments that need no translation.
+
+    Pure numbers, reference numerals, claim labels, measurements, chemical
+    formulas, URLs and part numbers, segments without letters, and segments
+    already in the target language's script are passed through unchanged
+    instead of being sent to the LLM.
+    """
+
+    def __init__(self, rules: Optional[Iterable[str]] = None, extra_pattern: Optional[str] = None):
+        rules = RULES if rules is None else tuple(rules)
+        unknown = set(rules) - set(RULES)
+        if unknown:
+            raise ValueError(f"Unknown segment filter rules: {', '.join(sorted(unknown))}")
+        self.rules = tuple(rule for rule in RULES if rule in rules)
+        self._patterns = [(rule, _PATTERNS[rule]) for rule in self.rules if rule in _PATTERNS]
+        if extra_pattern:
+            self._patterns.append(("custom", re.compile(extra_pattern)))
+
+    def match(self, text: str) -> Optional[str]:
+        """Name of the language-independent rule that makes text untranslatable, or None"""
+        text = text.strip()
+        if not text or _FIGURE_LABEL.match(text):
+            return None
+        for rule, pattern in self._patterns:
+            if pattern.fullmatch(text):
+                return rule
+        if "symbols" in self.rules and not any(ch.isalpha() for ch in text):
+            return "symbols"
+        return None
+
+    def skipped(self, texts: List[str], target_language: str,
+                matched: Optional[List[Optional[str]]] = None) -> Dict[int, str]:
+        """{index: rule} of the texts to pass through unchanged. matched holds match() of each text
+        when it was already computed, e.g. once for several target languages."""
+        check_script = "target_script" in self.rules and target_scripts(target_language) is not None
+        result = {}
+        for i, text in enumerate(texts):
+            rule = matched[i] if matched is not None else self.match(text)
+            if rule is None and check_script and in_target_script(text, target_language):
+                rule = "target_script"
+            if rule is not None:
+                result[i] = rule
+        return result
+
+
+_shared_filter: Optional[SegmentFilter] = None
+
+
+def get_segment_filter() -> Optional[SegmentFilter]:
+    """Process-wide filter configured by SEGMENT_FILTER_RULES (comma-separated, "none" turns it off)
+    and SEGMENT_FILTER_PATTERN (an extra regular expression for segments to keep as they are)"""
+    global _shared_filter
+    setting = os.environ.get("SEGMENT_FILTER_RULES", ",".join(RULES)).strip()
+    if setting.lower() in ("", "none", "0", "off"):
+        return None
+    if _shared_filter is None:
+        _shared_filter = SegmentFilter([rule.strip() for rule in setting.split(",") if rule.strip()],
+                                       os.environ.get("SEGMENT_FILTER_PATTERN") or None)
+    return _shared_filter
@@ -9,8 +9,10 @@ import sys
 
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from logging_setup import setup_logging
+
+# Set up logging (records are written by a background listener thread)
+setup_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
 def setup_environment():
@@ -29,6 +31,10 @@ def main():
     setup_environment()
     # Import and start the Gradio app
     try:
+        from metrics import start_metrics_server
+        # Prometheus-style /metrics endpoint next to the UI (METRICS_PORT, default 7889; 0 disables)
+        start_metrics_server()
+        
         from gradio_ui import create_interface
         logger.info("Creating Gradio interface...")
         
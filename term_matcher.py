@@ -0,0 +1,138 @@
+import sys
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def fold_case(text: str) -> str:
+    """Lower-case text without changing its length, so match offsets stay valid for the original string"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters (e.g. 'İ') expand when lower-cased; keep those as-is
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class TermMatcher:
+    """Aho-Corasick automaton over glossary terms.
+
+    Built once per glossary, then every lookup is a single linear pass over the
+    text regardless of how many terms the glossary contains.
+    """
+
+    def __init__(self, terms: Iterable[str], case_insensitive: bool = True):
+        self.case_insensitive = case_insensitive
+        self.terms: List[str] = []
+        self._lengths: List[int] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._dict_link: List[int] = [0]  # nearest proper suffix state that ends a term (0 = none)
+        self._terminal: Dict[int, List[int]] = {}  # state -> term ids ending there
+
+        for term in terms:
+            self._add(term)
+        self._build_links()
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def memory_size(self) -> int:
+        """Estimated bytes held by the automaton: sys.getsizeof of its containers, strings and ints.
+
+        Errs high: state ids in the fail/dict links are counted as their own ints (they are
+        after unpickling), Latin-1 edge characters are skipped since Python caches them.
+        """
+        goto, terminal = self._goto, self._terminal
+        size = sum(map(sys.getsizeof, (self.terms, self._lengths, goto, self._fail, self._dict_link, terminal)))
+        size += sum(map(sys.getsizeof, self.terms)) + sum(map(sys.getsizeof, self._lengths))
+        size += sum(map(sys.getsizeof, goto))
+        size += sum(sys.getsizeof(ch) for ch in chain.from_iterable(goto) if ch > "\xff")
+        size += sys.getsizeof(len(goto)) * 3 * (len(goto) - 1)  # goto targets, fail and dict links
+        size += sum(map(sys.getsizeof, terminal.values()))
+        size += sum(map(sys.getsizeof, chain.from_iterable(terminal.values())))
+        return size
+
+    def _fold(self, text: str) -> str:
+        return fold_case(text) if self.case_insensitive else text
+
+    def _add(self, term: str) -> None:
+        term_id = len(self.terms)
+        self.terms.append(term)
+        pattern = self._fold(term)
+        self._lengths.append(len(pattern))
+        if not pattern:
+            return
+        goto = self._goto
+        state = 0
+        for ch in pattern:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][ch] = nxt
+                goto.append({})
+                self._fail.append(0)
+                self._dict_link.append(0)
+            state = nxt
+        self._terminal.setdefault(state, []).append(term_id)
+
+    def _build_links(self) -> None:
+        goto, fail, dict_link, terminal = self._goto, self._fail, self._dict_link, self._terminal
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                dict_link[nxt] = fail[nxt] if fail[nxt] in terminal else dict_link[fail[nxt]]
+                queue.append(nxt)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield every (start, end, term_id) occurrence, overlaps included"""
+        goto, fail, dict_link, terminal, lengths = (
+            self._goto, self._fail, self._dict_link, self._terminal, self._lengths)
+        state = 0
+        for i, ch in enumerate(self._fold(text)):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            out = state if state in terminal else dict_link[state]
+            while out:
+                for term_id in terminal[out]:
+                    yield i + 1 - lengths[term_id], i + 1, term_id
+                out = dict_link[out]
+
+    def find_present(self, text: str) -> List[int]:
+        """Return ids of all terms occurring anywhere in text, in glossary order"""
+        goto, fail, dict_link, terminal = self._goto, self._fail, self._dict_link, self._terminal
+        seen = set()
+        found: List[int] = []
+        state = 0
+        for ch in self._fold(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            out = state if state in terminal else dict_link[state]
+            # Once a state has been reported, its whole suffix chain has been too
+            while out and out not in seen:
+                seen.add(out)
+                found.extend(terminal[out])
+                out = dict_link[out]
+        found.sort()
+        return found
+
+    def find_longest(self, text: str,
+                     allowed: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, int, int]]:
+        """Return non-overlapping (start, end, term_id) matches, preferring the leftmost then longest term"""
+        matches = [m for m in self.iter_matches(text) if allowed is None or allowed(m[2])]
+        matches.sort(key=lambda m: (m[0], m[0] - m[1], m[2]))
+        selected: List[Tuple[int, int, int]] = []
+        cursor = 0
+        for start, end, term_id in matches:
+            if start >= cursor:
+                selected.append((start, end, term_id))
+                cursor = end
+        return selected
@@ -3,13 +3,13 @@
 Test API connection and authentication
 """
 import asyncio
-from openai import AsyncOpenAI
 from prompt import api_key, base_url, model
+from llm_client import chat_completion, get_client
 
 async def test_api():
     """Test API connection"""
     try:
-        client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        client = get_client(api_key, base_url)
         
         print(f"Testing API connection...")
         print(f"API Key: {api_key[:20]}...{api_key[-10:]}")
@@ -18,7 +18,9 @@ async def test_api():
         print("-" * 50)
         
         # Simple test request
-        response = await client.chat.completions.create(
+        # Goes through the shared rate limiter like every other call site
+        response = await chat_completion(
+            client,
             model=model,
             messages=[
                 {"role": "user", "content": "Hello, test message"}
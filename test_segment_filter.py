@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test the segment pre-filter: what is kept as it is and what still goes to the LLM
+(runs with pytest or directly, no API access needed)
+"""
+from segment_filter import SegmentFilter
+
+UNTRANSLATED = {
+    "(102)": "reference",
+    "20a": "reference",
+    "1.": "claim_label",
+    "(a)": "claim_label",
+    "3.5-4.0": "number",
+    "10 mm": "unit",
+    "25 °C": "unit",
+    "H2O": "formula",
+    "Ca(OH)2": "formula",
+    "CuSO4·5H2O": "formula",
+    "XJ-2000": "part_number",
+    "RS-232C": "part_number",
+    "JX3000": "part_number",
+    "https://example.com/patent": "url",
+    "—": "symbols",
+}
+
+# Figure and step labels and short codes carry content that must be translated
+TRANSLATED = ["FIG.1", "FIG. 1", "FIG.2A", "Fig. 3", "FIGS. 4-6", "FIG12", "3D", "5G", "S101", "B1", "M8", "A-1",
+              "Step S101", "The widget assembly is here."]
+
+
+def test_untranslated_segments():
+    segment_filter = SegmentFilter()
+    for text, rule in UNTRANSLATED.items():
+        assert segment_filter.match(text) == rule, (text, segment_filter.match(text))
+
+
+def test_labels_are_translated():
+    segment_filter = SegmentFilter()
+    for text in TRANSLATED:
+        assert segment_filter.match(text) is None, (text, segment_filter.match(text))
+    assert segment_filter.skipped(TRANSLATED, "Chinese") == {}
+
+
+def test_target_script():
+    segment_filter = SegmentFilter()
+    texts = ["这是中文句子。", "FIG.1", "图1所示的装置"]
+    assert segment_filter.skipped(texts, "Chinese") == {0: "target_script", 2: "target_script"}
+    assert segment_filter.skipped(texts, "English") == {}
+
+
+if __name__ == "__main__":
+    test_untranslated_segments()
+    test_labels_are_translated()
+    test_target_script()
+    print("✓ segment filter tests passed")
@@ -0,0 +1,12 @@
+import re
+
+# Scripts where roughly every character is its own token (CJK, kana, hangul, Thai)
+_WIDE_CHAR_RE = re.compile(r"[\u0e00-\u0e7f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token-count estimate without a tokenizer: ~1 token per wide character, ~4 characters per token otherwise"""
+    if not text:
+        return 0
+    wide = len(_WIDE_CHAR_RE.findall(text))
+    return wide + (len(text) - wide + 3) // 4
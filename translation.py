@@ -1,99 +1,509 @@
 import asyncio
+import json
+import os
 import time
-from typing import List, Dict, Optional
-from openai import AsyncOpenAI
+from typing import Callable, List, Dict, Optional, Tuple
 import logging
-from prompt import translation_prompt, model
+from prompt import (translation_prompt, translation_prompt_version, translation_user_prompt,
+                    batch_translation_prompt, model)
+from translation_memory import TranslationMemory
+from token_estimator import estimate_tokens
+from concurrency import AdaptiveConcurrencyLimiter, get_limiter
+from circuit_breaker import CircuitOpenError
+from llm_client import backoff_delay, connection_stats, get_routes, routed_completion
+from rate_limiter import get_rate_limiter
+from logging_setup import payload_logger, sample_payload
+from metrics import LLM_FALLBACK_SEGMENTS, LLM_RETRIES, PHASE_SECONDS
+from job_estimator import usage_cost
 logger = logging.getLogger(__name__)
 
+# Structured output for batched requests: one {id, translation} object per input segment
+BATCH_TRANSLATION_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "strict": True,
+        "name": "batch_translation",
+        "schema": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "translation": {"type": "string"}
+                },
+                "required": ["id", "translation"]
+            }
+        }
+    }
+}
+
+# (index, text, references, memory_key) for a segment that still needs an API call
+PendingSegment = Tuple[int, str, Dict[str, str], Optional[str]]
+
+# Called with (index, translated_text, references) as soon as a segment has a real translation
+ResultCallback = Callable[[int, str, Dict[str, str]], None]
+
+
+def _format_references(references: Dict[str, str]) -> str:
+    if not references:
+        return "[]"
+    return "\n".join([f"{src} -> {tgt}" for src, tgt in references.items()])
+
+
+def translation_messages(system_prompt: str, text: str, target_language: str,
+                         references: Dict[str, str]) -> List[Dict[str, str]]:
+    """Chat messages with the fixed system prompt first and everything per-request after it.
+
+    The system message is byte-identical for every request, so providers that cache
+    prompt prefixes can reuse it; target language, matched terms and the segment go
+    in the user message.
+    """
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": translation_user_prompt.format(
+            target_language=target_language,
+            ref_text=_format_references(references),
+            text=text
+        )}
+    ]
+
+
 class TranslationService:
     """Service for translating text using OpenAI API"""
 
-    def __init__(self, api_key: str, base_url: str = "https://openrouter.ai/api/v1", glossary_manager=None):
+    def __init__(self, api_key: str, base_url: str = "https://openrouter.ai/api/v1", glossary_manager=None,
+                 translation_memory: Optional[TranslationMemory] = None, batch_mode: Optional[bool] = None,
+                 limiter: Optional[AdaptiveConcurrencyLimiter] = None):
         self.api_key = api_key
         self.base_url = base_url
-        self.client = AsyncOpenAI(
-            base_url=base_url,
-            api_key=api_key,
-        )
-        self.MAX_WORKERS = 100
+        # The primary model, then fallback routes used while its circuit is open; each route
+        # has one AsyncOpenAI client per endpoint on the process-wide HTTP connection pool
+        self.routes = get_routes(api_key, base_url)
+        # Adaptive (AIMD) limit on in-flight API calls, shared process-wide by default
+        self.limiter = limiter or get_limiter()
         self.glossary_manager = glossary_manager
-        
-    async def translate_text_single(self, text: str, target_language: str, max_retries=3) -> tuple[str, dict]:
-        """Single text translation function with client instance support and 15-second timeout retry.
-        Returns a tuple of (translated_text, references_dict).
+        self.translation_memory = translation_memory
+
+        # Batching: pack short segments into one request up to a token budget
+        if batch_mode is None:
+            batch_mode = os.environ.get("TRANSLATION_BATCH_MODE", "0").lower() in ("1", "true", "yes")
+        self.batch_mode = batch_mode
+        self.BATCH_TOKEN_BUDGET = int(os.environ.get("TRANSLATION_BATCH_TOKEN_BUDGET", "2000"))
+        self.BATCH_MAX_SEGMENTS = int(os.environ.get("TRANSLATION_BATCH_MAX_SEGMENTS", "40"))
+        self.BATCH_SEGMENT_MAX_TOKENS = int(os.environ.get("TRANSLATION_BATCH_SEGMENT_MAX_TOKENS", "300"))
+        # Overall deadline per translate_texts_parallel job in seconds; 0 means none
+        self.job_deadline = float(os.environ.get("TRANSLATION_JOB_DEADLINE", "0"))
+
+    @staticmethod
+    def _record_usage(stats: Optional[Dict], response, segment_tokens: Optional[Dict[int, int]] = None,
+                      segments: Optional[List[Tuple[int, str]]] = None, model_name: str = model) -> None:
+        """Count one API call, its token usage and cost (at model_name's prices) in the per-job stats.
+
+        When segment_tokens is given, the call's total tokens are also attributed to the
+        (index, text) segments it translated, split by their estimated size.
         """
-        references = {}
-        
-        # Use glossary manager if available
-        if self.glossary_manager:
-            references = self.glossary_manager.find_terms_in_text(text)
-        
-        if references:
-            ref_text = "\n".join([f"{src} -> {tgt}" for src, tgt in references.items()])
-            prompt = translation_prompt.format(
-                ref_text=ref_text,
-                target_language=target_language
-            )
+        usage = getattr(response, 'usage', None)
+        prompt_tokens = getattr(usage, 'prompt_tokens', None) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', None) or 0
+        # Prompt tokens served from the provider's prefix cache, when it reports them
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = getattr(details, 'cached_tokens', None) or 0
+        if stats is not None:
+            stats['api_calls'] = stats.get('api_calls', 0) + 1
+            stats['prompt_tokens'] = stats.get('prompt_tokens', 0) + prompt_tokens
+            stats['completion_tokens'] = stats.get('completion_tokens', 0) + completion_tokens
+            stats['cached_tokens'] = stats.get('cached_tokens', 0) + cached_tokens
+            stats['cost_usd'] = stats.get('cost_usd', 0.0) + usage_cost(prompt_tokens, completion_tokens, cached_tokens,
+                                                                        model_name)
+            model_calls = stats.setdefault('model_calls', {})
+            model_calls[model_name] = model_calls.get(model_name, 0) + 1
+        if segment_tokens is not None and segments:
+            total = prompt_tokens + completion_tokens
+            weights = [max(estimate_tokens(text), 1) for _index, text in segments]
+            for (index, _text), weight in zip(segments, weights):
+                segment_tokens[index] = segment_tokens.get(index, 0) + round(total * weight / sum(weights))
+
+    @staticmethod
+    def _mark_fallback(stats: Optional[Dict], index: Optional[int], reason: Optional[str] = None) -> None:
+        """Count a segment left in its source text; its index goes to stats['fallback_indices']
+        so callers can mark it and translate it again later"""
+        LLM_FALLBACK_SEGMENTS.inc()
+        if stats is None:
+            return
+        stats['fallback_segments'] = stats.get('fallback_segments', 0) + 1
+        if reason is not None:
+            stats[reason] = stats.get(reason, 0) + 1
+        if index is not None:
+            stats.setdefault('fallback_indices', []).append(index)
+
+    def recovery_delay(self) -> float:
+        """Seconds until the primary model's circuit lets calls through again (0 when closed)"""
+        return self.routes[0].breaker.retry_after()
+
+    def _match_segment(self, text: str, target_language: str, use_memory: bool, stats: Optional[Dict],
+                       glossary=None, references: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, str], Optional[str]]:
+        """Glossary lookup for one segment. Returns (references, memory_key); the key is None
+        when the translation memory is not used. Given references (already matched for this
+        text) skip the glossary lookup."""
+        if references is not None:
+            glossary = None
         else:
-            prompt = translation_prompt.format(
-                ref_text="[]",
-                target_language=target_language
-            )
-        logger.info(f"prompt: {prompt}")
-        
+            references = {}
+            # A job's glossary snapshot takes precedence over the service's glossary manager
+            if glossary is None:
+                glossary = self.glossary_manager
+        if glossary is not None:
+            started = time.perf_counter()
+            references = glossary.find_terms_in_text(text)
+            if stats is not None:
+                timings = stats.setdefault('timings', {})
+                timings['glossary_match'] = timings.get('glossary_match', 0.0) + time.perf_counter() - started
+
+        memory_key = None
+        if self.translation_memory is not None and use_memory:
+            memory_key = TranslationMemory.make_key(text, target_language, model,
+                                                    translation_prompt_version, references)
+        return references, memory_key
+
+    async def _lookup_memory(self, memory_keys: List[Optional[str]], refresh_memory: bool,
+                             stats: Optional[Dict]) -> List[Optional[str]]:
+        """Stored translations for the keys (None for misses and missing keys), read in a worker
+        thread with one query so SQLite never blocks the event loop"""
+        wanted = [key for key in memory_keys if key is not None]
+        if not wanted or refresh_memory:
+            return [None] * len(memory_keys)
+        found = await asyncio.to_thread(self.translation_memory.get_many, wanted)
+        if stats is not None:
+            hits = sum(1 for key in wanted if key in found)
+            stats['memory_hits'] = stats.get('memory_hits', 0) + hits
+            stats['memory_misses'] = stats.get('memory_misses', 0) + len(wanted) - hits
+        return [found.get(key) if key is not None else None for key in memory_keys]
+
+    def _prepare_segment(self, text: str, target_language: str, use_memory: bool, refresh_memory: bool,
+                         stats: Optional[Dict], glossary=None,
+                         references: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, str], Optional[str], Optional[str]]:
+        """Glossary lookup and read-only translation-memory check for one segment, for dry runs
+        outside the event loop. Returns (references, memory_key, cached_translation); the memory's
+        LRU order and hit counters are left untouched.
+        """
+        references, memory_key = self._match_segment(text, target_language, use_memory, stats, glossary, references)
+        cached = None
+        if memory_key is not None and not refresh_memory:
+            cached = self.translation_memory.peek(memory_key)
+        return references, memory_key, cached
+
+    async def translate_text_single(self, text: str, target_language: str, max_retries=3,
+                                    use_memory: bool = True, refresh_memory: bool = False,
+                                    stats: Optional[Dict] = None, glossary=None) -> tuple[str, dict]:
+        """Single text translation function with per-attempt timeouts, hedging and retries.
+        Returns a tuple of (translated_text, references_dict).
+
+        With a translation memory configured, hits skip the API call; refresh_memory
+        ignores stored entries but still overwrites them with the new translation.
+        """
+        references, memory_key = self._match_segment(text, target_language, use_memory, stats, glossary)
+        cached, = await self._lookup_memory([memory_key], refresh_memory, stats)
+        if cached is not None:
+            return cached, references
+        return await self._request_single(text, target_language, references, memory_key, max_retries, stats)
+
+    async def _request_single(self, text: str, target_language: str, references: Dict[str, str],
+                              memory_key: Optional[str], max_retries: int = 3,
+                              stats: Optional[Dict] = None, index: Optional[int] = None,
+                              on_result: Optional[ResultCallback] = None,
+                              segment_tokens: Optional[Dict[int, int]] = None) -> tuple[str, dict]:
+        """Translate one segment with its own chat completion. on_result is not called
+        when every attempt fails and the original text is returned."""
+        messages = translation_messages(translation_prompt, text, target_language, references)
+
         for attempt in range(max_retries):
             try:
-                response = await self.client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": prompt
-                        },
-                        {
-                            "role": "user",
-                            "content": text
-                        }
-                    ],
-                    temperature=0.3
+                response, route = await routed_completion(
+                    self.routes,
+                    self.limiter,
+                    messages=messages,
+                    temperature=0.3,
+                    hedge=True,
+                    stats=stats
                 )
-              
+                self._record_usage(stats, response, segment_tokens, [(index, text)], route.model)
+
                 translated_text = response.choices[0].message.content.strip()
-                print("translated_text: ",translated_text)
+                if sample_payload():
+                    payload_logger.info("prompt: %s\ntranslation: %s", messages[1]['content'], translated_text)
+                # Memory entries are keyed by the primary model; fallback translations are not kept
+                if memory_key is not None and route is self.routes[0]:
+                    self.translation_memory.put(memory_key, target_language, translated_text)
+                if on_result is not None:
+                    on_result(index, translated_text, references)
                 return translated_text, references
+            except CircuitOpenError as e:
+                # Every route is down: fail fast instead of retrying, the segment is re-translated later
+                logger.error(f"Translation short-circuited: {e}")
+                self._mark_fallback(stats, index, 'circuit_open_fallbacks')
+                return text, references
             except Exception as e:
                 import traceback
                 logger.error(f"Translation attempt {attempt + 1}/{max_retries} failed: {e}")
                 logger.error(f"Full traceback: {traceback.format_exc()}")
-                
+
                 if attempt == max_retries - 1:
                     # Last attempt failed, return original text
                     logger.error(f"All {max_retries} attempts failed for translation, returning original text")
+                    self._mark_fallback(stats, index)
                     return text, references
-                
-                # Wait before retry (exponential backoff)
-                await asyncio.sleep(2 ** attempt)
-            
-    
-    async def translate_texts_parallel(self, texts: List[str], target_language: str) -> List[tuple[str, dict]]:
-        """Parallel translation of multiple texts. Returns list of (translated_text, references_dict) in input order."""
+
+                # Wait before retry (exponential backoff with jitter)
+                LLM_RETRIES.labels("translate").inc()
+                await asyncio.sleep(backoff_delay(attempt))
+
+    def _plan_batches(self, pending: List[PendingSegment]) -> Tuple[List[PendingSegment], List[List[PendingSegment]]]:
+        """Split pending segments into long ones sent alone and batches of short ones within the token budget"""
+        singles: List[PendingSegment] = []
+        batches: List[List[PendingSegment]] = []
+        current: List[PendingSegment] = []
+        current_tokens = 0
+        for item in pending:
+            tokens = estimate_tokens(item[1])
+            if tokens > self.BATCH_SEGMENT_MAX_TOKENS:
+                singles.append(item)
+                continue
+            if current and (current_tokens + tokens > self.BATCH_TOKEN_BUDGET
+                            or len(current) >= self.BATCH_MAX_SEGMENTS):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(item)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return singles, batches
+
+    @staticmethod
+    def _parse_batch_response(content: str, count: int) -> List[str]:
+        """Validate a batched response; raises ValueError on missing, extra or malformed items
+        (including an empty response and ids that are not integers), so the batch is split"""
+        try:
+            items = json.loads(content)
+            if not isinstance(items, list):
+                raise ValueError("batch response is not a JSON array")
+            translations = {}
+            for item in items:
+                if not isinstance(item, dict):
+                    raise ValueError(f"malformed batch item: {item!r}")
+                translations[int(item["id"])] = str(item["translation"]).strip()
+        except (TypeError, KeyError) as e:
+            raise ValueError(f"malformed batch response: {e!r}") from e
+        if len(items) != count or sorted(translations) != list(range(count)):
+            raise ValueError(f"expected ids 0..{count - 1}, got {sorted(translations)}")
+        if not all(translations.values()):
+            raise ValueError("batch response contains empty translations")
+        return [translations[i] for i in range(count)]
+
+    async def _request_batch(self, batch: List[PendingSegment], target_language: str,
+                             max_retries: int = 3, stats: Optional[Dict] = None,
+                             on_result: Optional[ResultCallback] = None,
+                             segment_tokens: Optional[Dict[int, int]] = None) -> Dict[int, tuple[str, dict]]:
+        """Translate several short segments in one request. A response with missing or extra
+        items splits the batch in half and retries each half; single segments use the normal path.
+        When every attempt fails for another reason (transport error, timeout, 5xx) the segments
+        keep their source text instead, so an outage does not multiply the requests.
+        """
+        if len(batch) == 1:
+            index, text, references, memory_key = batch[0]
+            return {index: await self._request_single(text, target_language, references, memory_key,
+                                                      max_retries, stats, index, on_result, segment_tokens)}
+
+        merged_references = {}
+        for _, _, references, _ in batch:
+            merged_references.update(references)
+        payload = json.dumps([{"id": i, "text": item[1]} for i, item in enumerate(batch)], ensure_ascii=False)
+        messages = translation_messages(batch_translation_prompt, payload, target_language, merged_references)
+
+        translations = None
+        invalid = False
+        for attempt in range(max_retries):
+            try:
+                response, route = await routed_completion(
+                    self.routes,
+                    self.limiter,
+                    messages=messages,
+                    temperature=0.3,
+                    response_format=BATCH_TRANSLATION_SCHEMA,
+                    hedge=True,
+                    stats=stats
+                )
+                self._record_usage(stats, response, segment_tokens, [(item[0], item[1]) for item in batch],
+                                   route.model)
+                translations = self._parse_batch_response(response.choices[0].message.content, len(batch))
+                if sample_payload():
+                    payload_logger.info("prompt: %s\ntranslation: %s", messages[1]['content'],
+                                        response.choices[0].message.content)
+                break
+            except ValueError as e:
+                logger.warning(f"Batch of {len(batch)} segments returned an invalid response: {e}")
+                invalid = True
+                break
+            except CircuitOpenError as e:
+                logger.error(f"Batch translation short-circuited: {e}")
+                results = {}
+                for index, text, references, _memory_key in batch:
+                    self._mark_fallback(stats, index, 'circuit_open_fallbacks')
+                    results[index] = (text, references)
+                return results
+            except Exception as e:
+                logger.error(f"Batch translation attempt {attempt + 1}/{max_retries} failed: {e}")
+                if attempt < max_retries - 1:
+                    LLM_RETRIES.labels("translate_batch").inc()
+                    await asyncio.sleep(backoff_delay(attempt))
+
+        if translations is None and not invalid:
+            logger.error(f"All {max_retries} attempts failed for a batch of {len(batch)} segments,"
+                         f" returning original text")
+            results = {}
+            for index, text, references, _memory_key in batch:
+                self._mark_fallback(stats, index)
+                results[index] = (text, references)
+            return results
+
+        if translations is None:
+            # Malformed or mismatched JSON: smaller batches are more likely to come back intact
+            if stats is not None:
+                stats['batch_splits'] = stats.get('batch_splits', 0) + 1
+            mid = len(batch) // 2
+            left, right = await asyncio.gather(
+                self._request_batch(batch[:mid], target_language, max_retries, stats, on_result, segment_tokens),
+                self._request_batch(batch[mid:], target_language, max_retries, stats, on_result, segment_tokens),
+            )
+            return {**left, **right}
+
+        if stats is not None:
+            stats['batch_requests'] = stats.get('batch_requests', 0) + 1
+            stats['batched_segments'] = stats.get('batched_segments', 0) + len(batch)
+        results = {}
+        for (index, _text, references, memory_key), translated_text in zip(batch, translations):
+            if memory_key is not None and route is self.routes[0]:
+                self.translation_memory.put(memory_key, target_language, translated_text)
+            if on_result is not None:
+                on_result(index, translated_text, references)
+            results[index] = (translated_text, references)
+        return results
+
+    @staticmethod
+    async def _gather_until(coros: List, deadline: float) -> List:
+        """Results of the coroutines that finish within deadline seconds (all of them when deadline is 0);
+        the rest are cancelled"""
+        if not deadline:
+            return await asyncio.gather(*coros)
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=deadline)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        return [task.result() for task in tasks if task in done]
+
+    async def translate_texts_parallel(self, texts: List[str], target_language: str,
+                                       use_memory: bool = True, refresh_memory: bool = False,
+                                       stats: Optional[Dict] = None,
+                                       batch_mode: Optional[bool] = None,
+                                       on_result: Optional[ResultCallback] = None,
+                                       glossary=None,
+                                       segment_tokens: Optional[Dict[int, int]] = None,
+                                       deadline: Optional[float] = None,
+                                       references: Optional[List[Dict[str, str]]] = None) -> List[tuple[str, dict]]:
+        """Parallel translation of multiple texts. Returns list of (translated_text, references_dict) in input order.
+
+        use_memory=False bypasses the translation memory for this job, refresh_memory=True
+        re-translates every segment and replaces the stored entries. batch_mode overrides the
+        service setting for packing short segments into shared requests. Per-job counters
+        (API calls, tokens, memory hits, batches) are added to stats when given.
+        on_result is called for each segment as soon as it is translated (or found in memory),
+        so callers can checkpoint progress before the whole job finishes. glossary is the
+        job's immutable glossary snapshot (see glossary_registry.Glossary); without it the
+        service's glossary manager is used. segment_tokens, when given, receives the tokens
+        spent on each text (by index), with batched calls split by segment size.
+        deadline (seconds, default self.job_deadline) bounds the whole job: segments still
+        unfinished when it passes keep their source text and are counted as fallbacks.
+        references, when given, holds each text's glossary matches found beforehand (e.g. once
+        for several target languages), so the glossary is not scanned again.
+        """
         if not texts:
             return []
-        translated_texts: List[tuple[str, dict]] = [("", {})] * len(texts)
-        sem = asyncio.Semaphore(self.MAX_WORKERS)
-       
-        # 开始翻译
-        async def translate_task(index, text):
-            async with sem:
-                translated_text, references = await self.translate_text_single(text, target_language)
-                logger.info(f"Completed translation {index + 1}/{len(texts)}")
-                return index, translated_text, references
-            
-        tasks = [translate_task(i, text) for i, text in enumerate(texts)]
-        results = await asyncio.gather(*tasks)
-        
-        for index, translated_text, references in results:
-            translated_texts[index] = (translated_text, references)
-        
-        return translated_texts 
\ No newline at end of file
+        if batch_mode is None:
+            batch_mode = self.batch_mode
+        if stats is None:
+            stats = {}
+        if deadline is None:
+            deadline = self.job_deadline
+        matched = references
+        translated_texts: List[Optional[tuple[str, dict]]] = [None] * len(texts)
+        # References of every prepared segment, for source-text fallbacks when the deadline passes
+        prepared: Dict[int, Dict[str, str]] = {}
+        started = time.perf_counter()
+        match_seconds = stats.get('timings', {}).get('glossary_match', 0.0)
+        segments = [self._match_segment(text, target_language, use_memory, stats, glossary,
+                                        matched[index] if matched is not None else None)
+                    for index, text in enumerate(texts)]
+        cached_texts = await self._lookup_memory([memory_key for _, memory_key in segments], refresh_memory, stats)
+
+        if not batch_mode:
+            # 开始翻译
+            # 并发由 self.limiter 在每次 API 调用处控制
+            async def translate_task(index, text):
+                references, memory_key = segments[index]
+                cached = cached_texts[index]
+                prepared[index] = references
+                if cached is not None:
+                    translated_text = cached
+                    if on_result is not None:
+                        on_result(index, cached, references)
+                else:
+                    translated_text, references = await self._request_single(
+                        text, target_language, references, memory_key, stats=stats,
+                        index=index, on_result=on_result, segment_tokens=segment_tokens)
+                logger.debug(f"Completed translation {index + 1}/{len(texts)}")
+                return {index: (translated_text, references)}
+
+            tasks = [translate_task(i, text) for i, text in enumerate(texts)]
+        else:
+            pending: List[PendingSegment] = []
+            for index, text in enumerate(texts):
+                references, memory_key = segments[index]
+                cached = cached_texts[index]
+                prepared[index] = references
+                if cached is not None:
+                    translated_texts[index] = (cached, references)
+                    if on_result is not None:
+                        on_result(index, cached, references)
+                else:
+                    pending.append((index, text, references, memory_key))
+            singles, batches = self._plan_batches(pending)
+
+            async def batch_task(batch: List[PendingSegment]):
+                results = await self._request_batch(batch, target_language, stats=stats, on_result=on_result,
+                                                    segment_tokens=segment_tokens)
+                logger.debug(f"Completed batch of {len(batch)} segments")
+                return results
+
+            tasks = [batch_task([item]) for item in singles] + [batch_task(batch) for batch in batches]
+
+        for results in await self._gather_until(tasks, deadline):
+            for index, result in results.items():
+                translated_texts[index] = result
+        expired = [index for index, result in enumerate(translated_texts) if result is None]
+        if expired:
+            logger.error(f"Job deadline of {deadline}s passed, {len(expired)} segments keep their source text")
+            for index in expired:
+                self._mark_fallback(stats, index, 'deadline_fallbacks')
+                translated_texts[index] = (texts[index], prepared.get(index, {}))
+
+        stats['translate_seconds'] = stats.get('translate_seconds', 0.0) + time.perf_counter() - started
+        stats['concurrency'] = self.limiter.snapshot()
+        stats['rate_limit'] = get_rate_limiter().snapshot()
+        stats['connections'] = connection_stats.snapshot()
+        PHASE_SECONDS.labels('glossary_match').observe(
+            stats.get('timings', {}).get('glossary_match', 0.0) - match_seconds)
+        return translated_texts
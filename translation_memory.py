@@ -0,0 +1,214 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_PATH = os.environ.get("TRANSLATION_MEMORY_PATH", os.path.join("cache", "translation_memory.db"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("TRANSLATION_MEMORY_MAX_ENTRIES", "200000"))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_segment(text: str) -> str:
+    """Normalize a source segment for lookups: NFC, collapsed whitespace, trimmed"""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class TranslationMemory:
+    """Persistent translation memory backed by SQLite in WAL mode.
+
+    Entries are keyed on the normalized source text, target language, model,
+    prompt version and the glossary references used for the segment, so a
+    change to any of them is a miss rather than a stale hit.
+
+    Writes are queued and committed in batches by a background writer thread,
+    so callers on the event loop never wait for SQLite; queued entries are
+    visible to lookups before they reach the database.
+    """
+
+    EVICT_EVERY = 500  # writes between size checks
+    WRITE_BATCH = 200  # entries committed per transaction at most
+    QUERY_CHUNK = 500  # keys per SELECT ... IN query
+
+    def __init__(self, path: str = DEFAULT_MEMORY_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory ("
+            " key TEXT PRIMARY KEY,"
+            " target_language TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memory_last_used ON memory(last_used)")
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        # Translations queued for the writer thread and not committed yet: {key: translation}
+        self._unwritten: Dict[str, str] = {}
+        self._unwritten_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="translation-memory-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def make_key(text: str, target_language: str, model: str, prompt_version: str,
+                 references: Dict[str, str]) -> str:
+        """Build the lookup key for one segment"""
+        refs = json.dumps(sorted(references.items()), ensure_ascii=False)
+        refs_hash = hashlib.sha256(refs.encode("utf-8")).hexdigest()
+        payload = json.dumps(
+            [normalize_segment(text), target_language.strip().lower(), model, prompt_version, refs_hash],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the stored translation for key, or None on a miss"""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """{key: translation} of the keys found, in one query per chunk of keys.
+        Hits are marked as used and counted with the misses."""
+        keys = list(dict.fromkeys(keys))
+        found = self._lookup(keys)
+        with self._lock:
+            if found:
+                now = time.time()
+                hits = list(found)
+                for start in range(0, len(hits), self.QUERY_CHUNK):
+                    chunk = hits[start:start + self.QUERY_CHUNK]
+                    self._conn.execute(f"UPDATE memory SET last_used = ? WHERE key IN ({','.join('?' * len(chunk))})",
+                                       [now, *chunk])
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def peek(self, key: str) -> Optional[str]:
+        """Stored translation for key without marking it used or counting a hit/miss (for dry runs)"""
+        return self._lookup([key]).get(key)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, str]:
+        found = {}
+        for key in keys:
+            translation = self._unwritten.get(key)
+            if translation is not None:
+                found[key] = translation
+        rest = [key for key in keys if key not in found]
+        with self._lock:
+            for start in range(0, len(rest), self.QUERY_CHUNK):
+                chunk = rest[start:start + self.QUERY_CHUNK]
+                found.update(self._conn.execute(
+                    f"SELECT key, translation FROM memory WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+        return found
+
+    def put(self, key: str, target_language: str, translation: str) -> None:
+        """Queue a translation for storage; the writer thread commits it and evicts least
+        recently used entries when over capacity"""
+        now = time.time()
+        with self._unwritten_lock:
+            self._unwritten[key] = translation
+        self._queue.put((key, target_language.strip().lower(), translation, now, now))
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < self.WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            try:
+                if rows:
+                    self._write(rows)
+            except Exception:
+                logger.exception(f"Translation memory failed to store {len(rows)} entries")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _write(self, rows: List[tuple]) -> None:
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO memory (key, target_language, translation, created_at, last_used)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                before = self._writes
+                self._writes += len(rows)
+                if self._writes // self.EVICT_EVERY > before // self.EVICT_EVERY:
+                    self._evict()
+                self._conn.execute("COMMIT")
+            except Exception:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+            finally:
+                with self._unwritten_lock:
+                    for key, _, translation, _, _ in rows:
+                        if self._unwritten.get(key) is translation:
+                            del self._unwritten[key]
+
+    def flush(self) -> None:
+        """Wait until every queued translation is committed"""
+        if self._writer.is_alive():
+            self._queue.join()
+
+    def _evict(self) -> None:
+        cursor = self._conn.execute(
+            "DELETE FROM memory WHERE key IN ("
+            " SELECT key FROM memory ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        if cursor.rowcount:
+            logger.info(f"Translation memory evicted {cursor.rowcount} entries")
+
+    def invalidate(self, target_language: Optional[str] = None) -> int:
+        """Drop all entries, or only those for one target language. Returns the number removed."""
+        self.flush()
+        with self._lock:
+            if target_language is None:
+                cursor = self._conn.execute("DELETE FROM memory")
+            else:
+                cursor = self._conn.execute("DELETE FROM memory WHERE target_language = ?",
+                                            (target_language.strip().lower(),))
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters since start-up and the current number of entries"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self) -> None:
+        """Commit the queued translations, stop the writer thread and close the database"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        atexit.unregister(self.flush)
+        with self._lock:
+            self._conn.close()
@@ -1,36 +1,190 @@
 import docx
 import docx.shared
-from docx.oxml.ns import qn
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
 from docx.enum.text import WD_COLOR_INDEX
 from docx.text.paragraph import Paragraph
+from docx.text.run import Run
 import os
 import copy
+import contextlib
 import threading
 import concurrent.futures
 import time
-from typing import List, Dict, Tuple, Optional
-import re
+from typing import Awaitable, Callable, List, Dict, Set, Tuple, Optional
 import logging
 import asyncio
 
 from translation import TranslationService
+from prompt import model, translation_prompt_version
+from job_journal import JobJournal, file_digest
+from glossary_registry import Glossary
+from metrics import PHASE_SECONDS, SEGMENTS_SKIPPED
+from job_estimator import estimate_requests, summarize_estimate
+from translation_memory import normalize_segment
 from glossary_manager import GlossaryManager
+from term_matcher import TermMatcher
+from segment_filter import get_segment_filter
 
 logger = logging.getLogger(__name__)
 
+# 所有尝试都失败、保留原文的片段在输出中加此标记，便于审阅；这些片段不写入任务日志，重新运行任务时会再次翻译
+FALLBACK_MARKER = "[UNTRANSLATED] "
+# 有片段保留原文的任务最多运行的次数（含第一次），以及再次运行前的基础等待秒数
+RETRANSLATE_ATTEMPTS = int(os.environ.get("RETRANSLATE_ATTEMPTS", "3"))
+RETRANSLATE_DELAY = float(os.environ.get("RETRANSLATE_DELAY", "30"))
+
+
+@contextlib.contextmanager
+def phase_timer(stats: Optional[Dict], phase: str):
+    """累计某个处理阶段的耗时（秒）到 stats['timings'][phase]，并记入阶段耗时直方图"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        PHASE_SECONDS.labels(phase).observe(elapsed)
+        if stats is not None:
+            timings = stats.setdefault('timings', {})
+            timings[phase] = timings.get(phase, 0.0) + elapsed
+
+
+# 对照输出用的元素原型：只解析一次，之后通过 deepcopy 复制
+_PARAGRAPH_PROTO = parse_xml(f'<w:p {nsdecls("w")}/>')
+_RUN_PROTO = parse_xml(f'<w:r {nsdecls("w")}><w:t xml:space="preserve"/></w:r>')
+_RED_COLOR_PROTO = parse_xml(f'<w:color {nsdecls("w")} w:val="FF0000"/>')
+_W_R = qn('w:r')
+_W_T = qn('w:t')
+_W_RPR = qn('w:rPr')
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+_W_HIGHLIGHT = qn('w:highlight')
+_W_VAL = qn('w:val')
+_HIGHLIGHT_PROTO = parse_xml(f'<w:highlight {nsdecls("w")} w:val="yellow"/>')
+# w:rPr 中位于 w:highlight 之后的元素
+_HIGHLIGHT_SUCCESSORS = frozenset(qn(tag) for tag in (
+    'w:u', 'w:effect', 'w:bdr', 'w:shd', 'w:fitText', 'w:vertAlign', 'w:rtl', 'w:cs',
+    'w:em', 'w:lang', 'w:eastAsianLayout', 'w:specVanish', 'w:oMath'))
+
+
+def _translation_run(text: str, source_rpr=None):
+    """创建红色译文运行元素；给定 source_rpr 时复制其格式"""
+    run = copy.deepcopy(_RUN_PROTO)
+    if source_rpr is not None:
+        rpr = copy.deepcopy(source_rpr)
+        color_elem = rpr.find(qn('w:color'))
+        if color_elem is not None:
+            color_elem.set(qn('w:val'), 'FF0000')
+        else:
+            rpr.append(copy.deepcopy(_RED_COLOR_PROTO))
+    else:
+        rpr = run.makeelement(qn('w:rPr'), {})
+        rpr.append(copy.deepcopy(_RED_COLOR_PROTO))
+    run.insert(0, rpr)
+    run[-1].text = text
+    return run
+
+
+def _plain_run_text(r) -> Optional[str]:
+    """纯文本运行（仅含 w:rPr 与一个 w:t）直接返回其文本，否则返回 None"""
+    text = None
+    for child in r:
+        if child.tag == _W_T and text is None:
+            text = child.text or ""
+        elif child.tag != _W_RPR:
+            return None
+    return text if text is not None else ""
+
+
+def _set_run_text(r, text: str, plain: bool, paragraph) -> None:
+    """设置运行文本；纯文本运行直接写 w:t，其他情况交给 python-docx 处理制表符、换行等"""
+    if not plain:
+        Run(r, paragraph).text = text
+        return
+    t = r.find(_W_T)
+    if t is None:
+        t = r.makeelement(_W_T, {})
+        r.append(t)
+    t.text = text
+    t.set(_XML_SPACE, 'preserve')
+
+
+def _set_highlight(r, highlighted: bool) -> None:
+    """设置或清除运行的黄色高亮（直接操作 w:rPr，按架构顺序插入 w:highlight）"""
+    rpr = r.find(_W_RPR)
+    if rpr is None:
+        if not highlighted:
+            return
+        rpr = r.makeelement(_W_RPR, {})
+        r.insert(0, rpr)
+    highlight = rpr.find(_W_HIGHLIGHT)
+    if not highlighted:
+        if highlight is not None:
+            rpr.remove(highlight)
+        return
+    if highlight is not None:
+        highlight.set(_W_VAL, 'yellow')
+        return
+    highlight = copy.deepcopy(_HIGHLIGHT_PROTO)
+    for child in rpr:
+        if child.tag in _HIGHLIGHT_SUCCESSORS:
+            child.addprevious(highlight)
+            return
+    rpr.append(highlight)
+
+
+def paragraph_elements(body) -> List[Tuple[str, object]]:
+    """按固定顺序列出需要处理的 w:p 元素：正文段落，然后是各表格单元格中的段落。
+
+    直接遍历 XML，每个 w:tc 只出现一次（合并单元格不会重复），且同一正文的
+    deepcopy 副本会得到一一对应的列表。
+    """
+    elements = [('paragraph', p) for p in body.iterchildren(qn('w:p'))]
+    for tbl in body.iterchildren(qn('w:tbl')):
+        for tr in tbl.iterchildren(qn('w:tr')):
+            for tc in tr.iterchildren(qn('w:tc')):
+                for p in tc.iterchildren(qn('w:p')):
+                    elements.append(('table_cell', p))
+    return elements
+
+
+def dedup_segments(texts: List[str]) -> Tuple[List[str], List[int]]:
+    """规范化后相同的片段只保留一个；返回 (去重后的片段, 每个原位置对应的去重下标)"""
+    unique_texts = []
+    unique_index = {}  # 规范化文本 -> unique_texts 中的下标
+    positions = []
+    for text in texts:
+        key = normalize_segment(text)
+        if key not in unique_index:
+            unique_index[key] = len(unique_texts)
+            unique_texts.append(text)
+        positions.append(unique_index[key])
+    return unique_texts, positions
+
+
+def replace_body(doc, new_body) -> None:
+    """用 new_body 的子元素替换文档正文内容（保留 Document 对 body 元素的引用）"""
+    body = doc.element.body
+    for child in list(body):
+        body.remove(child)
+    body.extend(list(new_body))
+
+
 class WordTranslationService:
     """Word document translation service preserving format"""
     
-    def __init__(self, api_key: str, base_url: str = "https://openrouter.ai/api/v1", glossary_manager=None):
+    def __init__(self, api_key: str, base_url: str = "https://openrouter.ai/api/v1", glossary_manager=None,
+                 translation_memory=None, job_journal: Optional[JobJournal] = None):
         self.api_key = api_key
         self.base_url = base_url
         self.glossary_manager = glossary_manager or GlossaryManager()
+        # 断点续译：已完成的片段逐个写入任务日志，重跑同一任务时只翻译缺失部分
+        self.job_journal = job_journal
         
-        self.translator = TranslationService(api_key, base_url, self.glossary_manager)
+        self.translator = TranslationService(api_key, base_url, self.glossary_manager, translation_memory)
+        # 无需翻译的片段在本地识别并原样保留（见 segment_filter.py）；设为 None 则全部发送
+        self.segment_filter = get_segment_filter()
         
-        # 并发配置
-        self.MAX_WORKERS = 100
-        self.RATE_LIMIT_DELAY = 0.1
+        # 并发与 RPM/TPM 配额由进程内共享的限流器控制（见 concurrency.py、rate_limiter.py）
         
     def copy_paragraph_format(self, source_paragraph, target_paragraph):
         """复制段落格式到目标段落"""
@@ -177,58 +331,26 @@ class WordTranslationService:
             return False
 
     def insert_translation_simple(self, paragraph, translated_text: str) -> bool:
-        """简单的翻译插入方法。返回新插入的段落对象，失败返回 False。"""
+        """简单的翻译插入方法。返回新插入的段落对象，失败返回 False。
+
+        译文段落紧跟在原段落之后（addnext，O(1)），元素由缓存的原型复制而来。
+        """
         try:
-            # 获取段落所在的父元素
-            parent = paragraph._element.getparent()
+            p = paragraph._element
             
-            # 创建新的段落元素
-            new_para = docx.oxml.parse_xml(r'<w:p xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"/>')
+            # 创建新的段落元素，复制段落格式
+            new_para = copy.deepcopy(_PARAGRAPH_PROTO)
+            original_ppr = p.find(qn('w:pPr'))
+            if original_ppr is not None:
+                new_para.append(copy.deepcopy(original_ppr))
             
-            # 创建段落属性元素来复制格式
-            if paragraph._element.find(qn('w:pPr')) is not None:
-                original_ppr = paragraph._element.find(qn('w:pPr'))
-                new_ppr = copy.deepcopy(original_ppr)
-                new_para.insert(0, new_ppr)
-            
-            # 创建运行元素并设置文本
-            run = docx.oxml.parse_xml(r'<w:r xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"/>')
-            text_elem = docx.oxml.parse_xml(r'<w:t xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"/>')
-            text_elem.text = translated_text
-            run.append(text_elem)
-            
-            # 设置运行格式
-            rpr = docx.oxml.parse_xml(r'<w:rPr xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"/>')
-            
-            # 复制原始运行的格式属性（如果存在）
-            if paragraph.runs:
-                original_run = paragraph.runs[0]._element
-                original_rpr = original_run.find(qn('w:rPr'))
-                if original_rpr is not None:
-                    # 复制原始格式
-                    new_rpr = copy.deepcopy(original_rpr)
-                    # 更新颜色为红色
-                    color_elem = new_rpr.find(qn('w:color'))
-                    if color_elem is not None:
-                        color_elem.set(qn('w:val'), 'FF0000')
-                    else:
-                        color = docx.oxml.parse_xml(r'<w:color xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" w:val="FF0000"/>')
-                        new_rpr.append(color)
-                    rpr = new_rpr
-                else:
-                    # 只设置红色
-                    color = docx.oxml.parse_xml(r'<w:color xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" w:val="FF0000"/>')
-                    rpr.append(color)
-            else:
-                # 只设置红色
-                color = docx.oxml.parse_xml(r'<w:color xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" w:val="FF0000"/>')
-                rpr.append(color)
-            
-            run.insert(0, rpr)
-            new_para.append(run)
+            # 复制原始第一个运行的格式（如果存在），颜色改为红色
+            original_run = p.find(qn('w:r'))
+            original_rpr = original_run.find(qn('w:rPr')) if original_run is not None else None
+            new_para.append(_translation_run(translated_text, original_rpr))
             
             # 在原段落后插入新段落
-            parent.insert(list(parent).index(paragraph._element) + 1, new_para)
+            p.addnext(new_para)
             # 返回段落对象
             try:
                 new_paragraph = Paragraph(new_para, paragraph._parent)
@@ -241,237 +363,626 @@ class WordTranslationService:
             logger.error(f"插入翻译失败: {e}")
             return False
 
-    async def process_document_dual_output(self, file_path: str, contrast_output_path: str, 
-                                   translation_only_output_path: str,
-                                   target_language: str = "Chinese") -> List[Dict]:
-        """处理文档并生成两个输出：对照翻译和仅译文"""
- 
-        # 读取原始文档
-        original_doc = docx.Document(file_path)
+    def job_id(self, file_path: str, target_language: str, glossary: Optional[Glossary] = None) -> Optional[str]:
+        """任务日志键：文档内容、目标语言、模型、提示词版本与术语表；未配置任务日志时返回 None"""
+        return self.job_ids(file_path, [target_language], glossary)[target_language]
+
+    def job_ids(self, file_path: str, target_languages: List[str],
+                glossary: Optional[Glossary] = None) -> Dict[str, Optional[str]]:
+        """各目标语言的任务日志键，文档摘要只计算一次"""
+        if self.job_journal is None:
+            return {language: None for language in target_languages}
+        digest = file_digest(file_path)
+        glossary_dict = (glossary if glossary is not None else self.glossary_manager).glossary_dict
+        return {language: JobJournal.make_job_id(digest, language, model, translation_prompt_version, glossary_dict)
+                for language in target_languages}
+
+    async def translate_segments(self, texts: List[str], target_language: str,
+                                 use_memory: bool = True, refresh_memory: bool = False,
+                                 stats: Optional[Dict] = None,
+                                 job_id: Optional[str] = None,
+                                 progress: Optional[Callable[[int, int], None]] = None,
+                                 glossary: Optional[Glossary] = None) -> List[tuple[str, dict]]:
+        """翻译片段列表：规范化后相同的片段只请求一次，结果回填到每个位置
+
+        给定 job_id 时，每个完成的片段立即写入任务日志；日志中已有的片段不再请求。
+        progress 以 (已完成, 总数) 报告去重后片段的翻译进度。
+        glossary 为任务提交时取得的术语表快照；为 None 时使用 self.glossary_manager。
+        stats['segment_tokens'] 按片段位置记录消耗的 token；重复片段只计在首次出现的位置。
+        未能翻译而保留原文的片段带 FALLBACK_MARKER 标记，其位置记入 stats['fallback_positions']。
+        """
+        unique_texts, positions = dedup_segments(texts)
+        return await self._translate_unique(unique_texts, positions, target_language, use_memory, refresh_memory,
+                                            stats, job_id, progress, glossary)
+
+    async def translate_languages(self, texts: List[str], target_languages: List[str],
+                                  use_memory: bool = True, refresh_memory: bool = False,
+                                  stats: Optional[Dict[str, Dict]] = None,
+                                  job_ids: Optional[Dict[str, Optional[str]]] = None,
+                                  progress: Optional[Callable[[int, int], None]] = None,
+                                  glossary: Optional[Glossary] = None,
+                                  on_language: Optional[Callable[[str, List[tuple]], Awaitable]] = None
+                                  ) -> Dict[str, List[tuple[str, dict]]]:
+        """把同一组片段翻译成多种目标语言，返回 {目标语言: 译文列表}
+
+        去重、本地预过滤与术语匹配只做一次；各语言的请求同时提交，由进程内共享的并发与配额限流器统一调度，
+        总耗时接近最慢的单一语言，而不是各语言之和。
+        stats 为 {目标语言: 统计}，共享的预过滤与术语匹配耗时记入每个语言；job_ids 为各语言的任务日志键。
+        on_language(目标语言, 译文) 在该语言译完后立即执行（如写出输出），不等待其他语言。
+        progress 报告所有语言合计的进度。某个语言失败时其他语言照常完成，之后抛出第一个异常。
+        """
+        stats = stats if stats is not None else {}
+        job_ids = job_ids or {}
+        unique_texts, positions = dedup_segments(texts)
+        if glossary is None:
+            glossary = self.glossary_manager
+        shared: Dict = {}
+        matched, references = self._match_shared(unique_texts, glossary, shared)
         
-        # 收集所有需要翻译的内容
-        to_translate = []  # (type, element_info, text)
+        counts = {language: (0, 0) for language in target_languages}
         
-        # 收集段落
-        for i, paragraph in enumerate(original_doc.paragraphs):
-            text = paragraph.text.strip()
-            if text:
-                to_translate.append(('paragraph', i, text))
+        def language_progress(language):
+            def report(done, total):
+                counts[language] = (done, total)
+                progress(sum(d for d, _t in counts.values()), sum(t for _d, t in counts.values()))
+            return report if progress is not None else None
+        
+        async def run_language(language):
+            language_stats = stats.setdefault(language, {})
+            timings = language_stats.setdefault('timings', {})
+            for phase, seconds in shared.get('timings', {}).items():
+                timings[phase] = timings.get(phase, 0.0) + seconds
+            with phase_timer(language_stats, 'translate'):
+                results = await self._translate_unique(
+                    unique_texts, positions, language, use_memory, refresh_memory, language_stats,
+                    job_ids.get(language), language_progress(language), glossary, references, matched)
+            if on_language is not None:
+                await on_language(language, results)
+            return results
         
-        # 收集表格内容
-        table_cells = []
-        for table_idx, table in enumerate(original_doc.tables):
-            for row_idx, row in enumerate(table.rows):
-                for cell_idx, cell in enumerate(row.cells):
-                    for para_idx, para in enumerate(cell.paragraphs):
-                        cell_text = para.text.strip()
-                        if cell_text:
-                            to_translate.append(('table_cell', (table_idx, row_idx, cell_idx, para_idx), cell_text))
+        outcomes = await asyncio.gather(*[run_language(language) for language in target_languages],
+                                        return_exceptions=True)
+        for language, outcome in zip(target_languages, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"翻译为 {language} 失败: {outcome}")
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        return dict(zip(target_languages, outcomes))
+
+    def _match_shared(self, unique_texts: List[str], glossary, stats: Optional[Dict]
+                      ) -> Tuple[Optional[List[Optional[str]]], Optional[List[Dict[str, str]]]]:
+        """与目标语言无关的本地预过滤规则匹配和术语匹配，各语言共用，每个唯一片段只做一次
+
+        返回 (matched, references)，未启用预过滤或术语表时对应项为 None；预过滤命中的片段不做术语匹配。
+        stats 为 None 时（试运行）不计阶段耗时。
+        """
+        def timer(phase):
+            return phase_timer(stats, phase) if stats is not None else contextlib.nullcontext()
         
-        if not to_translate:
-            return []
-                    
-        # 翻译所有文本
-        texts = [item[2] for item in to_translate]
-        translated_results = await self.translator.translate_texts_parallel(texts, target_language)
+        matched = None
+        if self.segment_filter is not None:
+            with timer('filter'):
+                matched = [self.segment_filter.match(text) for text in unique_texts]
+        references = None
+        if glossary is not None:
+            with timer('glossary_match'):
+                references = [glossary.find_terms_in_text(text) if matched is None or matched[i] is None else {}
+                              for i, text in enumerate(unique_texts)]
+        return matched, references
+
+    async def _translate_unique(self, unique_texts: List[str], positions: List[int], target_language: str,
+                                use_memory: bool, refresh_memory: bool, stats: Optional[Dict],
+                                job_id: Optional[str], progress: Optional[Callable[[int, int], None]],
+                                glossary: Optional[Glossary],
+                                references: Optional[List[Dict[str, str]]] = None,
+                                matched: Optional[List[Optional[str]]] = None) -> List[tuple[str, dict]]:
+        """translate_segments 去重之后的部分；references 为各去重片段已匹配的术语，
+        matched 为各去重片段与语言无关的预过滤结果（SegmentFilter.match）"""
+        fallback_unique = set()
         
-        # 生成仅译文文档
-        translation_only_doc = docx.Document(file_path)
+        if stats is not None:
+            stats['segments'] = stats.get('segments', 0) + len(positions)
+            stats['unique_segments'] = stats.get('unique_segments', 0) + len(unique_texts)
+            stats['dedup_saved'] = stats.get('dedup_saved', 0) + len(positions) - len(unique_texts)
         
-        # 替换仅译文文档的内容
-        for item, tr in zip(to_translate, translated_results):
-            translated_text, _references = tr
-            typ, info, orig = item
-            if typ == 'paragraph':
-                paragraph_idx = info
-                if paragraph_idx < len(translation_only_doc.paragraphs):
-                    self.replace_paragraph_text_keep_format(translation_only_doc.paragraphs[paragraph_idx], translated_text)
-            elif typ == 'table_cell':
-                table_idx, row_idx, cell_idx, para_idx = info
-                if (table_idx < len(translation_only_doc.tables) and 
-                    row_idx < len(translation_only_doc.tables[table_idx].rows) and
-                    cell_idx < len(translation_only_doc.tables[table_idx].rows[row_idx].cells) and
-                    para_idx < len(translation_only_doc.tables[table_idx].rows[row_idx].cells[cell_idx].paragraphs)):
-                    para = translation_only_doc.tables[table_idx].rows[row_idx].cells[cell_idx].paragraphs[para_idx]
-                    self.replace_paragraph_text_keep_format(para, translated_text)
+        # 本地预过滤：无需翻译的片段（数字、附图标记、单位、化学式等）原样保留，不请求 API，也不写入任务日志
+        skipped = (self.segment_filter.skipped(unique_texts, target_language, matched)
+                   if self.segment_filter is not None else {})
+        self._record_skips(stats, skipped, positions)
+        
+        journal = self.job_journal if job_id is not None else None
+        unique_results = await asyncio.to_thread(journal.load, job_id) if journal is not None else {}
+        resumed = sum(1 for i in unique_results if i not in skipped)
+        unique_results.update((i, (unique_texts[i], {})) for i in skipped)
+        missing = [i for i in range(len(unique_texts)) if i not in unique_results]
+        if stats is not None and resumed:
+            stats['resumed_segments'] = stats.get('resumed_segments', 0) + resumed
         
-        # 保存仅译文文档
-        translation_only_doc.save(translation_only_output_path)
+        done = len(unique_results)
+        if progress is not None:
+            progress(done, len(unique_texts))
         
-        # 生成对照翻译文档
-        contrast_doc = docx.Document(file_path)
+        def on_result(index, translated_text, references):
+            nonlocal done
+            if journal is not None:
+                journal.record(job_id, missing[index], translated_text, references)
+            if progress is not None:
+                done += 1
+                progress(done, len(unique_texts))
+        
+        segment_tokens = {}  # missing 中的下标 -> token 数
+        if missing:
+            call_stats = stats if stats is not None else {}
+            results = await self.translator.translate_texts_parallel(
+                [unique_texts[i] for i in missing], target_language, use_memory=use_memory,
+                refresh_memory=refresh_memory, stats=call_stats, on_result=on_result, glossary=glossary,
+                segment_tokens=segment_tokens,
+                references=[references[i] for i in missing] if references is not None else None)
+            unique_results.update(zip(missing, results))
+            fallback_unique = {missing[i] for i in call_stats.pop('fallback_indices', [])}
+            for i in fallback_unique:
+                source_text, references = unique_results[i]
+                unique_results[i] = (FALLBACK_MARKER + source_text, references)
+        if progress is not None:
+            progress(len(unique_texts), len(unique_texts))
+        if stats is not None:
+            unique_tokens = {missing[i]: tokens for i, tokens in segment_tokens.items()}
+            seen = set()
+            per_position = []
+            for unique in positions:
+                per_position.append(unique_tokens.get(unique, 0) if unique not in seen else 0)
+                seen.add(unique)
+            stats.setdefault('segment_tokens', []).extend(per_position)
+            stats['fallback_positions'] = [p for p, unique in enumerate(positions) if unique in fallback_unique]
+            # 预过滤保留原样的片段，对照输出中不再重复插入
+            stats['skipped_positions'] = [p for p, unique in enumerate(positions) if unique in skipped]
+        return [unique_results[i] for i in positions]
+
+    @staticmethod
+    def _record_skips(stats: Optional[Dict], skipped: Dict[int, str], positions: List[int]) -> None:
+        """按片段位置统计预过滤跳过的片段：stats['skipped_segments'] 与按规则分类的 stats['skip_rules']"""
+        counts: Dict[str, int] = {}
+        for unique in positions:
+            rule = skipped.get(unique)
+            if rule is not None:
+                counts[rule] = counts.get(rule, 0) + 1
+        for rule, count in counts.items():
+            SEGMENTS_SKIPPED.labels(rule).inc(count)
+        if stats is not None:
+            stats['skipped_segments'] = stats.get('skipped_segments', 0) + sum(counts.values())
+            skip_rules = stats.setdefault('skip_rules', {})
+            for rule, count in counts.items():
+                skip_rules[rule] = skip_rules.get(rule, 0) + count
+
+    def retranslate_delay(self, attempt: int) -> float:
+        """第 attempt 次运行后再次翻译保留原文片段前的等待秒数：主模型熔断打开时至少等到允许探测，否则按次数指数退避"""
+        return max(self.translator.recovery_delay(), RETRANSLATE_DELAY * 2 ** attempt)
+
+    async def finish_job(self, job_id: Optional[str], stats: Dict) -> None:
+        """输出写完后清理任务日志（在线程中执行，删除与压缩不阻塞事件循环）；有片段保留原文时保留日志，重新运行时只翻译这些片段"""
+        if job_id is not None and not stats.get('fallback_positions'):
+            await asyncio.to_thread(self.job_journal.finish, job_id)
+
+    def estimate_segments(self, texts: List[str], target_language: str, use_memory: bool = True,
+                          refresh_memory: bool = False, glossary: Optional[Glossary] = None,
+                          job_id: Optional[str] = None) -> Dict:
+        """预估翻译这些片段所需的请求数、token、费用和 API 耗时，不调用 API"""
+        return self.estimate_languages(texts, [target_language], use_memory, refresh_memory, glossary,
+                                       {target_language: job_id})[target_language]
+
+    def estimate_languages(self, texts: List[str], target_languages: List[str], use_memory: bool = True,
+                           refresh_memory: bool = False, glossary: Optional[Glossary] = None,
+                           job_ids: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, Dict]:
+        """预估把这些片段翻译成各目标语言所需的请求数、token、费用和 API 耗时，不调用 API，返回 {目标语言: 预估}
+
+        与 translate_languages 相同地只做一次去重、预过滤规则匹配与术语匹配；每个语言只做目标文字检查，
+        并跳过任务日志中已完成的片段和翻译记忆命中的片段（只读查询），批量模式下按相同的规则打包。
+        """
+        job_ids = job_ids or {}
+        unique_texts, positions = dedup_segments(texts)
+        if glossary is None:
+            glossary = self.glossary_manager
+        matched, references = self._match_shared(unique_texts, glossary, None)
+        estimates = {}
+        for language in target_languages:
+            job_id = job_ids.get(language)
+            resumed = self.job_journal.load(job_id) if self.job_journal is not None and job_id is not None else {}
+            skipped = (self.segment_filter.skipped(unique_texts, language, matched)
+                       if self.segment_filter is not None else {})
+            pending = []
+            memory_hits = 0
+            for i, text in enumerate(unique_texts):
+                if i in resumed or i in skipped:
+                    continue
+                segment_references, memory_key, cached = self.translator._prepare_segment(
+                    text, language, use_memory, refresh_memory, None, glossary,
+                    references[i] if references is not None else None)
+                if cached is not None:
+                    memory_hits += 1
+                else:
+                    pending.append((i, text, segment_references, memory_key))
+            if self.translator.batch_mode:
+                singles, batches = self.translator._plan_batches(pending)
+            else:
+                singles, batches = pending, []
+            estimate = {
+                'segments': len(texts),
+                'unique_segments': len(unique_texts),
+                'resumed_segments': sum(1 for i in resumed if i not in skipped),
+                'skipped_segments': sum(1 for unique in positions if unique in skipped),
+                'memory_hits': memory_hits,
+            }
+            estimate.update(summarize_estimate(estimate_requests(singles, language, batches)))
+            estimates[language] = estimate
+        return estimates
+
+    def estimate_document(self, file_path: str, target_language: str, use_memory: bool = True,
+                          refresh_memory: bool = False, glossary: Optional[Glossary] = None) -> Dict:
+        """试运行：按翻译时相同的方式解析并收集文档片段，预估任务规模与耗时，不调用 API"""
+        return self.estimate_document_languages(file_path, [target_language], use_memory, refresh_memory,
+                                                glossary)[target_language]
+
+    def estimate_document_languages(self, file_path: str, target_languages: List[str], use_memory: bool = True,
+                                    refresh_memory: bool = False, glossary: Optional[Glossary] = None
+                                    ) -> Dict[str, Dict]:
+        """试运行：文档只解析、收集一次，预估翻译成各目标语言的任务规模与耗时，返回 {目标语言: 预估}"""
+        started = time.perf_counter()
+        if file_path.lower().endswith('.doc'):
+            import docx2txt
+            text = docx2txt.process(file_path)
+            texts = [p.strip() for p in text.split('\n') if p.strip()]
+        else:
+            texts = [item[2] for item in self.collect_segments(docx.Document(file_path))]
+        prepare_seconds = time.perf_counter() - started
+        estimates = self.estimate_languages(texts, target_languages, use_memory, refresh_memory, glossary,
+                                            self.job_ids(file_path, target_languages, glossary))
+        for estimate in estimates.values():
+            # 写出两个输出文档的耗时按解析加收集的耗时估计
+            estimate['local_seconds'] = round(2 * prepare_seconds, 1)
+            estimate['total_seconds'] = round(estimate['seconds'] + estimate['local_seconds'], 1)
+        return estimates
+
+    def collect_segments(self, doc) -> List[Tuple]:
+        """收集文档中所有需要翻译的内容，返回 (type, element_index, text) 列表
+
+        element_index 指向 paragraph_elements() 的结果，在原文档及其正文副本上都有效。
+        """
+        to_translate = []  # (type, element_index, text)
+        for i, (typ, p) in enumerate(paragraph_elements(doc.element.body)):
+            text = Paragraph(p, doc._body).text.strip()
+            if text:
+                to_translate.append((typ, i, text))
+        return to_translate
+
+    def write_translation_only(self, doc, to_translate: List[Tuple], translated_results: List[tuple]) -> None:
+        """将译文替换进文档（仅译文输出）"""
+        elements = paragraph_elements(doc.element.body)
+        for (typ, index, orig), (translated_text, _references) in zip(to_translate, translated_results):
+            paragraph = Paragraph(elements[index][1], doc._body)
+            self.replace_paragraph_text_keep_format(paragraph, translated_text)
+
+    def write_contrast(self, doc, to_translate: List[Tuple], translated_results: List[tuple],
+                       skipped_positions: Optional[Set[int]] = None) -> List[Dict]:
+        """在原文后插入译文并高亮术语（对照输出），返回原文/译文对照列表
+
+        skipped_positions 为预过滤保留原样的片段位置，这些片段不插入译文，避免原文重复出现。
+        """
+        elements = paragraph_elements(doc.element.body)
         translated_paragraphs = []
         
-        # 按倒序插入译文（避免索引变化）
-        for item, tr in zip(reversed(to_translate), reversed(translated_results)):
-            translated_text, references = tr
-            typ, info, orig = item
+        # 每个任务只编译一次术语匹配器：原文术语与译文术语各一个
+        source_ids: Dict[str, int] = {}
+        target_ids: Dict[str, int] = {}
+        for _translated, references in translated_results:
+            for src, tgt in references.items():
+                source_ids.setdefault(src, len(source_ids))
+                target_ids.setdefault(tgt, len(target_ids))
+        source_matcher = TermMatcher(source_ids) if source_ids else None
+        target_matcher = TermMatcher(target_ids) if target_ids else None
+        
+        # 按文档顺序单次遍历；插入不会改变 elements 中已有元素的引用
+        for position, ((typ, index, orig), (translated_text, references)) in enumerate(
+                zip(to_translate, translated_results)):
+            if skipped_positions and position in skipped_positions:
+                translated_paragraphs.append({'original': orig, 'translated': translated_text})
+                continue
+            original_para = Paragraph(elements[index][1], doc._body)
             if typ == 'paragraph':
-                paragraph_idx = info
-                if paragraph_idx < len(contrast_doc.paragraphs):
-                    original_para = contrast_doc.paragraphs[paragraph_idx]
-                    inserted_para = self.insert_translation_simple(original_para, translated_text)
-                    if inserted_para:
-                        # 高亮所有在术语表中找到的术语
-                        if references:
-                            self.highlight_terms_by_run(original_para, list(references.keys()))
-
-                        if isinstance(inserted_para, Paragraph):
-                            # 高亮译文中对应的术语
-                            translated_terms = list(references.values())
-                            if translated_terms:
-                                self.highlight_terms_by_run(inserted_para, translated_terms)
-                        translated_paragraphs.append({'original': orig, 'translated': translated_text})
+                inserted_para = self.insert_translation_simple(original_para, translated_text)
+                if not inserted_para:
+                    continue
+                # 高亮所有在术语表中找到的术语
+                if references:
+                    allowed = {source_ids[src] for src in references}
+                    self.highlight_terms(original_para, source_matcher, allowed.__contains__)
+
+                if isinstance(inserted_para, Paragraph) and references:
+                    # 高亮译文中对应的术语
+                    allowed = {target_ids[tgt] for tgt in references.values()}
+                    self.highlight_terms(inserted_para, target_matcher, allowed.__contains__)
             elif typ == 'table_cell':
-                table_idx, row_idx, cell_idx, para_idx = info
-                if (table_idx < len(contrast_doc.tables) and 
-                    row_idx < len(contrast_doc.tables[table_idx].rows) and
-                    cell_idx < len(contrast_doc.tables[table_idx].rows[row_idx].cells)):
-                    cell = contrast_doc.tables[table_idx].rows[row_idx].cells[cell_idx]
-                    # 在表格单元格中添加译文段落
-                    trans_para = cell.add_paragraph(translated_text)
-                    for run in trans_para.runs:
-                        run.font.color.rgb = docx.shared.RGBColor(255, 0, 0)
-                    
-                    # 高亮原文单元格中的术语
-                    if para_idx < len(cell.paragraphs) and references:
-                        para_obj = cell.paragraphs[para_idx]
-                        self.highlight_terms_by_run(para_obj, list(references.keys()))
+                # 在表格单元格末尾添加译文段落
+                trans_p = copy.deepcopy(_PARAGRAPH_PROTO)
+                trans_p.append(_translation_run(translated_text))
+                original_para._element.getparent().append(trans_p)
+                
+                # 高亮原文单元格中的术语
+                if references:
+                    allowed = {source_ids[src] for src in references}
+                    self.highlight_terms(original_para, source_matcher, allowed.__contains__)
             
-                    translated_paragraphs.append({'original': orig, 'translated': translated_text})
+            translated_paragraphs.append({'original': orig, 'translated': translated_text})
         
-        translated_paragraphs.reverse()
-        
-        # 保存对照翻译文档
-        contrast_doc.save(contrast_output_path)
+        return translated_paragraphs
+
+    def write_outputs(self, doc, to_translate: List[Tuple], translated_results: List[tuple],
+                      contrast_output_path: Optional[str] = None,
+                      translation_only_output_path: Optional[str] = None,
+                      stats: Optional[Dict] = None,
+                      skipped_positions: Optional[Set[int]] = None) -> List[Dict]:
+        """把译文写入已解析的文档并保存所需的输出；路径为 None 的输出不生成
+
+        仅译文输出会修改正文，因此同时需要对照输出时先复制原始正文。
+        skipped_positions 中的片段（预过滤保留原样）在对照输出中不插入译文。
+        """
+        original_body = None
+        if translation_only_output_path:
+            if contrast_output_path:
+                # 修改前先复制原始正文，供对照文档使用
+                with phase_timer(stats, 'clone'):
+                    original_body = copy.deepcopy(doc.element.body)
+            
+            # 生成仅译文文档
+            with phase_timer(stats, 'write_translation_only'):
+                self.write_translation_only(doc, to_translate, translated_results)
+            with phase_timer(stats, 'save_translation_only'):
+                doc.save(translation_only_output_path)
         
+        translated_paragraphs = [{'original': orig, 'translated': translated_text}
+                                 for (_typ, _index, orig), (translated_text, _refs)
+                                 in zip(to_translate, translated_results)]
+        if contrast_output_path:
+            # 换回原始正文，生成对照翻译文档
+            if original_body is not None:
+                with phase_timer(stats, 'clone'):
+                    replace_body(doc, original_body)
+            with phase_timer(stats, 'write_contrast'):
+                translated_paragraphs = self.write_contrast(doc, to_translate, translated_results,
+                                                            skipped_positions)
+            with phase_timer(stats, 'save_contrast'):
+                doc.save(contrast_output_path)
         return translated_paragraphs
 
+    async def process_document_dual_output(self, file_path: str, contrast_output_path: str, 
+                                   translation_only_output_path: str,
+                                   target_language: str = "Chinese",
+                                   use_memory: bool = True, refresh_memory: bool = False,
+                                   stats: Optional[Dict] = None,
+                                   progress: Optional[Callable[[int, int], None]] = None,
+                                   glossary: Optional[Glossary] = None) -> List[Dict]:
+        """处理文档并生成两个输出：对照翻译和仅译文
+
+        源文件只解析一次：两个输出都基于同一个 Document，对照输出使用正文
+        (word/document.xml 的 body) 的内存副本，图片等其他部件不会被重复读取。
+        """
+        results = await self.process_document_languages(
+            file_path, {target_language: (contrast_output_path, translation_only_output_path)},
+            use_memory=use_memory, refresh_memory=refresh_memory,
+            stats={target_language: stats if stats is not None else {}}, progress=progress, glossary=glossary,
+            extract_text=False)
+        return results[target_language]
+
+    async def process_document_languages(self, file_path: str,
+                                         outputs: Dict[str, Tuple[Optional[str], Optional[str]]],
+                                         use_memory: bool = True, refresh_memory: bool = False,
+                                         stats: Optional[Dict[str, Dict]] = None,
+                                         progress: Optional[Callable[[int, int], None]] = None,
+                                         glossary: Optional[Glossary] = None,
+                                         extract_text: Optional[bool] = None) -> Dict[str, List[Dict]]:
+        """一个任务把文档翻译成多种目标语言，返回 {目标语言: 原文/译文对照列表}
+
+        outputs 为 {目标语言: (对照输出路径, 仅译文输出路径)}，路径为 None 的输出不生成。
+        解析、片段收集、去重与术语匹配只做一次，各语言经共享的限流器同时翻译（见 translate_languages），
+        某个语言译完即写出它的输出。stats 为 {目标语言: 统计}，解析与收集耗时记入每个语言。
+        extract_text 为 True 时按 .doc 处理：用 docx2txt 提取文本并生成新文档；为 None 时按扩展名判断。
+        """
+        target_languages = list(outputs)
+        stats = stats if stats is not None else {}
+        for language in target_languages:
+            stats.setdefault(language, {})
+        if extract_text is None:
+            extract_text = file_path.lower().endswith('.doc')
+        
+        shared: Dict = {}
+        # 读取原始文档（仅此一次）；解析与写入放到线程中，不阻塞共享事件循环上的 API 调用
+        with phase_timer(shared, 'parse'):
+            if extract_text:
+                import docx2txt
+                text = await asyncio.to_thread(docx2txt.process, file_path)
+                doc = None
+            else:
+                doc = await asyncio.to_thread(docx.Document, file_path)
+            job_ids = await asyncio.to_thread(self.job_ids, file_path, target_languages, glossary)
+        
+        # 收集所有需要翻译的内容
+        with phase_timer(shared, 'collect'):
+            if extract_text:
+                texts = [p.strip() for p in text.split('\n') if p.strip()]
+                to_translate = texts
+            else:
+                to_translate = await asyncio.to_thread(self.collect_segments, doc)
+                texts = [item[2] for item in to_translate]
+        for language in target_languages:
+            timings = stats[language].setdefault('timings', {})
+            for phase, seconds in shared['timings'].items():
+                timings[phase] = timings.get(phase, 0.0) + seconds
+        
+        if not texts:
+            return {language: [] for language in target_languages}
+        
+        pristine_body = None
+        if doc is not None and len(target_languages) > 1:
+            # 写入会修改正文：保留一份原始正文，每个语言从它的副本开始写
+            pristine_body = copy.deepcopy(doc.element.body)
+        write_lock = asyncio.Lock()  # 各语言共用同一个 Document，写出依次进行
+        written = set()
+        translated_paragraphs = {}
+        
+        async def write_language(language, translated_results):
+            contrast_output_path, translation_only_output_path = outputs[language]
+            language_stats = stats[language]
+            skipped_positions = set(language_stats.get('skipped_positions', ()))
+            if doc is None:
+                translated_paragraphs[language] = await asyncio.to_thread(
+                    self.write_text_outputs, texts, translated_results, contrast_output_path,
+                    translation_only_output_path, language_stats, skipped_positions)
+            else:
+                async with write_lock:
+                    if written:
+                        with phase_timer(language_stats, 'clone'):
+                            replace_body(doc, copy.deepcopy(pristine_body))
+                    written.add(language)
+                    translated_paragraphs[language] = await asyncio.to_thread(
+                        self.write_outputs, doc, to_translate, translated_results, contrast_output_path,
+                        translation_only_output_path, language_stats, skipped_positions)
+            # 该语言的输出都已写入，清理任务日志
+            await self.finish_job(job_ids[language], language_stats)
+        
+        await self.translate_languages(
+            texts, target_languages, use_memory=use_memory, refresh_memory=refresh_memory, stats=stats,
+            job_ids=job_ids, progress=progress, glossary=glossary, on_language=write_language)
+        return translated_paragraphs
 
     def highlight_terms_by_run(self, paragraph, terms: list[str], case_insensitive: bool = True) -> None:
         """Precisely highlight glossary terms inside a paragraph with yellow color."""
+        terms = [t for t in terms if isinstance(t, str) and t.strip()]
         if not terms:
             return
-        normalized_terms = [t.lower() for t in terms if isinstance(t, str) and t.strip()]
-        if not normalized_terms:
-            return
-        # Sort by length to prefer longer terms when alternatives overlap
-        normalized_terms.sort(key=len, reverse=True)
-        pattern_text = "|".join(re.escape(t) for t in normalized_terms)
-        flags = re.IGNORECASE if case_insensitive else 0
-        try:
-            term_pattern = re.compile(f"({pattern_text})", flags)
-        except re.error:
-            # Fallback: if regex compilation fails for any reason, do nothing
-            return
-        # Work on a copy because we're going to mutate paragraph runs
-        for run in list(paragraph.runs):
-            original_text = run.text or ""
-            text_for_matching = original_text.lower() if case_insensitive else original_text
-            matches = list(term_pattern.finditer(text_for_matching))
-            if not matches:
-                run.font.highlight_color = None
-                continue
-            segments: List[Tuple[str, bool]] = []  # (text, should_highlight)
-            cursor = 0
-            for m in matches:
-                if m.start() > cursor:
-                    segments.append((original_text[cursor:m.start()], False))
-                segments.append((original_text[m.start():m.end()], True))
-                cursor = m.end()
-            if cursor < len(original_text):
-                segments.append((original_text[cursor:], False))
-
-            # Check if segments is empty (shouldn't happen, but safety check)
-            if not segments:
+        self.highlight_terms(paragraph, TermMatcher(terms, case_insensitive))
+
+    def highlight_terms(self, paragraph, matcher: TermMatcher,
+                        allowed: Optional[Callable[[int], bool]] = None) -> None:
+        """Highlight matcher terms in a paragraph, including terms that span several runs.
+
+        Matching runs over the paragraph's concatenated run text (leftmost-longest,
+        non-overlapping); match offsets are then mapped back onto the runs, and a
+        run is split only where a highlight starts or ends inside it.
+        """
+        r_elements = paragraph._element.r_lst
+        texts = []
+        for r in r_elements:
+            text = _plain_run_text(r)
+            texts.append(text if text is not None else Run(r, paragraph).text or "")
+        matches = matcher.find_longest("".join(texts), allowed)
+
+        cursor = 0  # index of the first match that may still overlap the current run
+        run_start = 0
+        for r, text in zip(r_elements, texts):
+            run_end = run_start + len(text)
+            while cursor < len(matches) and matches[cursor][1] <= run_start:
+                cursor += 1
+
+            # Split the run into (text, highlighted) pieces at match boundaries
+            pieces: List[Tuple[str, bool]] = []
+            pos = run_start
+            j = cursor
+            while j < len(matches) and matches[j][0] < run_end:
+                start, end = max(matches[j][0], run_start), min(matches[j][1], run_end)
+                if start > pos:
+                    pieces.append((text[pos - run_start:start - run_start], False))
+                pieces.append((text[start - run_start:end - run_start], True))
+                pos = end
+                j += 1
+            if pos < run_end:
+                pieces.append((text[pos - run_start:], False))
+            run_start = run_end
+
+            if len(pieces) <= 1:
+                _set_highlight(r, bool(pieces) and pieces[0][1])
                 continue
-                
-            # Replace the original run with the first segment
-            first_text, should_highlight = segments[0]
-            run.text = first_text
-            # Clear any existing highlight first
-            try:
-                run.font.highlight_color = None
-            except Exception:
-                pass
-            if should_highlight:
-                run.font.highlight_color = WD_COLOR_INDEX.YELLOW
-
-            prev_r = run._element
-
-            # Insert subsequent segments as new runs placed after the current one
-            for seg_text, should_highlight in segments[1:]:
-                # Clone the original run's XML so we keep formatting
-                new_r = copy.deepcopy(prev_r)
-
-                # Ensure there's a text node and set text
-                t = new_r.find(qn('w:t'))
-                if t is None:
-                    t = docx.oxml.parse_xml(r'<w:t xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"/>')
-                    new_r.append(t)
-                t.text = seg_text
-
-                # Ensure rPr exists and set/remove highlight
-                rPr = new_r.find(qn('w:rPr'))
-                if rPr is None:
-                    rPr = docx.oxml.parse_xml(r'<w:rPr xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"/>')
-                    new_r.insert(0, rPr)
-                existing_hl = rPr.find(qn('w:highlight'))
-                if existing_hl is not None:
-                    rPr.remove(existing_hl)
-                if should_highlight:
-                    hl = docx.oxml.parse_xml(r'<w:highlight xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" w:val="yellow"/>')
-                    rPr.append(hl)
 
+            # Keep the first piece in the original run, add new runs after it for the rest
+            plain = _plain_run_text(r) is not None
+            _set_run_text(r, pieces[0][0], plain, paragraph)
+            _set_highlight(r, pieces[0][1])
+            rpr = r.find(_W_RPR)
+            prev_r = r
+            for piece_text, highlighted in pieces[1:]:
+                new_r = prev_r.makeelement(_W_R, {})
+                if rpr is not None:
+                    new_r.append(copy.deepcopy(rpr))
+                _set_run_text(new_r, piece_text, True, paragraph)
+                _set_highlight(new_r, highlighted)
                 prev_r.addnext(new_r)
                 prev_r = new_r
             
     
     async def extract_and_translate_doc(self, file_path: str, contrast_output_path: str, 
                                 translation_only_output_path: str,
-                                target_language: str = "Chinese") -> List[Dict]:
+                                target_language: str = "Chinese",
+                                use_memory: bool = True, refresh_memory: bool = False,
+                                stats: Optional[Dict] = None,
+                                progress: Optional[Callable[[int, int], None]] = None,
+                                glossary: Optional[Glossary] = None) -> List[Dict]:
         """从doc文件中提取文本并生成两个翻译文档"""
         try:
             # 对于.doc文件，先提取文本然后创建带翻译的docx
-            import docx2txt
-            text = docx2txt.process(file_path)
-            paragraphs = [p.strip() for p in text.split('\n') if p.strip()]
-            
-            if not paragraphs:
-                return []
-            
-            # 并行翻译所有段落
-            translated_texts = await self.translator.translate_texts_parallel(paragraphs, target_language)
-            
-            # 创建对照翻译文档
-            contrast_doc = docx.Document()
-            # 创建仅译文文档
-            translation_only_doc = docx.Document()
-            
-            translated_paragraphs = []
-            
-            for paragraph_text, translated_text in zip(paragraphs, translated_texts):
-                # 对照文档：原文 + 译文
-                original_para = contrast_doc.add_paragraph(paragraph_text)
+            results = await self.process_document_languages(
+                file_path, {target_language: (contrast_output_path, translation_only_output_path)},
+                use_memory=use_memory, refresh_memory=refresh_memory,
+                stats={target_language: stats if stats is not None else {}}, progress=progress, glossary=glossary,
+                extract_text=True)
+            return results[target_language]
+        except ImportError:
+            raise Exception("处理.doc文件需要安装docx2txt库: pip install docx2txt")
+        except Exception as e:
+            raise Exception(f"处理doc文件失败: {str(e)}")
+
+    def write_text_outputs(self, paragraphs: List[str], translated_texts: List[tuple],
+                           contrast_output_path: Optional[str] = None,
+                           translation_only_output_path: Optional[str] = None,
+                           stats: Optional[Dict] = None,
+                           skipped_positions: Optional[Set[int]] = None) -> List[Dict]:
+        """由提取的纯文本段落新建并保存两个翻译文档；路径为 None 的输出不生成
+
+        skipped_positions 中的段落（预过滤保留原样）在对照文档中只写原文。
+        """
+        # 创建对照翻译文档
+        contrast_doc = docx.Document()
+        # 创建仅译文文档
+        translation_only_doc = docx.Document()
+        
+        translated_paragraphs = []
+        
+        write_started = time.perf_counter()
+        for position, (paragraph_text, (translated_text, _references)) in enumerate(
+                zip(paragraphs, translated_texts)):
+            # 对照文档：原文 + 译文
+            original_para = contrast_doc.add_paragraph(paragraph_text)
+            if not skipped_positions or position not in skipped_positions:
                 translated_para = contrast_doc.add_paragraph()
                 self.copy_paragraph_format(original_para, translated_para)
                 translated_run = translated_para.add_run(translated_text)
                 translated_run.font.color.rgb = docx.shared.RGBColor(255, 0, 0)  # 红色
-                
-                # 仅译文文档：只有译文
-                trans_only_para = translation_only_doc.add_paragraph(translated_text)
-                
-                translated_paragraphs.append({
-                    'original': paragraph_text,
-                    'translated': translated_text
-                })
             
-            # 保存两个文档
-            contrast_doc.save(contrast_output_path)
-            translation_only_doc.save(translation_only_output_path)
+            # 仅译文文档：只有译文
+            trans_only_para = translation_only_doc.add_paragraph(translated_text)
             
-            return translated_paragraphs
-        except ImportError:
-            raise Exception("处理.doc文件需要安装docx2txt库: pip install docx2txt")
-        except Exception as e:
-            raise Exception(f"处理doc文件失败: {str(e)}") 
\ No newline at end of file
+            translated_paragraphs.append({
+                'original': paragraph_text,
+                'translated': translated_text
+            })
+        
+        if stats is not None:
+            stats.setdefault('timings', {})['write'] = time.perf_counter() - write_started
+        
+        # 保存两个文档
+        if contrast_output_path:
+            with phase_timer(stats, 'save_contrast'):
+                contrast_doc.save(contrast_output_path)
+        if translation_only_output_path:
+            with phase_timer(stats, 'save_translation_only'):
+                translation_only_doc.save(translation_only_output_path)
+        
+        return translated_paragraphs